@@ -16,8 +16,17 @@ from uuid import uuid4
 
 from src.core import run_prompt, stream_prompt, PROMPTS, PROVIDERS
 from src.ai_stream import AGENTS, AGENTS_MSG, exec_agent, stream_agent, sse_encode
-from src.search import search_documents, search_non_conformities, format_search_results
+from src.search import (
+    search_documents,
+    search_non_conformities,
+    format_search_results,
+    get_retrieval_status,
+    prepare_query_embeddings,
+    warm_vector_registry,
+)
+from src.context_packer import build_prompt_source_inputs
 from src.lightweight_memory import LightweightMemoryStore
+from src.rank_fusion import EPISODIC_CHANNEL_WEIGHT, RankedChannel, fuse_ranked_channels, fusion_key
 from src.retrieval_confidence import assess_retrieval_confidence, build_low_confidence_payload
 
 # ===============================================================
@@ -70,6 +79,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_retrieval_indexes():
+    # Résout et épingle les collections vectorielles avant la première requête
+    await asyncio.to_thread(warm_vector_registry)
+
 # In-memory mock user DB (à remplacer par un vrai store si besoin)
 users: Dict[str, str] = {}
 
@@ -121,15 +135,19 @@ def merge_episodic_results(
     nc_results: List[Dict[str, Any]],
     episodic_hits: List[Dict[str, Any]],
 ) -> List[Dict[str, Any]]:
-    merged: List[Dict[str, Any]] = []
-    seen = set()
-    for item in episodic_hits + nc_results:
-        identity = item.get("doc") or item.get("chunk_id")
-        if identity in seen:
-            continue
-        seen.add(identity)
-        merged.append(item)
-    return merged
+    # Pas d'annotation: rrf_score / retrieval_channels des NC alimentent la confiance.
+    fused = fuse_ranked_channels(
+        [
+            RankedChannel("episodic", [episodic_hits], weight=EPISODIC_CHANNEL_WEIGHT),
+            RankedChannel("non_conformities", [nc_results]),
+        ],
+        final_limit=len(episodic_hits) + len(nc_results),
+        annotate=False,
+    )
+    # La fusion ignore les hits sans identité (ni doc ni chunk_id): gardés à la suite, comme avant la RRF.
+    hits = episodic_hits + nc_results
+    use_doc_ids = all("doc_id" in item for item in hits)
+    return fused + [item for item in hits if fusion_key(item, use_doc_ids) in (None, "")]
 
 
 def persist_validated_memory_event(
@@ -325,12 +343,16 @@ async def ai_endpoint(request: Request):
             logger.info("Sources not provided, performing search...")
             query = await run_prompt("query", provider, role=role, user_message=user_message, description=description)
             
-            logger.info("doc_search")
-            tech_docs_results = await asyncio.to_thread(search_documents, query)
-            
-            logger.info("nc_search")
-            nc_results = await asyncio.to_thread(search_non_conformities, query)
-            episodic_hits = await asyncio.to_thread(MEMORY_STORE.search_episodic_memory, query, limit=3)
+            # Un seul appel d'embedding pour toutes les variantes des deux corpus
+            query_embeddings = await asyncio.to_thread(prepare_query_embeddings, query)
+
+            # Les deux corpus (et leur rerank) tournent en parallèle
+            logger.info("doc_search + nc_search")
+            tech_docs_results, nc_results, episodic_hits = await asyncio.gather(
+                asyncio.to_thread(search_documents, query, query_embeddings=query_embeddings),
+                asyncio.to_thread(search_non_conformities, query, query_embeddings=query_embeddings),
+                asyncio.to_thread(MEMORY_STORE.search_episodic_memory, query, limit=3),
+            )
             nc_results = merge_episodic_results(nc_results, episodic_hits)
             
             sources = {
@@ -362,8 +384,7 @@ async def ai_endpoint(request: Request):
                                       role=role,
                                       user_message=user_message,
                                       description=description,
-                                      search_docs=json.dumps(sources["tech_docs"]),
-                                      search_nc=json.dumps(sources["non_conformities"]),
+                                      **build_prompt_source_inputs(sources),
                                       history=json.dumps(history))
         try:
             final_payload = json.loads(final_json)
@@ -432,15 +453,26 @@ async def ai_endpoint(request: Request):
             # doc_search - utiliser directement la recherche vectorielle
             logger.info("doc_search")
             yield sse_encode(None, {"type": "action", "text": "Search for relevant technical documents", "metadata": "doc_search"})
-            tech_docs_results = await asyncio.to_thread(search_documents, query)
-            tech_docs = format_search_results(tech_docs_results)
-            yield sse_encode(None, {"type": "result", "text": tech_docs, "metadata": "doc_search"})
-
-            # nc_search - utiliser directement la recherche vectorielle
-            logger.info("nc_search")
-            yield sse_encode(None, {"type": "action", "text": "Search for similar non-conformities", "metadata": "nc_search"})
-            nc_results = await asyncio.to_thread(search_non_conformities, query)
-            episodic_hits = await asyncio.to_thread(MEMORY_STORE.search_episodic_memory, query, limit=3)
+            query_embeddings = await asyncio.to_thread(prepare_query_embeddings, query)
+            # nc_search démarre en même temps que doc_search; les événements restent ordonnés
+            nc_task = asyncio.gather(
+                asyncio.to_thread(search_non_conformities, query, query_embeddings=query_embeddings),
+                asyncio.to_thread(MEMORY_STORE.search_episodic_memory, query, limit=3),
+            )
+            try:
+                tech_docs_results = await asyncio.to_thread(search_documents, query, query_embeddings=query_embeddings)
+                tech_docs = format_search_results(tech_docs_results)
+                yield sse_encode(None, {"type": "result", "text": tech_docs, "metadata": "doc_search"})
+
+                # nc_search - utiliser directement la recherche vectorielle
+                logger.info("nc_search")
+                yield sse_encode(None, {"type": "action", "text": "Search for similar non-conformities", "metadata": "nc_search"})
+                nc_results, episodic_hits = await nc_task
+            finally:
+                # doc_search en échec ou client déconnecté: nc_task est annulée et son issue consommée.
+                if not nc_task.done():
+                    nc_task.cancel()
+                await asyncio.gather(nc_task, return_exceptions=True)
             nc_results = merge_episodic_results(nc_results, episodic_hits)
             non_conf = format_search_results(nc_results)
             yield sse_encode(None, {"type": "result", "text": non_conf, "metadata": "nc_search"})
@@ -480,8 +512,7 @@ async def ai_endpoint(request: Request):
                                       role=role,
                                       user_message=user_message,
                                       description=description,
-                                      search_docs=json.dumps(current_sources["tech_docs"]),
-                                      search_nc=json.dumps(current_sources["non_conformities"]),
+                                      **build_prompt_source_inputs(current_sources),
                                       history=json.dumps(history)):
             full_response_text += chunk
             yield sse_encode("delta", {"v": chunk, "metadata": role})
@@ -565,6 +596,10 @@ async def login(payload: Dict[str, str]):
 async def ping():
     return {"status": "ok"}
 
+@app.get("/retrieval/status")
+async def retrieval_status():
+    return get_retrieval_status()
+
 # Middleware de log des requêtes
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -0,0 +1,31 @@
+import os
+from typing import Any, Dict, Sequence
+
+from src.lexical_search import ATA_DOC_PREFIX_RE, extract_ata_chapters, normalize_text
+
+
+ATA_PARTITION_ENABLED = os.getenv("RETRIEVAL_ATA_PARTITION_ENABLED", "true").lower() in ("1", "true", "t")
+# En dessous de ce nombre de hits dans la partition, on relance la recherche sur tout le corpus.
+ATA_PARTITION_MIN_HITS = int(os.getenv("RETRIEVAL_ATA_PARTITION_MIN_HITS", "3"))
+# Chroma NC n'a pas de métadonnée ATA: on sur-échantillonne puis on filtre sur le nom du document.
+ATA_PARTITION_OVERFETCH = int(os.getenv("RETRIEVAL_ATA_PARTITION_OVERFETCH", "4"))
+
+
+def item_ata_chapter(item: Dict[str, Any]) -> str | None:
+    """Chapter of an indexed item: its ATA metadata first, then an ATA-xx document prefix."""
+    chapters = extract_ata_chapters(str(item.get("ATA") or ""))
+    if chapters:
+        return chapters[0]
+    match = ATA_DOC_PREFIX_RE.match(normalize_text(str(item.get("doc") or "")))
+    return match.group(1) if match else None
+
+
+def build_chroma_ata_where(field: str, chapters: Sequence[str]) -> Dict[str, Any]:
+    # La dataprep écrit "ATA 28"; les variantes d'écriture restent acceptées.
+    spellings = [
+        spelling
+        for chapter in chapters
+        for spelling in (f"ATA {chapter}", f"ATA-{chapter}", f"ATA{chapter}", chapter)
+    ]
+    return {field: {"$in": spellings}}
+
@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Tuple, Type, TypeVar
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BREAKER_ENABLED = os.getenv("RETRIEVAL_VECTOR_BREAKER_ENABLED", "true").lower() in ("1", "true", "t")
+# Échecs (ou appels trop lents) consécutifs avant d'ouvrir le circuit.
+VECTOR_BREAKER_FAILURE_THRESHOLD = int(os.getenv("RETRIEVAL_VECTOR_BREAKER_FAILURES", "3"))
+VECTOR_BREAKER_SLOW_CALL_MS = float(os.getenv("RETRIEVAL_VECTOR_BREAKER_SLOW_MS", "2500"))
+# Durée d'ouverture avant qu'un appel de sonde (half-open) soit autorisé.
+VECTOR_BREAKER_COOLDOWN_S = float(os.getenv("RETRIEVAL_VECTOR_BREAKER_COOLDOWN_S", "30"))
+LATENCY_WINDOW = 512
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Closed → open after consecutive failures or slow calls; open → half-open probe after a cooldown.
+
+    While open, calls are rejected immediately with CircuitOpenError. A single probe is let through
+    once the cooldown has elapsed: its success closes the circuit, its failure reopens it.
+    Exceptions listed in ignored_exceptions are re-raised without counting as a success or a failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = VECTOR_BREAKER_FAILURE_THRESHOLD,
+        slow_call_ms: float = VECTOR_BREAKER_SLOW_CALL_MS,
+        cooldown_s: float = VECTOR_BREAKER_COOLDOWN_S,
+        clock: Callable[[], float] = time.monotonic,
+        ignored_exceptions: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.slow_call_ms = slow_call_ms
+        self.cooldown_s = cooldown_s
+        self.clock = clock
+        self.ignored_exceptions = tuple(ignored_exceptions)
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._latencies_ms: deque = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "opened": 0,
+            "probes": 0,
+            "ignored": 0,
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def available(self) -> bool:
+        """True when a call would be attempted (closed, or open with a probe due); consumes nothing."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            return not self._probe_in_flight and self.clock() - self._opened_at >= self.cooldown_s
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                self._counters["calls"] += 1
+                return False
+            if self._probe_in_flight or self.clock() - self._opened_at < self.cooldown_s:
+                self._counters["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self._state = HALF_OPEN
+            self._probe_in_flight = True
+            self._counters["calls"] += 1
+            self._counters["probes"] += 1
+            return True
+
+    def _open(self) -> None:
+        if self._state != OPEN:
+            self._counters["opened"] += 1
+            logger.warning("%s circuit opened after %d failures.", self.name, self._consecutive_failures)
+        self._state = OPEN
+        self._opened_at = self.clock()
+
+    def _record(self, *, probe: bool, failed: bool, latency_ms: float | None) -> None:
+        with self._lock:
+            if latency_ms is not None:
+                self._latencies_ms.append(latency_ms)
+            if probe:
+                self._probe_in_flight = False
+            if failed:
+                self._counters["failures"] += 1
+                self._consecutive_failures += 1
+                if probe or self._consecutive_failures >= self.failure_threshold:
+                    self._open()
+                return
+            self._consecutive_failures = 0
+            if self._state != CLOSED:
+                logger.info("%s circuit closed after a successful probe.", self.name)
+            self._state = CLOSED
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        probe = self._acquire()
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except self.ignored_exceptions:
+            # Erreur propre à l'appelant (pas au service): l'état du circuit ne bouge pas.
+            with self._lock:
+                self._counters["ignored"] += 1
+                if probe:
+                    self._probe_in_flight = False
+            raise
+        except Exception:
+            self._record(probe=probe, failed=True, latency_ms=None)
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000
+        # Un appel abouti mais trop lent compte comme un échec: c'est la latence de queue qu'on borne.
+        slow = latency_ms > self.slow_call_ms
+        if slow:
+            with self._lock:
+                self._counters["slow_calls"] += 1
+        self._record(probe=probe, failed=slow, latency_ms=latency_ms)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = list(self._latencies_ms)
+            state = self._state
+            consecutive_failures = self._consecutive_failures
+        return {
+            **counters,
+            "state": state,
+            "consecutive_failures": consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "slow_call_ms": self.slow_call_ms,
+            "cooldown_s": self.cooldown_s,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3) if latencies else None,
+        }
+
+
+def build_vector_breaker(ignored_exceptions: Tuple[Type[BaseException], ...] = ()) -> CircuitBreaker | None:
+    if not VECTOR_BREAKER_ENABLED:
+        return None
+    return CircuitBreaker("vector", ignored_exceptions=ignored_exceptions)
@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Set
+
+try:
+    import tiktoken
+except ImportError:  # dépendance optionnelle: estimation ~4 caractères par token
+    tiktoken = None
+
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TECH_DOCS_TOKEN_BUDGET = int(os.getenv("PROMPT_TECH_DOCS_TOKEN_BUDGET", "6000"))
+PROMPT_NC_TOKEN_BUDGET = int(os.getenv("PROMPT_NC_TOKEN_BUDGET", "4000"))
+# Plafond par source: un document OCR entier ne doit pas évincer les suivants.
+PROMPT_SOURCE_MAX_TOKENS = int(os.getenv("PROMPT_SOURCE_MAX_TOKENS", "1500"))
+# En dessous, un extrait tronqué n'apporte plus rien: on arrête le remplissage.
+PROMPT_SOURCE_MIN_TOKENS = 64
+PROMPT_TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER_ENCODING", "o200k_base")
+# Part des shingles d'un passage déjà présente dans le contexte au-delà de laquelle il est doublon.
+DUPLICATE_OVERLAP_RATIO = 0.8
+SHINGLE_SIZE = 8
+CHARS_PER_TOKEN = 4
+
+# Seuls champs utiles au modèle: les prompts 000/100 citent 'resultat', 'doc' et 'content'
+# (le passage est toujours envoyé dans 'content', c'est lui qui est borné et dédoublonné).
+PROMPT_SOURCE_FIELDS = (
+    "doc",
+    "resultat",
+    "ATA",
+    "ATA_code",
+    "ATA_category",
+    "doc_type",
+    "parts",
+    "label",
+    "memory_type",
+    "corrections",
+    "content",
+)
+
+WORD_RE = re.compile(r"\w+")
+
+
+class TokenCounter:
+    def __init__(self, encoding_name: str = PROMPT_TOKENIZER_ENCODING):
+        self.encoding = None
+        if tiktoken is None:
+            logger.warning("tiktoken is not installed, estimating prompt tokens from characters.")
+            return
+        try:
+            # Fichier BPE lu depuis TIKTOKEN_CACHE_DIR (pré-rempli dans l'image), téléchargé sinon.
+            self.encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.warning("Tokenizer %s unavailable, estimating tokens from characters: %s", encoding_name, e)
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+        return text[: max_tokens * CHARS_PER_TOKEN]
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> TokenCounter:
+    """Chargé au premier prompt, pas à l'import: un repli sur l'estimation n'est signalé qu'une fois."""
+    return TokenCounter()
+
+
+@dataclass
+class PackingReport:
+    budget: int
+    used_tokens: int = 0
+    packed: int = 0
+    truncated: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    docs: List[str] = field(default_factory=list)
+
+
+def passage_shingles(text: str) -> Set[int]:
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[index : index + SHINGLE_SIZE])) for index in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def prompt_fields(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: item[key] for key in PROMPT_SOURCE_FIELDS if item.get(key) not in (None, "", [])}
+
+
+def pack_sources(
+    items: Sequence[Dict[str, Any]],
+    *,
+    budget: int,
+    counter: TokenCounter | None = None,
+    max_source_tokens: int = PROMPT_SOURCE_MAX_TOKENS,
+) -> tuple[List[Dict[str, Any]], PackingReport]:
+    """Fits ranked sources into a token budget, best-ranked first, skipping near-duplicate passages."""
+    counter = counter or get_token_counter()
+    report = PackingReport(budget=budget)
+    packed: List[Dict[str, Any]] = []
+    seen_shingles: Set[int] = set()
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        source = prompt_fields(item)
+        content = str(source.pop("content", "") or "")
+        shingles = passage_shingles(content)
+        if shingles and len(shingles & seen_shingles) >= DUPLICATE_OVERLAP_RATIO * len(shingles):
+            report.duplicates += 1
+            continue
+
+        # Enveloppe JSON de la source sans son contenu (doc, ATA...), séparateurs compris.
+        overhead = counter.count(json.dumps({**source, "content": ""}, ensure_ascii=False)) + 2
+        remaining = budget - report.used_tokens - overhead
+        if remaining < PROMPT_SOURCE_MIN_TOKENS:
+            report.dropped += len(items) - index
+            break
+        content_budget = min(remaining, max_source_tokens)
+        content_tokens = counter.count(content)
+        if content_tokens > content_budget:
+            content = counter.truncate(content, content_budget)
+            content_tokens = counter.count(content)
+            report.truncated += 1
+
+        packed.append({**source, "content": content})
+        seen_shingles |= shingles
+        report.used_tokens += overhead + content_tokens
+        report.packed += 1
+        report.docs.append(str(source.get("doc", "")))
+    return packed, report
+
+
+def pack_search_results(formatted: Any, *, budget: int, label: str) -> Any:
+    """Packs a format_search_results payload ({"sources": [...]}) for a prompt input."""
+    if not isinstance(formatted, dict) or not isinstance(formatted.get("sources"), list):
+        return formatted
+    packed, report = pack_sources(formatted["sources"], budget=budget)
+    logger.info(
+        "Packed %s sources: %d/%d kept, %d tokens of %d, %d truncated, %d duplicates.",
+        label,
+        report.packed,
+        len(formatted["sources"]),
+        report.used_tokens,
+        report.budget,
+        report.truncated,
+        report.duplicates,
+    )
+    return {**formatted, "sources": packed}
+
+
+def build_prompt_source_inputs(sources: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "search_docs": json.dumps(
+            pack_search_results(sources.get("tech_docs"), budget=PROMPT_TECH_DOCS_TOKEN_BUDGET, label="tech_docs")
+        ),
+        "search_nc": json.dumps(
+            pack_search_results(sources.get("non_conformities"), budget=PROMPT_NC_TOKEN_BUDGET, label="non_conformities")
+        ),
+    }
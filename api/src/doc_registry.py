@@ -0,0 +1,195 @@
+import argparse
+import logging
+import pathlib
+import sqlite3
+import threading
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = pathlib.Path(__file__).parent.parent
+DOC_REGISTRY_PATH = SCRIPT_DIR / "data" / "doc-registry.sqlite3"
+
+
+@lru_cache(maxsize=65536)
+def document_identity(doc: str) -> str:
+    """Identité d'un document partagée par tous les canaux: stem du nom de fichier, en minuscules."""
+    return pathlib.Path(str(doc).split(" ")[0]).stem.lower()
+
+
+class DocRegistry:
+    """Stable integer ids per (corpus, document identity), shared by the lexical and vector indexes.
+
+    Ids are assigned append-only by the index-build steps (dataprep, lexical rebuild) and never
+    reused; the query path only reads them. Each registry file carries a random registry_id: an
+    index records the registry_id its doc_ids come from and they are only trusted when it matches.
+    """
+
+    def __init__(self, path: pathlib.Path = DOC_REGISTRY_PATH):
+        self.path = pathlib.Path(path)
+        self._lock = threading.Lock()
+        self._ids: Dict[str, Dict[str, int]] = {}
+        self._registry_id: str | None = None
+        self._loaded_mtime_ns: int | None = None
+
+    def connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.row_factory = sqlite3.Row
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                corpus TEXT NOT NULL,
+                identity TEXT NOT NULL,
+                doc TEXT NOT NULL,
+                chunk_id TEXT,
+                source_path TEXT,
+                ata TEXT,
+                UNIQUE(corpus, identity)
+            )
+            """
+        )
+        # Même schéma que dataprep/src/doc_registry.py, qui attribue les ids des collections Chroma.
+        connection.execute("CREATE TABLE IF NOT EXISTS registry_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        with connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO registry_meta(key, value) VALUES('registry_id', ?)",
+                (uuid.uuid4().hex,),
+            )
+        return connection
+
+    def assign(self, corpus: str, records: Sequence[Mapping[str, Any]]) -> List[int]:
+        """Registers records (doc, chunk_id, source_path, ATA) and returns their ids, in order."""
+        rows = [
+            (
+                corpus,
+                document_identity(str(record.get("doc") or "")),
+                str(record.get("doc") or ""),
+                record.get("chunk_id"),
+                record.get("source_path"),
+                record.get("ata") or record.get("ATA"),
+            )
+            for record in records
+        ]
+        connection = self.connect()
+        with connection:
+            # Un id existant est conservé; seules les métadonnées descriptives sont rafraîchies.
+            connection.executemany(
+                """
+                INSERT INTO documents(corpus, identity, doc, chunk_id, source_path, ata)
+                VALUES(?, ?, ?, ?, ?, ?)
+                ON CONFLICT(corpus, identity) DO UPDATE SET
+                    source_path = COALESCE(excluded.source_path, documents.source_path),
+                    ata = COALESCE(NULLIF(excluded.ata, ''), documents.ata)
+                """,
+                [row for row in rows if row[1]],
+            )
+            ids = {
+                row["identity"]: row["doc_id"]
+                for row in connection.execute(
+                    "SELECT identity, doc_id FROM documents WHERE corpus = ?",
+                    (corpus,),
+                )
+            }
+        connection.close()
+        with self._lock:
+            self._ids[corpus] = ids
+        return [ids.get(row[1], -1) for row in rows]
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._ids = {}
+            self._registry_id = None
+            self._loaded_mtime_ns = None
+            return
+        if mtime_ns == self._loaded_mtime_ns:
+            return
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        registry_id = None
+        try:
+            ids: Dict[str, Dict[str, int]] = {}
+            for corpus, identity, doc_id in connection.execute("SELECT corpus, identity, doc_id FROM documents"):
+                ids.setdefault(corpus, {})[identity] = doc_id
+            row = connection.execute("SELECT value FROM registry_meta WHERE key = 'registry_id'").fetchone()
+            registry_id = row[0] if row else None
+        except sqlite3.Error as e:
+            logger.warning("Document registry %s is unreadable: %s", self.path, e)
+            ids = {}
+        finally:
+            connection.close()
+        self._ids = ids
+        self._registry_id = registry_id
+        self._loaded_mtime_ns = mtime_ns
+
+    def registry_id(self) -> str | None:
+        """Identifies this registry file; None when it does not exist yet."""
+        with self._lock:
+            self._reload_if_changed()
+            return self._registry_id
+
+    def ids_for(self, corpus: str, docs: Iterable[Any]) -> List[int]:
+        """Registered ids for the given docs, -1 when a doc is unknown."""
+        with self._lock:
+            self._reload_if_changed()
+            ids = self._ids.get(corpus, {})
+        return [ids.get(document_identity(str(doc or "")), -1) for doc in docs]
+
+    def describe(self, doc_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        if not doc_ids or not self.path.exists():
+            return {}
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        placeholders = ",".join("?" for _ in doc_ids)
+        rows = connection.execute(
+            f"SELECT * FROM documents WHERE doc_id IN ({placeholders})",
+            [int(doc_id) for doc_id in doc_ids],
+        ).fetchall()
+        connection.close()
+        return {row["doc_id"]: dict(row) for row in rows}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._reload_if_changed()
+            return {
+                "path": str(self.path),
+                "registry_id": self._registry_id,
+                "documents": {corpus: len(ids) for corpus, ids in self._ids.items()},
+            }
+
+
+@lru_cache(maxsize=None)
+def get_doc_registry(path: pathlib.Path = DOC_REGISTRY_PATH) -> DocRegistry:
+    return DocRegistry(path)
+
+
+def registry_matches(path: pathlib.Path | None, registry_id: str | None) -> bool:
+    """True when an index's doc_ids come from the registry loaded at runtime (else: string identity)."""
+    if path is None or not registry_id:
+        return False
+    return get_doc_registry(path).registry_id() == registry_id
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Show the document registry. Ids are assigned by dataprep/src/create_*_db.py (Chroma metadata "
+            "doc_id) and by the lexical rebuild; vector exports carry them over from Chroma."
+        ),
+    )
+    parser.add_argument("--path", type=pathlib.Path, default=DOC_REGISTRY_PATH, help="Registry file.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print(get_doc_registry(args.path).stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import hashlib
+import logging
+import math
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = pathlib.Path(__file__).parent.parent
+DEFAULT_EMBEDDING_CACHE_PATH = pathlib.Path(
+    os.getenv(
+        "RETRIEVAL_EMBEDDING_CACHE_PATH",
+        SCRIPT_DIR / "data" / "cache" / "query_embeddings.sqlite3",
+    )
+)
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("RETRIEVAL_EMBEDDING_CACHE_MEMORY_ENTRIES", "1024"))
+EMBEDDING_CACHE_DISK_MAX_MB = float(os.getenv("RETRIEVAL_EMBEDDING_CACHE_DISK_MAX_MB", "256"))
+# Après éviction, on redescend sous ce ratio de la taille max pour ne pas évincer à chaque écriture.
+EVICTION_TARGET_RATIO = 0.9
+
+
+def normalize_cache_text(value: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", str(value)).split()).casefold()
+
+
+def build_cache_key(model: str, text: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_cache_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """In-process LRU in front of a SQLite store shared by every worker on the node."""
+
+    def __init__(
+        self,
+        db_path: pathlib.Path | str | None = None,
+        *,
+        memory_entries: int = EMBEDDING_CACHE_MEMORY_ENTRIES,
+        disk_max_bytes: int = int(EMBEDDING_CACHE_DISK_MAX_MB * 1024 * 1024),
+    ):
+        self.db_path = pathlib.Path(db_path or DEFAULT_EMBEDDING_CACHE_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.memory_entries = max(memory_entries, 0)
+        self.disk_max_bytes = max(disk_max_bytes, 0)
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+        }
+        self.ensure_schema()
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=5.0)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def ensure_schema(self) -> None:
+        connection = self.connect()
+        with connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    normalized_text TEXT NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    byte_size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used
+                ON query_embeddings(last_used_at)
+                """
+            )
+        connection.close()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def _remember(self, cache_key: str, vector: np.ndarray) -> None:
+        if self.memory_entries == 0:
+            return
+        with self._lock:
+            self._memory[cache_key] = vector
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        keys_by_text = {text: build_cache_key(model, text) for text in dict.fromkeys(texts)}
+        found: Dict[str, np.ndarray] = {}
+        pending: Dict[str, list[str]] = {}
+
+        with self._lock:
+            for text, cache_key in keys_by_text.items():
+                vector = self._memory.get(cache_key)
+                if vector is None:
+                    pending.setdefault(cache_key, []).append(text)
+                    continue
+                self._memory.move_to_end(cache_key)
+                found[text] = vector
+        self._count("memory_hits", len(found))
+
+        if pending:
+            placeholders = ", ".join("?" for _ in pending)
+            connection = self.connect()
+            with connection:
+                rows = connection.execute(
+                    f"""
+                    SELECT cache_key, dimensions, vector
+                    FROM query_embeddings
+                    WHERE cache_key IN ({placeholders})
+                    """,
+                    tuple(pending),
+                ).fetchall()
+                if rows:
+                    connection.execute(
+                        f"""
+                        UPDATE query_embeddings
+                        SET last_used_at = ?
+                        WHERE cache_key IN ({", ".join("?" for _ in rows)})
+                        """,
+                        (time.time(), *(row["cache_key"] for row in rows)),
+                    )
+            connection.close()
+
+            for row in rows:
+                vector = np.frombuffer(row["vector"], dtype="<f4").reshape(row["dimensions"])
+                self._remember(row["cache_key"], vector)
+                for text in pending.pop(row["cache_key"]):
+                    found[text] = vector
+            self._count("disk_hits", len(rows))
+            self._count("misses", len(pending))
+
+        return found
+
+    def put_many(self, model: str, vectors: Mapping[str, Any]) -> None:
+        if not vectors:
+            return
+
+        timestamp = time.time()
+        rows = []
+        for text, value in vectors.items():
+            vector = np.ascontiguousarray(value, dtype="<f4").reshape(-1)
+            cache_key = build_cache_key(model, text)
+            self._remember(cache_key, vector)
+            payload = vector.tobytes()
+            rows.append(
+                (
+                    cache_key,
+                    model,
+                    normalize_cache_text(text),
+                    int(vector.shape[0]),
+                    payload,
+                    len(payload),
+                    timestamp,
+                    timestamp,
+                )
+            )
+
+        connection = self.connect()
+        with connection:
+            connection.executemany(
+                """
+                INSERT INTO query_embeddings(
+                    cache_key,
+                    model,
+                    normalized_text,
+                    dimensions,
+                    vector,
+                    byte_size,
+                    created_at,
+                    last_used_at
+                )
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET last_used_at = excluded.last_used_at
+                """,
+                rows,
+            )
+            self._evict_overflow(connection)
+        connection.close()
+        self._count("writes", len(rows))
+
+    def _evict_overflow(self, connection: sqlite3.Connection) -> None:
+        row = connection.execute(
+            "SELECT COUNT(*) AS count, COALESCE(SUM(byte_size), 0) AS total FROM query_embeddings"
+        ).fetchone()
+        if row["total"] <= self.disk_max_bytes or row["count"] == 0:
+            return
+
+        average_size = row["total"] / row["count"]
+        overflow = row["total"] - self.disk_max_bytes * EVICTION_TARGET_RATIO
+        evict_count = min(row["count"], max(1, math.ceil(overflow / average_size)))
+        connection.execute(
+            """
+            DELETE FROM query_embeddings
+            WHERE cache_key IN (
+                SELECT cache_key
+                FROM query_embeddings
+                ORDER BY last_used_at ASC
+                LIMIT ?
+            )
+            """,
+            (evict_count,),
+        )
+        self._count("evictions", evict_count)
+        logger.info("Evicted %d query embeddings from %s", evict_count, self.db_path)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            memory_size = len(self._memory)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "memory_size": memory_size,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "db_path": str(self.db_path),
+        }
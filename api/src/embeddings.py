@@ -0,0 +1,86 @@
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache
+
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("RETRIEVAL_EMBEDDING_MODEL", "text-embedding-3-large")
+# Borne chaque appel d'embedding: au-delà, l'échec alimente le disjoncteur du canal vectoriel.
+EMBEDDING_TIMEOUT_S = float(os.getenv("RETRIEVAL_EMBEDDING_TIMEOUT_S", "10"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("RETRIEVAL_EMBEDDING_MAX_RETRIES", "1"))
+
+
+def _feature_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "t")
+
+
+class EmbeddingCacheMiss(LookupError):
+    pass
+
+
+@lru_cache(maxsize=1)
+def get_openai_client():
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=EMBEDDING_TIMEOUT_S,
+        max_retries=EMBEDDING_MAX_RETRIES,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> EmbeddingCache | None:
+    if not _feature_flag("RETRIEVAL_EMBEDDING_CACHE_ENABLED", "true"):
+        return None
+    try:
+        return EmbeddingCache()
+    except Exception as exc:
+        logger.warning("Query embedding cache unavailable, continuing without it: %s", exc)
+        return None
+
+
+def request_embeddings(texts: Sequence[str]) -> List[List[float]]:
+    response = get_openai_client().embeddings.create(model=EMBEDDING_MODEL, input=list(texts))
+    ordered = sorted(response.data, key=lambda item: item.index)
+    return [item.embedding for item in ordered]
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    inputs = [str(text) for text in texts]
+    if not inputs:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    cache = get_embedding_cache()
+    vectors: Dict[str, np.ndarray] = {}
+    if cache:
+        try:
+            vectors = cache.get_many(EMBEDDING_MODEL, inputs)
+        except Exception as exc:
+            logger.warning("Query embedding cache lookup failed: %s", exc)
+    missing = [text for text in dict.fromkeys(inputs) if text not in vectors]
+
+    if missing:
+        # Mode rejeu: les évaluations hors ligne ne doivent jamais sortir sur le réseau.
+        if _feature_flag("RETRIEVAL_EMBEDDING_OFFLINE", "false"):
+            raise EmbeddingCacheMiss(
+                f"{len(missing)} query embeddings missing from cache in offline mode"
+            )
+        fetched = {
+            text: np.asarray(vector, dtype=np.float32)
+            for text, vector in zip(missing, request_embeddings(missing))
+        }
+        if cache:
+            try:
+                cache.put_many(EMBEDDING_MODEL, fetched)
+            except Exception as exc:
+                logger.warning("Query embedding cache write failed: %s", exc)
+        vectors.update(fetched)
+
+    return np.stack([vectors[text] for text in inputs])
@@ -0,0 +1,58 @@
+import os
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping
+
+
+HIT_SNIPPET_CHARS = int(os.getenv("RETRIEVAL_HIT_SNIPPET_CHARS", "300"))
+# Champs lourds: absents des hits légers, rechargés pour le top-k final seulement.
+HEAVY_HIT_FIELDS = ("content", "json_data")
+# Références internes vers la source du contenu complet, retirées après hydratation.
+LEXICAL_REF_FIELD = "lexical_rowid"
+VECTOR_ROW_REF_FIELD = "vector_row"
+VECTOR_ID_REF_FIELD = "vector_id"
+HIT_REF_FIELDS = (LEXICAL_REF_FIELD, VECTOR_ROW_REF_FIELD, VECTOR_ID_REF_FIELD)
+
+PayloadLoader = Callable[[List[Hashable]], Mapping[Hashable, Dict[str, Any]]]
+
+
+def make_snippet(text: Any, max_chars: int = HIT_SNIPPET_CHARS) -> str:
+    return str(text or "")[:max_chars]
+
+
+def lighten_hit(item: Mapping[str, Any], **refs: Any) -> Dict[str, Any]:
+    hit = {key: value for key, value in item.items() if key not in HEAVY_HIT_FIELDS}
+    hit["snippet"] = make_snippet(item.get("content"))
+    hit.update(refs)
+    return hit
+
+
+def collect_refs(results: Iterable[Mapping[str, Any]], field: str) -> List[Hashable]:
+    return list(dict.fromkeys(item[field] for item in results if item.get(field) is not None))
+
+
+def hydrate_hits(
+    results: List[Dict[str, Any]],
+    loaders: Mapping[str, PayloadLoader],
+) -> List[Dict[str, Any]]:
+    """Loads full payloads for the given hits, one batched lookup per reference kind."""
+    loaded: Dict[str, Mapping[Hashable, Dict[str, Any]]] = {}
+    for field, loader in loaders.items():
+        refs = collect_refs(results, field)
+        loaded[field] = loader(refs) if refs else {}
+
+    hydrated: List[Dict[str, Any]] = []
+    for item in results:
+        result = {key: value for key, value in item.items() if key not in HIT_REF_FIELDS and key != "snippet"}
+        contents = [result["content"]] if result.get("content") else []
+        for field in HIT_REF_FIELDS:
+            payload = loaded.get(field, {}).get(item.get(field))
+            if payload is None:
+                continue
+            for key, value in payload.items():
+                if key != "content" and result.get(key) in (None, "", []):
+                    result[key] = value
+            if payload.get("content"):
+                contents.append(payload["content"])
+        # Contenu le plus long parmi les sources, comme lors de la fusion; à défaut, le snippet.
+        result["content"] = max(contents, key=lambda text: len(str(text))) if contents else item.get("snippet", "")
+        hydrated.append(result)
+    return hydrated
@@ -1,18 +1,68 @@
 import argparse
 import hashlib
+import itertools
 import logging
+import os
 import pathlib
+import queue
 import re
 import sqlite3
+import threading
+import time
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from src.doc_registry import DOC_REGISTRY_PATH, get_doc_registry, registry_matches
+from src.hit_hydration import HIT_SNIPPET_CHARS, LEXICAL_REF_FIELD
 
 
 logger = logging.getLogger(__name__)
 
 SCRIPT_DIR = pathlib.Path(__file__).parent.parent
 TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+# Incrémenté à chaque changement de colonnes FTS5: force la reconstruction des index existants.
+LEXICAL_SCHEMA_VERSION = "6"
+# "ATA 28", "ATA-28", "ata28", "ATA_28" -> "28"
+ATA_RE = re.compile(r"\bata[\s_-]*(\d{2})\b")
+# Les noms de fichiers NC commencent par "ATA-xx-...".
+ATA_DOC_PREFIX_RE = re.compile(r"^ata[\s_-]*(\d{2})(?!\d)")
+# Ouverture des index au runtime: "ro" (lecture seule), "immutable" (images prod figées, aucun
+# verrou ni relecture), "rw" (dev). Seul "rw" reconstruit un index absent ou périmé à la demande;
+# ailleurs le canal lexical ne renvoie rien jusqu'à `python -m src.lexical_search`.
+SUPPORTED_LEXICAL_SQLITE_MODES = ("ro", "immutable", "rw")
+LEXICAL_SQLITE_MODE = os.getenv("RETRIEVAL_LEXICAL_SQLITE_MODE", "ro").strip().lower()
+if LEXICAL_SQLITE_MODE not in SUPPORTED_LEXICAL_SQLITE_MODES:
+    logger.warning("Unknown RETRIEVAL_LEXICAL_SQLITE_MODE=%s, falling back to ro.", LEXICAL_SQLITE_MODE)
+    LEXICAL_SQLITE_MODE = "ro"
+# Connexions inactives conservées par corpus.
+LEXICAL_POOL_SIZE = int(os.getenv("RETRIEVAL_LEXICAL_POOL_SIZE", "4"))
+# Intervalle minimal entre deux stat() du fichier d'index (comme pour les index vectoriels).
+LEXICAL_INDEX_CHECK_INTERVAL_SECONDS = float(os.getenv("RETRIEVAL_INDEX_CHECK_INTERVAL_SECONDS", "5"))
+# Passages indexés: fenêtres de caractères chevauchantes, classées par BM25 puis regroupées par document.
+LEXICAL_PASSAGE_CHARS = int(os.getenv("RETRIEVAL_LEXICAL_PASSAGE_CHARS", "1200"))
+LEXICAL_PASSAGE_OVERLAP = int(os.getenv("RETRIEVAL_LEXICAL_PASSAGE_OVERLAP", "200"))
+# Passages lus par document demandé avant regroupement (doublé tant qu'il manque des documents).
+LEXICAL_PASSAGE_FANOUT = int(os.getenv("RETRIEVAL_LEXICAL_PASSAGE_FANOUT", "4"))
+LEXICAL_PASSAGES_PER_HIT = 3
+LEXICAL_SNIPPET_TOKENS = 32
+# Index de préfixes FTS5 pour les requêtes "token*" courtes (les préfixes plus longs restent en scan de termes).
+LEXICAL_FTS_PREFIXES = "2 3 4"
+# Construction complète: lecture / découpage en processus parallèles, insertion par lots dans une base temporaire.
+LEXICAL_BUILD_WORKERS = int(os.getenv("RETRIEVAL_LEXICAL_BUILD_WORKERS", str(os.cpu_count() or 1)))
+LEXICAL_BUILD_BATCH_SIZE = int(os.getenv("RETRIEVAL_LEXICAL_BUILD_BATCH_SIZE", "500"))
+# En dessous, le coût de démarrage des processus dépasse le gain.
+LEXICAL_BUILD_MIN_FILES_PER_WORKER = 64
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -131072",
+)
 
 
 @dataclass(frozen=True)
@@ -21,6 +71,8 @@ class LexicalCorpusConfig:
     source_root: pathlib.Path
     file_glob: str
     db_path: pathlib.Path
+    # Registre d'ids de documents partagé avec les index vectoriels (None: pas de doc_id).
+    registry_path: pathlib.Path | None = None
 
 
 TECH_DOCS_LEXICAL_CONFIG = LexicalCorpusConfig(
@@ -28,6 +80,7 @@ TECH_DOCS_LEXICAL_CONFIG = LexicalCorpusConfig(
     source_root=SCRIPT_DIR / "data" / "a220-tech-docs" / "ocr",
     file_glob="*.md",
     db_path=SCRIPT_DIR / "data" / "a220-tech-docs" / "lexical" / "fts.sqlite3",
+    registry_path=DOC_REGISTRY_PATH,
 )
 
 NC_LEXICAL_CONFIG = LexicalCorpusConfig(
@@ -35,6 +88,7 @@ NC_LEXICAL_CONFIG = LexicalCorpusConfig(
     source_root=SCRIPT_DIR / "data" / "a220-non-conformities" / "md",
     file_glob="*.md",
     db_path=SCRIPT_DIR / "data" / "a220-non-conformities" / "lexical" / "fts.sqlite3",
+    registry_path=DOC_REGISTRY_PATH,
 )
 
 DEFAULT_LEXICAL_CORPORA = {
@@ -71,10 +125,61 @@ def build_match_query(value: str, *, operator: str = "AND") -> str:
     return joiner.join(f"{token}*" for token in tokens)
 
 
+def extract_ata_chapters(value: str) -> List[str]:
+    return list(dict.fromkeys(ATA_RE.findall(normalize_text(str(value or "")))))
+
+
+def build_ata_filter(chapters: Iterable[str]) -> str:
+    values = [chapter for chapter in dict.fromkeys(chapters) if chapter.isdigit()]
+    if not values:
+        return ""
+    return f"ata : ({' OR '.join(values)})"
+
+
+def infer_document_ata(path: pathlib.Path, content: str) -> str:
+    # Même règle que la dataprep: préfixe ATA-xx du fichier, sinon première mention ATA du texte.
+    match = ATA_DOC_PREFIX_RE.match(normalize_text(path.name)) or ATA_RE.search(
+        normalize_text(content)
+    )
+    return match.group(1) if match else ""
+
+
 def iter_corpus_files(config: LexicalCorpusConfig) -> List[pathlib.Path]:
     return sorted(config.source_root.glob(config.file_glob))
 
 
+def split_passages(
+    content: str,
+    size: int = LEXICAL_PASSAGE_CHARS,
+    overlap: int = LEXICAL_PASSAGE_OVERLAP,
+) -> List[Tuple[int, int]]:
+    """(start, end) character offsets of overlapping passages, cut on whitespace when possible."""
+    if size <= 0 or len(content) <= size:
+        return [(0, len(content))]
+    overlap = min(max(overlap, 0), size // 2)
+    passages = []
+    start = 0
+    while start < len(content):
+        end = min(start + size, len(content))
+        if len(content) - end < size // 4:
+            # Reste trop court pour un passage à part: un passage minuscule fausserait la normalisation BM25.
+            end = len(content)
+        if end < len(content):
+            cut = content.rfind(" ", start + size // 2, end)
+            end = cut if cut > start else end
+        passages.append((start, end))
+        if end >= len(content):
+            break
+        next_start = end - overlap
+        space = content.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return passages
+
+
+def passage_layout() -> str:
+    return f"{LEXICAL_PASSAGE_CHARS}:{LEXICAL_PASSAGE_OVERLAP}"
+
+
 def compute_corpus_fingerprint(paths: Iterable[pathlib.Path]) -> Dict[str, Any]:
     digest = hashlib.sha256()
     count = 0
@@ -106,15 +211,39 @@ def ensure_schema(connection: sqlite3.Connection) -> None:
         )
         """
     )
+    if read_meta(connection, "schema_version") != LEXICAL_SCHEMA_VERSION:
+        # Ancien schéma (sans colonne ata, doc_id ou manifeste): la table est recréée puis reconstruite.
+        connection.execute("DROP TABLE IF EXISTS lexical_documents")
+        connection.execute("DROP TABLE IF EXISTS lexical_files")
+        connection.execute("DELETE FROM lexical_meta WHERE key = 'fingerprint'")
+        write_meta(connection, "schema_version", LEXICAL_SCHEMA_VERSION)
+        connection.commit()
     connection.execute(
-        """
+        f"""
         CREATE VIRTUAL TABLE IF NOT EXISTS lexical_documents
         USING fts5(
             doc,
             chunk_id,
             content,
             source_path UNINDEXED,
-            tokenize = 'unicode61 remove_diacritics 2'
+            ata,
+            doc_id UNINDEXED,
+            char_start UNINDEXED,
+            char_end UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '{LEXICAL_FTS_PREFIXES}'
+        )
+        """
+    )
+    # Manifeste par fichier source: seul ce qui a changé depuis la dernière construction est réindexé.
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS lexical_files (
+            source_path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            passage_rowids TEXT NOT NULL
         )
         """
     )
@@ -139,10 +268,379 @@ def write_meta(connection: sqlite3.Connection, key: str, value: str) -> None:
     )
 
 
+def connect_fts_reader(db_path: pathlib.Path, mode: str = LEXICAL_SQLITE_MODE) -> sqlite3.Connection:
+    """Query-path connection: never runs DDL, shareable across the request threads."""
+    if mode == "rw":
+        connection = sqlite3.connect(db_path, check_same_thread=False)
+    else:
+        options = "immutable=1" if mode == "immutable" else "mode=ro"
+        connection = sqlite3.connect(f"file:{db_path}?{options}", uri=True, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def read_index_summary(connection: sqlite3.Connection) -> Dict[str, Any]:
+    try:
+        schema_version = read_meta(connection, "schema_version")
+        fingerprint = read_meta(connection, "fingerprint")
+        document_count = read_meta(connection, "document_count")
+        doc_registry_id = read_meta(connection, "doc_registry_id")
+    except sqlite3.Error:
+        return {"schema_version": None, "fingerprint": None, "document_count": 0, "doc_registry_id": None}
+    if fingerprint is not None and document_count is None:
+        # Index antérieur au compteur en méta: un seul COUNT(*) par ouverture de l'index.
+        document_count = connection.execute("SELECT COUNT(*) AS count FROM lexical_files").fetchone()["count"]
+    return {
+        "schema_version": schema_version,
+        "fingerprint": fingerprint,
+        "document_count": int(document_count or 0),
+        "doc_registry_id": doc_registry_id,
+    }
+
+
+def index_file_signature(db_path: pathlib.Path) -> Tuple[int, int, int] | None:
+    try:
+        stat = db_path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class LexicalIndexPool:
+    """Reusable read connections to one FTS index, reopened only when the index file changes."""
+
+    def __init__(
+        self,
+        config: "LexicalCorpusConfig",
+        *,
+        mode: str = LEXICAL_SQLITE_MODE,
+        size: int = LEXICAL_POOL_SIZE,
+        check_interval: float = LEXICAL_INDEX_CHECK_INTERVAL_SECONDS,
+    ):
+        self.config = config
+        self.mode = mode
+        self.size = max(size, 0)
+        self.check_interval = check_interval
+        self._idle: "queue.LifoQueue[Tuple[int, sqlite3.Connection]]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._signature: Tuple[int, int, int] | None = None
+        self._checked_at = float("-inf")
+        self._summary: Dict[str, Any] | None = None
+        self._opened = 0
+        # Index absents / périmés déjà signalés: un seul warning par état du fichier.
+        self._reported_unavailable: set = set()
+
+    def _close_idle(self) -> None:
+        while True:
+            try:
+                _, connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            connection.close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._signature = None
+            self._summary = None
+            self._checked_at = float("-inf")
+            self._close_idle()
+
+    def _refresh(self) -> Dict[str, Any]:
+        """Opens (or reopens) the index generation; the only place that may build the index."""
+        now = time.monotonic()
+        summary = self._summary
+        if summary is not None and now - self._checked_at < self.check_interval:
+            return summary
+        with self._lock:
+            signature = index_file_signature(self.config.db_path)
+            if self._summary is not None and signature == self._signature:
+                self._checked_at = time.monotonic()
+                return self._summary
+
+            summary = None
+            if signature is not None:
+                connection = connect_fts_reader(self.config.db_path, self.mode)
+                summary = read_index_summary(connection)
+                connection.close()
+            if summary is None or summary["fingerprint"] is None or summary["schema_version"] != LEXICAL_SCHEMA_VERSION:
+                if self.mode != "rw":
+                    # Aucun DDL sur le chemin de requête: l'index est construit hors service.
+                    message = (
+                        f"Lexical index for {self.config.name} is missing or stale at {self.config.db_path} "
+                        f"({self.mode} mode never rebuilds; run python -m src.lexical_search)"
+                    )
+                    if signature not in self._reported_unavailable:
+                        logger.warning(message)
+                        self._reported_unavailable.add(signature)
+                    raise FileNotFoundError(message)
+                # Chemin de service (thread d'un worker uvicorn): jamais de pool de processus ici,
+                # le build parallèle est réservé à la CLI / au dataprep.
+                rebuild_lexical_index(self.config, reset_pool=False, workers=1)
+                signature = index_file_signature(self.config.db_path)
+                connection = connect_fts_reader(self.config.db_path, self.mode)
+                summary = read_index_summary(connection)
+                connection.close()
+
+            if signature != self._signature:
+                self._generation += 1
+                self._close_idle()
+            self._signature = signature
+            self._summary = summary
+            self._checked_at = time.monotonic()
+            return summary
+
+    def summary(self) -> Dict[str, Any]:
+        summary = self._refresh()
+        return {
+            "corpus": self.config.name,
+            "db_path": str(self.config.db_path),
+            "source_root": str(self.config.source_root),
+            "document_count": summary["document_count"],
+            "fingerprint": summary["fingerprint"],
+            "doc_registry_id": summary["doc_registry_id"],
+            "rebuilt": False,
+        }
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        self._refresh()
+        try:
+            generation, connection = self._idle.get_nowait()
+        except queue.Empty:
+            generation, connection = self._generation, connect_fts_reader(self.config.db_path, self.mode)
+            with self._lock:
+                self._opened += 1
+        try:
+            yield connection
+        finally:
+            # Une connexion d'une génération précédente (index reconstruit) n'est pas remise dans le pool.
+            if generation == self._generation and self._idle.qsize() < self.size:
+                self._idle.put((generation, connection))
+            else:
+                connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "generation": self._generation,
+            "idle": self._idle.qsize(),
+            "opened": self._opened,
+            "document_count": self._summary["document_count"] if self._summary else None,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_lexical_pool(config: "LexicalCorpusConfig") -> LexicalIndexPool:
+    return LexicalIndexPool(config)
+
+
+def read_lexical_fingerprint(config: LexicalCorpusConfig) -> str | None:
+    """Fingerprint recorded by the last rebuild, None when the index does not exist yet."""
+    if not config.db_path.exists():
+        return None
+    try:
+        return get_lexical_pool(config).summary()["fingerprint"]
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Lexical index %s is not readable: %s", config.db_path, e)
+        return None
+
+
+def read_file_manifest(connection: sqlite3.Connection) -> Dict[str, sqlite3.Row]:
+    return {
+        row["source_path"]: row
+        for row in connection.execute(
+            "SELECT source_path, size, mtime_ns, content_hash, passage_rowids FROM lexical_files"
+        )
+    }
+
+
+def parse_rowids(value: str) -> List[int]:
+    return [int(item) for item in str(value or "").split()]
+
+
+def read_lexical_file(
+    source_path: str,
+    passage_chars: int = LEXICAL_PASSAGE_CHARS,
+    passage_overlap: int = LEXICAL_PASSAGE_OVERLAP,
+) -> Dict[str, Any]:
+    """Reads, hashes and splits one source file; runs in the bulk-build worker processes."""
+    path = pathlib.Path(source_path)
+    stat = path.stat()
+    content = path.read_text(encoding="utf-8", errors="ignore")
+    return {
+        "doc": path.name,
+        "chunk_id": path.stem,
+        "content": content,
+        "source_path": source_path,
+        "ata": infer_document_ata(path, content),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "content_hash": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        "passages": split_passages(content, passage_chars, passage_overlap),
+        "passage_rowids": [],
+    }
+
+
+def effective_build_workers(workers: int, file_count: int) -> int:
+    return min(max(workers, 1), max(file_count // LEXICAL_BUILD_MIN_FILES_PER_WORKER, 1))
+
+
+def read_lexical_files(paths: Sequence[pathlib.Path], workers: int = LEXICAL_BUILD_WORKERS) -> List[Dict[str, Any]]:
+    workers = effective_build_workers(workers, len(paths))
+    source_paths = [str(path) for path in paths]
+    if workers == 1:
+        return [read_lexical_file(source_path) for source_path in source_paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                read_lexical_file,
+                source_paths,
+                itertools.repeat(LEXICAL_PASSAGE_CHARS),
+                itertools.repeat(LEXICAL_PASSAGE_OVERLAP),
+                chunksize=max(len(source_paths) // (workers * 4), 1),
+            )
+        )
+
+
+def diff_corpus_files(
+    paths: Sequence[pathlib.Path],
+    manifest: Dict[str, sqlite3.Row],
+) -> Dict[str, Any]:
+    """Compares the corpus with the manifest: stat first, content hash only when size or mtime moved."""
+    changed: List[Dict[str, Any]] = []
+    touched: List[tuple] = []
+    unchanged = 0
+    for path in paths:
+        stat = path.stat()
+        source_path = str(path)
+        entry = manifest.get(source_path)
+        if entry is not None and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            unchanged += 1
+            continue
+        record = read_lexical_file(source_path)
+        if entry is not None and entry["content_hash"] == record["content_hash"]:
+            # Fichier touché (copie, checkout) sans changement de contenu: seul le manifeste bouge.
+            touched.append((record["size"], record["mtime_ns"], source_path))
+            unchanged += 1
+            continue
+        if entry is not None:
+            record["passage_rowids"] = parse_rowids(entry["passage_rowids"])
+        changed.append(record)
+    current = {str(path) for path in paths}
+    removed = [entry for source_path, entry in manifest.items() if source_path not in current]
+    return {"changed": changed, "touched": touched, "removed": removed, "unchanged": unchanged}
+
+
+def assign_doc_ids(config: LexicalCorpusConfig, records: Sequence[Dict[str, Any]]) -> tuple[List[Any], str | None]:
+    """Registry ids of the records, with the registry_id recorded in lexical_meta next to them."""
+    if config.registry_path is None:
+        return [None] * len(records), None
+    registry = get_doc_registry(config.registry_path)
+    doc_ids = registry.assign(config.name, records) if records else []
+    return doc_ids, registry.registry_id()
+
+
+def build_lexical_index_bulk(
+    config: LexicalCorpusConfig,
+    paths: Sequence[pathlib.Path] | None = None,
+    *,
+    fingerprint: str | None = None,
+    workers: int = LEXICAL_BUILD_WORKERS,
+    batch_size: int = LEXICAL_BUILD_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """Full build into a fresh temp DB, merged with FTS5 optimize, then renamed over the live index."""
+    started = time.perf_counter()
+    paths = list(paths) if paths is not None else iter_corpus_files(config)
+    if fingerprint is None:
+        fingerprint = compute_corpus_fingerprint(paths)["fingerprint"]
+    records = read_lexical_files(paths, workers)
+    read_seconds = time.perf_counter() - started
+    doc_ids, doc_registry_id = assign_doc_ids(config, records)
+
+    tmp_path = config.db_path.with_name(f"{config.db_path.name}.build-{os.getpid()}")
+    tmp_path.unlink(missing_ok=True)
+    connection = connect_fts(tmp_path)
+    try:
+        for pragma in BULK_LOAD_PRAGMAS:
+            connection.execute(pragma)
+        ensure_schema(connection)
+        rowid = 0
+        batch: List[tuple] = []
+        files: List[tuple] = []
+        insert_sql = """
+            INSERT INTO lexical_documents(
+                rowid, doc, chunk_id, content, source_path, ata, doc_id, char_start, char_end
+            )
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        with connection:
+            for record, doc_id in zip(records, doc_ids):
+                rowids = []
+                for char_start, char_end in record["passages"]:
+                    rowid += 1
+                    rowids.append(str(rowid))
+                    batch.append(
+                        (
+                            rowid,
+                            record["doc"],
+                            record["chunk_id"],
+                            record["content"][char_start:char_end],
+                            record["source_path"],
+                            record["ata"],
+                            doc_id,
+                            char_start,
+                            char_end,
+                        )
+                    )
+                    if len(batch) >= batch_size:
+                        connection.executemany(insert_sql, batch)
+                        batch.clear()
+                files.append(
+                    (record["source_path"], record["size"], record["mtime_ns"], record["content_hash"], " ".join(rowids))
+                )
+            connection.executemany(insert_sql, batch)
+            connection.executemany(
+                """
+                INSERT INTO lexical_files(source_path, size, mtime_ns, content_hash, passage_rowids)
+                VALUES(?, ?, ?, ?, ?)
+                """,
+                files,
+            )
+            write_meta(connection, "fingerprint", fingerprint)
+            write_meta(connection, "document_count", str(len(records)))
+            write_meta(connection, "passage_layout", passage_layout())
+            if doc_registry_id:
+                write_meta(connection, "doc_registry_id", doc_registry_id)
+        # Fusion des segments FTS5: un seul b-tree par terme pour les requêtes.
+        connection.execute("INSERT INTO lexical_documents(lexical_documents) VALUES('optimize')")
+        connection.commit()
+    except BaseException:
+        connection.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    connection.close()
+    os.replace(tmp_path, config.db_path)
+
+    seconds = time.perf_counter() - started
+    logger.info("Bulk-built lexical index for %s: %d documents in %.2fs", config.name, len(records), seconds)
+    return {
+        "documents": len(records),
+        "passages": rowid,
+        "workers": effective_build_workers(workers, len(paths)),
+        "read_seconds": round(read_seconds, 3),
+        "seconds": round(seconds, 3),
+        "docs_per_s": round(len(records) / seconds, 1) if seconds > 0 else None,
+    }
+
+
 def rebuild_lexical_index(
     config: LexicalCorpusConfig,
     *,
     force: bool = False,
+    reset_pool: bool = True,
+    workers: int = LEXICAL_BUILD_WORKERS,
 ) -> Dict[str, Any]:
     paths = iter_corpus_files(config)
     if not paths:
@@ -155,34 +653,123 @@ def rebuild_lexical_index(
     ensure_schema(connection)
 
     existing_fingerprint = read_meta(connection, "fingerprint")
+    # Découpage en passages modifié: tout l'index est à refaire.
+    force = force or (existing_fingerprint is not None and read_meta(connection, "passage_layout") != passage_layout())
+    # Registre remplacé: les doc_id des fichiers inchangés viennent d'un autre registre, tout est réattribué.
+    force = force or (
+        existing_fingerprint is not None
+        and config.registry_path is not None
+        and read_meta(connection, "doc_registry_id") != get_doc_registry(config.registry_path).registry_id()
+    )
     should_rebuild = force or existing_fingerprint != fingerprint_info["fingerprint"]
+    delta = {"added": 0, "updated": 0, "removed": 0, "unchanged": len(paths)}
+    manifest = {} if force or not should_rebuild else read_file_manifest(connection)
+    build = None
 
-    if should_rebuild:
-        logger.info("Rebuilding lexical index for %s at %s", config.name, config.db_path)
+    if should_rebuild and not manifest:
+        # Index neuf ou --force: construction complète en masse, remplacée atomiquement.
+        connection.close()
+        build = build_lexical_index_bulk(
+            config,
+            paths,
+            fingerprint=fingerprint_info["fingerprint"],
+            workers=workers,
+        )
+        delta = {"added": len(paths), "updated": 0, "removed": 0, "unchanged": 0}
+        connection = connect_fts(config.db_path)
+    elif should_rebuild:
+        diff = diff_corpus_files(paths, manifest)
+        records = diff["changed"]
+        logger.info(
+            "Updating lexical index for %s at %s (%d changed, %d removed)",
+            config.name,
+            config.db_path,
+            len(records),
+            len(diff["removed"]),
+        )
+        doc_ids, doc_registry_id = assign_doc_ids(config, records)
         with connection:
-            connection.execute("DELETE FROM lexical_documents")
-            for path in paths:
+            connection.executemany(
+                "DELETE FROM lexical_documents WHERE rowid = ?",
+                [(rowid,) for entry in diff["removed"] for rowid in parse_rowids(entry["passage_rowids"])]
+                + [(rowid,) for record in records for rowid in record["passage_rowids"]],
+            )
+            connection.executemany(
+                "DELETE FROM lexical_files WHERE source_path = ?",
+                [(entry["source_path"],) for entry in diff["removed"]],
+            )
+            for record, doc_id in zip(records, doc_ids):
+                # Un fichier modifié réutilise ses rowids de passages: les références lexicales restent stables.
+                reused = list(record["passage_rowids"])
+                rowids = []
+                for char_start, char_end in record["passages"]:
+                    cursor = connection.execute(
+                        """
+                        INSERT INTO lexical_documents(
+                            rowid, doc, chunk_id, content, source_path, ata, doc_id, char_start, char_end
+                        )
+                        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            reused.pop(0) if reused else None,
+                            record["doc"],
+                            record["chunk_id"],
+                            record["content"][char_start:char_end],
+                            record["source_path"],
+                            record["ata"],
+                            doc_id,
+                            char_start,
+                            char_end,
+                        ),
+                    )
+                    rowids.append(cursor.lastrowid)
                 connection.execute(
                     """
-                    INSERT INTO lexical_documents(doc, chunk_id, content, source_path)
-                    VALUES(?, ?, ?, ?)
+                    INSERT INTO lexical_files(source_path, size, mtime_ns, content_hash, passage_rowids)
+                    VALUES(?, ?, ?, ?, ?)
+                    ON CONFLICT(source_path) DO UPDATE SET
+                        size = excluded.size,
+                        mtime_ns = excluded.mtime_ns,
+                        content_hash = excluded.content_hash,
+                        passage_rowids = excluded.passage_rowids
                     """,
                     (
-                        path.name,
-                        path.stem,
-                        path.read_text(encoding="utf-8", errors="ignore"),
-                        str(path),
+                        record["source_path"],
+                        record["size"],
+                        record["mtime_ns"],
+                        record["content_hash"],
+                        " ".join(str(rowid) for rowid in rowids),
                     ),
                 )
+            connection.executemany(
+                "UPDATE lexical_files SET size = ?, mtime_ns = ? WHERE source_path = ?",
+                diff["touched"],
+            )
             write_meta(connection, "fingerprint", fingerprint_info["fingerprint"])
             write_meta(connection, "document_count", str(fingerprint_info["document_count"]))
+            write_meta(connection, "passage_layout", passage_layout())
+            if doc_registry_id:
+                write_meta(connection, "doc_registry_id", doc_registry_id)
+        updated = sum(1 for record in records if record["passage_rowids"])
+        delta = {
+            "added": len(records) - updated,
+            "updated": updated,
+            "removed": len(diff["removed"]),
+            "unchanged": diff["unchanged"],
+        }
     else:
         logger.info("Lexical index for %s is already up to date", config.name)
 
     row_count = connection.execute(
-        "SELECT COUNT(*) AS count FROM lexical_documents"
+        "SELECT COUNT(*) AS count FROM lexical_files"
     ).fetchone()["count"]
+    if read_meta(connection, "document_count") != str(row_count):
+        with connection:
+            write_meta(connection, "document_count", str(row_count))
     connection.close()
+    if should_rebuild and reset_pool:
+        # Les connexions de lecture ouvertes sur l'ancien index sont abandonnées.
+        get_lexical_pool(config).reset()
 
     return {
         "corpus": config.name,
@@ -191,29 +778,34 @@ def rebuild_lexical_index(
         "document_count": row_count,
         "fingerprint": fingerprint_info["fingerprint"],
         "rebuilt": should_rebuild,
+        "delta": delta,
+        **({"build": build} if build is not None else {}),
     }
 
 
 def ensure_lexical_index_exists(config: LexicalCorpusConfig) -> Dict[str, Any]:
-    if not config.db_path.exists():
-        return rebuild_lexical_index(config)
+    """Index summary (document count, fingerprint) from the pool: no DDL, no COUNT(*) per query."""
+    return get_lexical_pool(config).summary()
 
-    connection = connect_fts(config.db_path)
-    ensure_schema(connection)
-    row_count = connection.execute(
-        "SELECT COUNT(*) AS count FROM lexical_documents"
-    ).fetchone()["count"]
-    fingerprint = read_meta(connection, "fingerprint")
-    connection.close()
 
-    return {
-        "corpus": config.name,
-        "db_path": str(config.db_path),
-        "source_root": str(config.source_root),
-        "document_count": row_count,
-        "fingerprint": fingerprint,
-        "rebuilt": False,
-    }
+# Une requête MATCH au niveau passage, étiquetée pour pouvoir en combiner plusieurs en UNION ALL.
+PASSAGE_MATCH_SQL = """
+    SELECT
+        ? AS tag,
+        rowid,
+        doc,
+        chunk_id,
+        snippet(lexical_documents, 2, '**', '**', '…', ?) AS snippet,
+        source_path,
+        doc_id,
+        char_start,
+        char_end,
+        bm25(lexical_documents, 8.0, 4.0, 1.0, 0.0, 0.0, 0.0) AS bm25_score
+    FROM lexical_documents
+    WHERE lexical_documents MATCH ?
+    ORDER BY bm25_score ASC, doc ASC, char_start ASC
+    LIMIT ?
+"""
 
 
 def search_lexical_corpus(
@@ -221,57 +813,261 @@ def search_lexical_corpus(
     query: str,
     *,
     limit: int = 10,
+    ata_chapters: Sequence[str] = (),
+    min_partition_hits: int = 1,
 ) -> List[Dict[str, Any]]:
-    ensure_summary = ensure_lexical_index_exists(config)
     match_query = build_match_query(query, operator="AND")
 
     if not match_query:
         logger.info("Lexical query is empty after normalization for %s", config.name)
         return []
 
-    connection = connect_fts(config.db_path)
-    ensure_schema(connection)
-    def fetch_rows(current_match_query: str) -> List[sqlite3.Row]:
-        return connection.execute(
-        """
-        SELECT
-            doc,
-            chunk_id,
-            content,
-            source_path,
-            bm25(lexical_documents, 8.0, 4.0, 1.0) AS bm25_score
-        FROM lexical_documents
-        WHERE lexical_documents MATCH ?
-        ORDER BY bm25_score ASC, doc ASC
-        LIMIT ?
-        """,
-            (current_match_query, limit),
-        ).fetchall()
+    pool = get_lexical_pool(config)
+    try:
+        summary = pool.summary()
+    except FileNotFoundError:
+        return []
+    with pool.connection() as connection:
+        match_query, rows, ata_scope = run_lexical_match(
+            connection,
+            query,
+            match_query,
+            limit=limit,
+            ata_chapters=ata_chapters,
+            min_partition_hits=min_partition_hits,
+        )
+    return format_lexical_hits(config, rows, match_query=match_query, ata_scope=ata_scope, summary=summary)
 
-    rows = fetch_rows(match_query)
-    if not rows and len(tokenize_query(query)) > 1:
-        match_query = build_match_query(query, operator="OR")
-        rows = fetch_rows(match_query)
-    connection.close()
 
+def format_lexical_hits(
+    config: LexicalCorpusConfig,
+    rows: Sequence[Dict[str, Any]],
+    *,
+    match_query: str,
+    ata_scope: str | None,
+    summary: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    document_count = summary["document_count"]
+    # doc_id repris seulement si l'index a été construit avec le registre chargé à l'exécution.
+    use_doc_ids = registry_matches(config.registry_path, summary["doc_registry_id"])
     results: List[Dict[str, Any]] = []
     for rank, row in enumerate(rows, start=1):
+        result = {
+            "doc": row["doc"],
+            "chunk_id": row["chunk_id"],
+            "snippet": row["snippet"],
+            "source_path": row["source_path"],
+            "match_query": match_query,
+            "bm25_score": row["bm25_score"],
+            "lexical_rank": rank,
+            "corpus": config.name,
+            "index_document_count": document_count,
+            "char_start": row["char_start"],
+            "char_end": row["char_end"],
+            "passages": row["passages"],
+            LEXICAL_REF_FIELD: row["rowid"],
+        }
+        if use_doc_ids and row["doc_id"] is not None and row["doc_id"] >= 0:
+            result["doc_id"] = row["doc_id"]
+        if ata_scope:
+            result["ata_scope"] = ata_scope
+        results.append(result)
+    return results
+
+
+def run_lexical_match(
+    connection: sqlite3.Connection,
+    query: str,
+    match_query: str,
+    *,
+    limit: int,
+    ata_chapters: Sequence[str],
+    min_partition_hits: int,
+) -> tuple[str, List[Dict[str, Any]], str | None]:
+    def fetch_rows(current_match_query: str) -> List[Dict[str, Any]]:
+        # Classement au niveau passage; on lit plus de passages que de documents demandés.
+        fetch_limit = max(limit, 1) * max(LEXICAL_PASSAGE_FANOUT, 1)
+        while True:
+            rows = connection.execute(
+                PASSAGE_MATCH_SQL,
+                ("", LEXICAL_SNIPPET_TOKENS, current_match_query, fetch_limit),
+            ).fetchall()
+            documents = group_passages_by_document(rows, limit)
+            if len(documents) >= limit or len(rows) < fetch_limit:
+                return documents
+            fetch_limit *= 2
+
+    and_match_query = match_query
+
+    def fetch_with_fallback(ata_filter: str) -> tuple[str, List[Dict[str, Any]]]:
+        # Chaque portée repart de la requête AND (le repli OR de la partition ne déborde pas sur le global).
+        current_match_query = and_match_query
+        scoped = f"{ata_filter} AND ({current_match_query})" if ata_filter else current_match_query
+        rows = fetch_rows(scoped)
+        if not rows and len(tokenize_query(query)) > 1:
+            current_match_query = build_match_query(query, operator="OR")
+            scoped = f"{ata_filter} AND ({current_match_query})" if ata_filter else current_match_query
+            rows = fetch_rows(scoped)
+        return current_match_query, rows
+
+    ata_filter = build_ata_filter(ata_chapters)
+    ata_scope = None
+    if ata_filter:
+        match_query, rows = fetch_with_fallback(ata_filter)
+        ata_scope = "partition"
+        if len(rows) < min_partition_hits:
+            match_query, rows = fetch_with_fallback("")
+            ata_scope = "global"
+    else:
+        match_query, rows = fetch_with_fallback("")
+    return match_query, rows, ata_scope
+
+
+def run_tagged_matches(
+    connection: sqlite3.Connection,
+    subqueries: Dict[str, str],
+    fetch_limit: int,
+) -> Dict[str, List[sqlite3.Row]]:
+    """Runs several MATCH subqueries as one UNION ALL statement; rows come back grouped by tag."""
+    results: Dict[str, List[sqlite3.Row]] = {tag: [] for tag in subqueries}
+    if not subqueries:
+        return results
+    # L'ordre des sous-requêtes ne survit pas forcément au UNION ALL: tri explicite du composé,
+    # group_passages_by_document s'appuie sur l'ordre meilleur passage d'abord.
+    statement = " UNION ALL ".join(f"SELECT * FROM ({PASSAGE_MATCH_SQL})" for _ in subqueries)
+    statement += " ORDER BY tag ASC, bm25_score ASC, doc ASC, char_start ASC"
+    params: List[Any] = []
+    for tag, match_query in subqueries.items():
+        params.extend((tag, LEXICAL_SNIPPET_TOKENS, match_query, fetch_limit))
+    for row in connection.execute(statement, params):
+        results[row["tag"]].append(row)
+    return results
+
+
+def search_lexical_corpus_many(
+    config: LexicalCorpusConfig,
+    queries: Sequence[str],
+    *,
+    limit: int = 10,
+    ata_chapters: Sequence[str] = (),
+    min_partition_hits: int = 1,
+) -> List[List[Dict[str, Any]]]:
+    """Ranked hits per query variant, in at most two SQL statements on one pooled connection.
+
+    Same AND -> OR and ATA partition -> global fallbacks as search_lexical_corpus: the first
+    statement runs every variant's primary MATCH, the second every fallback still needed. Each
+    subquery reads limit x fanout passages, without the single-query path's re-fetch on saturation.
+    """
+    ata_filter = build_ata_filter(ata_chapters)
+    scopes = ("partition", "global") if ata_filter else ("global",)
+    plans = []
+    for query in queries:
+        and_query = build_match_query(query, operator="AND")
+        or_query = build_match_query(query, operator="OR") if len(tokenize_query(query)) > 1 else ""
+        plans.append({"AND": and_query, "OR": or_query})
+
+    def match_for(plan: Dict[str, str], scope: str, operator: str) -> str:
+        return f"{ata_filter} AND ({plan[operator]})" if scope == "partition" else plan[operator]
+
+    def resolve(index: int, found: Dict[str, List[Dict[str, Any]]]):
+        plan = plans[index]
+        chosen = None
+        for scope in scopes:
+            and_rows = found.get(f"{index}:{scope}:AND")
+            if and_rows is None:
+                return None
+            if and_rows or not plan["OR"]:
+                chosen = (plan["AND"], and_rows, scope)
+            else:
+                or_rows = found.get(f"{index}:{scope}:OR")
+                if or_rows is None:
+                    return None
+                chosen = (plan["OR"], or_rows, scope)
+            if scope == "global" or len(chosen[1]) >= min_partition_hits:
+                break
+        match_query, rows, scope = chosen
+        return match_query, rows, scope if ata_filter else None
+
+    pool = get_lexical_pool(config)
+    try:
+        summary = pool.summary()
+    except FileNotFoundError:
+        return [[] for _ in queries]
+    fetch_limit = max(limit, 1) * max(LEXICAL_PASSAGE_FANOUT, 1)
+    found: Dict[str, List[Dict[str, Any]]] = {}
+    resolved: Dict[int, Any] = {}
+    active = [index for index, plan in enumerate(plans) if plan["AND"]]
+    with pool.connection() as connection:
+        first = {f"{index}:{scopes[0]}:AND": match_for(plans[index], scopes[0], "AND") for index in active}
+        for round_queries in (first, None):
+            if round_queries is None:
+                # Second aller-retour: toutes les variantes encore indécises, avec leurs replis possibles.
+                round_queries = {
+                    f"{index}:{scope}:{operator}": match_for(plans[index], scope, operator)
+                    for index in active
+                    if index not in resolved
+                    for scope in scopes
+                    for operator in ("AND", "OR")
+                    if plans[index][operator] and f"{index}:{scope}:{operator}" not in found
+                }
+            for tag, rows in run_tagged_matches(connection, round_queries, fetch_limit).items():
+                found[tag] = group_passages_by_document(rows, limit)
+            for index in active:
+                if index not in resolved and (result := resolve(index, found)) is not None:
+                    resolved[index] = result
+
+    results: List[List[Dict[str, Any]]] = []
+    for index in range(len(plans)):
+        if index not in resolved:
+            results.append([])
+            continue
+        match_query, rows, ata_scope = resolved[index]
         results.append(
-            {
-                "doc": row["doc"],
-                "chunk_id": row["chunk_id"],
-                "content": row["content"],
-                "source_path": row["source_path"],
-                "match_query": match_query,
-                "bm25_score": row["bm25_score"],
-                "lexical_rank": rank,
-                "corpus": config.name,
-                "index_document_count": ensure_summary["document_count"],
-            }
+            format_lexical_hits(
+                config,
+                rows,
+                match_query=match_query,
+                ata_scope=ata_scope,
+                summary=summary,
+            )
         )
     return results
 
 
+def group_passages_by_document(rows: Sequence[sqlite3.Row], limit: int) -> List[Dict[str, Any]]:
+    """One hit per document, in best-passage order, carrying its best matching passages."""
+    documents: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        document = documents.get(row["source_path"])
+        passage = {
+            LEXICAL_REF_FIELD: row["rowid"],
+            "char_start": row["char_start"],
+            "char_end": row["char_end"],
+            "snippet": row["snippet"][:HIT_SNIPPET_CHARS],
+        }
+        if document is None:
+            if len(documents) >= limit:
+                continue
+            document = {**dict(row), "snippet": passage["snippet"], "passages": []}
+            documents[row["source_path"]] = document
+        if len(document["passages"]) < LEXICAL_PASSAGES_PER_HIT:
+            document["passages"].append(passage)
+    return list(documents.values())
+
+
+def load_lexical_contents(config: LexicalCorpusConfig, rowids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+    """Best passage of lexical hits, fetched by rowid once the final top-k is known."""
+    if not rowids or not config.db_path.exists():
+        return {}
+    placeholders = ",".join("?" for _ in rowids)
+    with get_lexical_pool(config).connection() as connection:
+        rows = connection.execute(
+            f"SELECT rowid, content FROM lexical_documents WHERE rowid IN ({placeholders})",
+            [int(rowid) for rowid in rowids],
+        ).fetchall()
+    return {row["rowid"]: {"content": row["content"]} for row in rows}
+
+
 def rebuild_default_lexical_indexes(force: bool = False) -> List[Dict[str, Any]]:
     return [
         rebuild_lexical_index(config, force=force)
@@ -279,12 +1075,68 @@ def rebuild_default_lexical_indexes(force: bool = False) -> List[Dict[str, Any]]
     ]
 
 
-def search_documents_lexical(query: str, n_results: int = 10) -> List[Dict[str, Any]]:
-    return search_lexical_corpus(TECH_DOCS_LEXICAL_CONFIG, query, limit=n_results)
+def search_documents_lexical(
+    query: str,
+    n_results: int = 10,
+    *,
+    ata_chapters: Sequence[str] = (),
+    min_partition_hits: int = 1,
+) -> List[Dict[str, Any]]:
+    return search_lexical_corpus(
+        TECH_DOCS_LEXICAL_CONFIG,
+        query,
+        limit=n_results,
+        ata_chapters=ata_chapters,
+        min_partition_hits=min_partition_hits,
+    )
+
+
+def search_documents_lexical_many(
+    queries: Sequence[str],
+    n_results: int = 10,
+    *,
+    ata_chapters: Sequence[str] = (),
+    min_partition_hits: int = 1,
+) -> List[List[Dict[str, Any]]]:
+    return search_lexical_corpus_many(
+        TECH_DOCS_LEXICAL_CONFIG,
+        queries,
+        limit=n_results,
+        ata_chapters=ata_chapters,
+        min_partition_hits=min_partition_hits,
+    )
+
+
+def search_non_conformities_lexical(
+    query: str,
+    n_results: int = 10,
+    *,
+    ata_chapters: Sequence[str] = (),
+    min_partition_hits: int = 1,
+) -> List[Dict[str, Any]]:
+    return search_lexical_corpus(
+        NC_LEXICAL_CONFIG,
+        query,
+        limit=n_results,
+        ata_chapters=ata_chapters,
+        min_partition_hits=min_partition_hits,
+    )
 
 
-def search_non_conformities_lexical(query: str, n_results: int = 10) -> List[Dict[str, Any]]:
-    return search_lexical_corpus(NC_LEXICAL_CONFIG, query, limit=n_results)
+def search_non_conformities_lexical_many(
+    queries: Sequence[str],
+    n_results: int = 10,
+    *,
+    ata_chapters: Sequence[str] = (),
+    min_partition_hits: int = 1,
+) -> List[List[Dict[str, Any]]]:
+    return search_lexical_corpus_many(
+        NC_LEXICAL_CONFIG,
+        queries,
+        limit=n_results,
+        ata_chapters=ata_chapters,
+        min_partition_hits=min_partition_hits,
+    )
 
 
 def parse_args() -> argparse.Namespace:
@@ -298,7 +1150,13 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--force",
         action="store_true",
-        help="Force a rebuild even if the fingerprint did not change.",
+        help="Force a full reindex even if the fingerprint and file manifest did not change.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=LEXICAL_BUILD_WORKERS,
+        help="Worker processes reading and splitting files during a full build.",
     )
     parser.add_argument(
         "--query",
@@ -325,7 +1183,7 @@ def main() -> None:
     summaries = []
     for corpus_name in corpus_names:
         config = DEFAULT_LEXICAL_CORPORA[corpus_name]
-        summary = rebuild_lexical_index(config, force=args.force)
+        summary = rebuild_lexical_index(config, force=args.force, workers=args.workers)
         summaries.append(summary)
         print(summary)
         if args.query:
@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from functools import lru_cache
 from typing import List, Sequence
 
-from src.lexical_search import normalize_text, tokenize_query
+from src.lexical_search import extract_ata_chapters, normalize_text, tokenize_query
 
 
 logger = logging.getLogger(__name__)
@@ -24,6 +24,8 @@ class QueryRewriteResult:
     llm_used: bool
     llm_model: str | None
     llm_error: str | None
+    # Chapitres ATA explicites ou inférés ("28", "52"...), pour cibler la partition.
+    ata_hints: tuple[str, ...] = ()
 
 
 def _compact_whitespace(value: str) -> str:
@@ -253,15 +255,17 @@ def _should_attempt_llm(query: str, reasons: Sequence[str]) -> bool:
 
 
 @lru_cache(maxsize=256)
-def rewrite_retrieval_query(query: str, *, corpus: str) -> QueryRewriteResult:
+def rewrite_retrieval_query(query: str, *, corpus: str, use_llm: bool = True) -> QueryRewriteResult:
     normalized_query = normalize_text(query)
     variants, reasons = _build_rule_based_variants(query, corpus=corpus)
     llm_used = False
     llm_error = None
     llm_model = None
+    ata_hints = extract_ata_chapters(query)
 
     if (
-        _feature_flag("RETRIEVAL_QUERY_REWRITE_ENABLED")
+        use_llm
+        and _feature_flag("RETRIEVAL_QUERY_REWRITE_ENABLED")
         and _feature_flag("RETRIEVAL_QUERY_REWRITE_USE_LLM")
         and os.getenv("OPENAI_API_KEY")
         and _should_attempt_llm(query, reasons)
@@ -269,6 +273,8 @@ def rewrite_retrieval_query(query: str, *, corpus: str) -> QueryRewriteResult:
         try:
             llm_payload = _call_llm_rewrite(query, corpus=corpus)
             variants = _merge_llm_variants(variants, reasons, llm_payload)
+            for value in llm_payload.get("ata_hints", []) or []:
+                ata_hints.extend(extract_ata_chapters(str(value)))
             llm_used = True
             llm_model = QUERY_REWRITE_MODEL
         except Exception as exc:
@@ -276,6 +282,9 @@ def rewrite_retrieval_query(query: str, *, corpus: str) -> QueryRewriteResult:
             llm_model = QUERY_REWRITE_MODEL
             logger.warning("Query rewrite LLM failed for corpus=%s: %s", corpus, exc)
 
+    for variant in variants:
+        ata_hints.extend(extract_ata_chapters(variant))
+
     return QueryRewriteResult(
         original_query=_compact_whitespace(query),
         normalized_query=normalized_query,
@@ -285,6 +294,7 @@ def rewrite_retrieval_query(query: str, *, corpus: str) -> QueryRewriteResult:
         llm_used=llm_used,
         llm_model=llm_model,
         llm_error=llm_error,
+        ata_hints=tuple(dict.fromkeys(ata_hints)),
     )
 
 
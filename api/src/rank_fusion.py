@@ -0,0 +1,180 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.doc_registry import document_identity
+
+
+RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+VECTOR_CHANNEL_WEIGHT = float(os.getenv("RETRIEVAL_VECTOR_WEIGHT", "1.0"))
+LEXICAL_CHANNEL_WEIGHT = float(os.getenv("RETRIEVAL_LEXICAL_WEIGHT", "1.0"))
+# Poids 2: jusqu'à ~60 hits, un souvenir épisodique reste devant le meilleur NC.
+EPISODIC_CHANNEL_WEIGHT = float(os.getenv("RETRIEVAL_EPISODIC_WEIGHT", "2.0"))
+
+# Champ de score propre à un canal, recopié sous un nom explicite dans le résultat fusionné.
+CHANNEL_SCORE_FIELDS: Dict[str, Tuple[str, str]] = {
+    "vector": ("distance", "vector_distance"),
+    "lexical": ("bm25_score", "lexical_score"),
+}
+
+
+@dataclass(frozen=True)
+class RankedChannel:
+    name: str
+    # Listes classées d'un même canal (une par variante de requête).
+    batches: Sequence[Sequence[Dict[str, Any]]]
+    weight: float = 1.0
+    # Rang maximal retenu après fusion des variantes du canal (None: aucun plafond).
+    limit: int | None = None
+
+
+def normalize_result_identity(item: Dict[str, Any]) -> str:
+    doc = item.get("doc") or item.get("chunk_id") or ""
+    return document_identity(str(doc))
+
+
+def fusion_key(item: Dict[str, Any], use_doc_ids: bool) -> Any:
+    return item["doc_id"] if use_doc_ids else normalize_result_identity(item)
+
+
+def merge_occurrences(occurrences: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    merged = dict(occurrences[0][1])
+    for _, item in occurrences[1:]:
+        for key, value in item.items():
+            if key not in merged or merged.get(key) in (None, "", []):
+                merged[key] = value
+        if len(str(item.get("content", ""))) > len(str(merged.get("content", ""))):
+            merged["content"] = item.get("content")
+
+    seen_channels = set()
+    for channel, item in occurrences:
+        score_field = CHANNEL_SCORE_FIELDS.get(channel)
+        if channel in seen_channels or score_field is None or score_field[0] not in item:
+            continue
+        # Score de la première occurrence du canal, comme le rang qui l'a fait entrer.
+        seen_channels.add(channel)
+        merged[score_field[1]] = item[score_field[0]]
+    return merged
+
+
+def doc_sort_keys(docs: List[str]) -> np.ndarray:
+    keys = np.empty(len(docs), dtype=np.int64)
+    keys[np.argsort(np.array(docs), kind="stable")] = np.arange(len(docs))
+    return keys
+
+
+def rank_within(scores: np.ndarray, best_ranks: np.ndarray, doc_keys: np.ndarray, present: np.ndarray) -> np.ndarray:
+    candidates = np.flatnonzero(present)
+    order = np.lexsort((doc_keys[candidates], best_ranks[candidates], -scores[candidates]))
+    return candidates[order]
+
+
+def fuse_ranked_channels(
+    channels: Sequence[RankedChannel],
+    *,
+    final_limit: int,
+    rrf_k: int = RRF_K,
+    annotate: bool = True,
+) -> List[Dict[str, Any]]:
+    """RRF over N weighted channels: variants are fused inside each channel, then channels across.
+
+    Hits are interned to integer ids and scored in arrays; payloads are only merged
+    for the final top-k.
+    """
+    # Ids du registre si tous les hits en portent, sinon identité reconstruite depuis le nom de fichier.
+    use_doc_ids = all("doc_id" in item for channel in channels for results in channel.batches for item in results)
+    identities: Dict[Any, int] = {}
+    occurrences: List[List[Tuple[int, Dict[str, Any]]]] = []
+    channel_hits: List[Tuple[List[int], List[int], List[int]]] = []
+    # Départage à score et rang égaux: le doc de la première occurrence dans le canal.
+    channel_docs: List[Dict[int, str]] = []
+
+    for channel_index, channel in enumerate(channels):
+        ids: List[int] = []
+        ranks: List[int] = []
+        batch_indexes: List[int] = []
+        first_docs: Dict[int, str] = {}
+        for batch_index, results in enumerate(channel.batches):
+            for rank, item in enumerate(results, start=1):
+                identity = fusion_key(item, use_doc_ids)
+                if identity in (None, ""):
+                    continue
+                doc_id = identities.setdefault(identity, len(identities))
+                if doc_id == len(occurrences):
+                    occurrences.append([])
+                occurrences[doc_id].append((channel_index, item))
+                first_docs.setdefault(doc_id, str(item.get("doc", "")))
+                ids.append(doc_id)
+                ranks.append(rank)
+                batch_indexes.append(batch_index)
+        channel_hits.append((ids, ranks, batch_indexes))
+        channel_docs.append(first_docs)
+
+    count = len(identities)
+    if count == 0 or final_limit <= 0:
+        return []
+
+    fused_scores = np.zeros(count, dtype=np.float64)
+    fused_best = np.full(count, np.iinfo(np.int64).max, dtype=np.int64)
+    channel_ranks = np.zeros((len(channels), count), dtype=np.int64)
+    channel_scores = np.zeros((len(channels), count), dtype=np.float64)
+    variant_hits = np.zeros((len(channels), count), dtype=np.int64)
+
+    for channel_index, (channel, (ids, ranks, batch_indexes)) in enumerate(zip(channels, channel_hits)):
+        if not ids:
+            continue
+        id_array = np.asarray(ids, dtype=np.int64)
+        rank_array = np.asarray(ranks, dtype=np.int64)
+        scores = np.bincount(id_array, weights=1.0 / (rrf_k + rank_array), minlength=count)
+        best_ranks = np.full(count, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(best_ranks, id_array, rank_array)
+        # Variantes distinctes ayant ramené le hit.
+        pairs = np.unique(id_array * len(channel.batches) + np.asarray(batch_indexes, dtype=np.int64))
+        variant_hits[channel_index] = np.bincount(pairs // len(channel.batches), minlength=count)
+
+        doc_keys = doc_sort_keys([channel_docs[channel_index].get(doc_id, "") for doc_id in range(count)])
+        ranked = rank_within(scores, best_ranks, doc_keys, variant_hits[channel_index] > 0)
+        if channel.limit is not None:
+            ranked = ranked[: channel.limit]
+        positions = np.arange(1, len(ranked) + 1, dtype=np.int64)
+        channel_ranks[channel_index, ranked] = positions
+        channel_scores[channel_index] = scores
+        fused_scores[ranked] += channel.weight / (rrf_k + positions)
+        np.minimum.at(fused_best, ranked, positions)
+
+    kept = channel_ranks > 0
+    fused_docs = [
+        next(
+            (str(item.get("doc", "")) for channel_index, item in entries if kept[channel_index, doc_id]),
+            "",
+        )
+        for doc_id, entries in enumerate(occurrences)
+    ]
+    selected = rank_within(fused_scores, fused_best, doc_sort_keys(fused_docs), kept.any(axis=0))[:final_limit]
+
+    results: List[Dict[str, Any]] = []
+    for output_rank, doc_id in enumerate(selected.tolist(), start=1):
+        # Les occurrences d'un canal où le hit a dépassé la limite ne contribuent pas.
+        result = merge_occurrences(
+            [
+                (channels[channel_index].name, item)
+                for channel_index, item in occurrences[doc_id]
+                if kept[channel_index, doc_id]
+            ]
+        )
+        if annotate:
+            for channel_index, channel in enumerate(channels):
+                if channel_ranks[channel_index, doc_id] == 0:
+                    continue
+                result[f"{channel.name}_rrf_score"] = round(float(channel_scores[channel_index, doc_id]), 8)
+                result[f"{channel.name}_variant_hits"] = int(variant_hits[channel_index, doc_id])
+                result[f"{channel.name}_rank"] = int(channel_ranks[channel_index, doc_id])
+            result["retrieval_channels"] = sorted(
+                channel.name for channel_index, channel in enumerate(channels) if channel_ranks[channel_index, doc_id] > 0
+            )
+            result["rrf_score"] = round(float(fused_scores[doc_id]), 8)
+            result["retrieval_rank"] = output_rank
+        results.append(result)
+    return results
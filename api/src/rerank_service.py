@@ -0,0 +1,213 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.embedding_cache import normalize_cache_text
+from src.lexical_search import tokenize_query
+
+
+logger = logging.getLogger(__name__)
+
+RERANKING_ENABLED = os.getenv("RERANKING_ENABLED", "false").lower() in ("true", "1", "t")
+# "cohere" en production, "stub" pour les tests de charge hors ligne.
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "cohere").strip().lower()
+RERANK_MODEL = os.getenv("RERANK_MODEL", "rerank-english-v2.0")
+# Au-delà de ce délai, on rend l'ordre RRF; la réponse tardive alimente quand même le cache.
+RERANK_DEADLINE_MS = float(os.getenv("RERANK_DEADLINE_MS", "800"))
+RERANK_MAX_WORKERS = int(os.getenv("RERANK_MAX_WORKERS", "4"))
+RERANK_CACHE_ENTRIES = int(os.getenv("RERANK_CACHE_ENTRIES", "512"))
+RERANK_STUB_LATENCY_MS = float(os.getenv("RERANK_STUB_LATENCY_MS", "50"))
+LATENCY_WINDOW = 512
+
+Ranking = List[Tuple[int, float]]
+
+
+class CohereRerankBackend:
+    def __init__(self, client: Any):
+        self.client = client
+
+    def rerank(self, *, model: str, query: str, documents: Sequence[str], top_n: int) -> Ranking:
+        response = self.client.rerank(model=model, query=query, documents=list(documents), top_n=top_n)
+        return [(hit.index, float(hit.relevance_score)) for hit in response.results]
+
+
+class StubRerankBackend:
+    """Offline backend: token-overlap scores after a simulated network latency."""
+
+    def __init__(self, *, latency_ms: float = RERANK_STUB_LATENCY_MS, jitter_ratio: float = 0.5, seed: int = 13):
+        self.latency_ms = latency_ms
+        self.jitter_ratio = jitter_ratio
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def rerank(self, *, model: str, query: str, documents: Sequence[str], top_n: int) -> Ranking:
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ratio, self.jitter_ratio)
+        time.sleep(max(self.latency_ms * (1.0 + jitter), 0.0) / 1000)
+        query_tokens = set(tokenize_query(query))
+        scores = [
+            len(query_tokens & set(tokenize_query(document))) / max(len(query_tokens), 1)
+            for document in documents
+        ]
+        order = sorted(range(len(documents)), key=lambda index: (-scores[index], index))
+        return [(index, scores[index]) for index in order[:top_n]]
+
+
+class RerankService:
+    """Deadline-bound rerank calls on a worker pool, with a (query, candidate ids, model) cache."""
+
+    def __init__(
+        self,
+        backend: Any,
+        *,
+        model: str = RERANK_MODEL,
+        deadline_ms: float = RERANK_DEADLINE_MS,
+        max_workers: int = RERANK_MAX_WORKERS,
+        cache_entries: int = RERANK_CACHE_ENTRIES,
+    ):
+        self.backend = backend
+        self.model = model
+        self.deadline_ms = deadline_ms
+        self.cache_entries = max(cache_entries, 0)
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="rerank")
+        self._cache: "OrderedDict[Tuple[str, Tuple[str, ...], str], Ranking]" = OrderedDict()
+        self._latencies_ms: deque = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "cache_hits": 0,
+            "backend_calls": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "fallbacks": 0,
+            "late_results_cached": 0,
+        }
+
+    def build_key(self, query: str, candidate_ids: Sequence[str]) -> Tuple[str, Tuple[str, ...], str]:
+        return (normalize_cache_text(query), tuple(str(value) for value in candidate_ids), self.model)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _cache_get(self, key, top_n: int) -> Ranking | None:
+        with self._lock:
+            ranking = self._cache.get(key)
+            if ranking is None:
+                return None
+            self._cache.move_to_end(key)
+        # Un classement mis en cache avec un top_n plus petit ne suffit pas.
+        if len(ranking) < top_n and len(ranking) < len(key[1]):
+            return None
+        return ranking[:top_n]
+
+    def _cache_put(self, key, ranking: Ranking) -> None:
+        if not self.cache_entries:
+            return
+        with self._lock:
+            self._cache[key] = ranking
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def _on_late_result(self, key, started: float, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._cache_put(key, future.result())
+        with self._lock:
+            self._counters["late_results_cached"] += 1
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    def rerank(
+        self,
+        query: str,
+        documents: Sequence[str],
+        *,
+        candidate_ids: Sequence[str],
+        top_n: int,
+    ) -> Ranking | None:
+        """Returns (candidate index, score) pairs, or None when the caller must keep its own order."""
+        self._count("requests")
+        if not documents or top_n <= 0:
+            return []
+        top_n = min(top_n, len(documents))
+        key = self.build_key(query, candidate_ids)
+        cached = self._cache_get(key, top_n)
+        if cached is not None:
+            self._count("cache_hits")
+            return cached
+
+        self._count("backend_calls")
+        started = time.perf_counter()
+        future = self._executor.submit(
+            self.backend.rerank,
+            model=self.model,
+            query=query,
+            documents=list(documents),
+            top_n=top_n,
+        )
+        try:
+            ranking = future.result(timeout=self.deadline_ms / 1000)
+        except FutureTimeoutError:
+            self._count("timeouts")
+            self._count("fallbacks")
+            logger.warning("Rerank missed its %.0f ms deadline, keeping RRF order.", self.deadline_ms)
+            # Un appel encore en file est annulé; un appel déjà parti alimentera le cache.
+            if not future.cancel():
+                future.add_done_callback(lambda done: self._on_late_result(key, started, done))
+            return None
+        except Exception as e:
+            self._count("errors")
+            self._count("fallbacks")
+            logger.error("Rerank backend failed, keeping RRF order. Error: %s", e)
+            return None
+
+        with self._lock:
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+        self._cache_put(key, ranking)
+        return ranking
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = list(self._latencies_ms)
+            cache_size = len(self._cache)
+        requests = counters["requests"]
+        return {
+            **counters,
+            "backend": type(self.backend).__name__,
+            "model": self.model,
+            "deadline_ms": self.deadline_ms,
+            "cache_size": cache_size,
+            "cache_hit_rate": round(counters["cache_hits"] / requests, 4) if requests else 0.0,
+            "fallback_rate": round(counters["fallbacks"] / requests, 4) if requests else 0.0,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3) if latencies else None,
+        }
+
+
+def build_rerank_service() -> RerankService | None:
+    if not RERANKING_ENABLED:
+        logger.info("Reranking is disabled.")
+        return None
+    if RERANK_BACKEND == "stub":
+        logger.info("Reranking is enabled with the local stub backend.")
+        return RerankService(StubRerankBackend())
+
+    cohere_api_key = os.getenv("COHERE_API_KEY")
+    if not cohere_api_key:
+        logger.warning("RERANKING_ENABLED is true, but COHERE_API_KEY is not found. Reranking will be disabled.")
+        return None
+    import cohere
+
+    logger.info("Reranking is enabled. Initializing Cohere client...")
+    # Le timeout HTTP borne aussi les appels qui continuent après la deadline.
+    client = cohere.Client(cohere_api_key, timeout=max(RERANK_DEADLINE_MS / 1000 * 4, 5.0))
+    return RerankService(CohereRerankBackend(client))
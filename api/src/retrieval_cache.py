@@ -0,0 +1,152 @@
+import copy
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.embedding_cache import normalize_cache_text
+
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_ENABLED = os.getenv("RETRIEVAL_RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "t")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_RESULT_CACHE_MAX_ENTRIES", "512"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_RESULT_CACHE_TTL_SECONDS", "600"))
+
+
+@dataclass(frozen=True)
+class ResultCacheKey:
+    corpus: str
+    query: str
+    n_results: int
+    use_query_rewrite: bool
+    # Empreintes des index vectoriel et lexical au moment de la recherche.
+    fingerprint: Tuple[str, str]
+    vector_query_mode: str = "per_variant"
+
+
+def build_result_cache_key(
+    *,
+    corpus: str,
+    query: str,
+    n_results: int,
+    use_query_rewrite: bool,
+    fingerprint: Tuple[str, str],
+    vector_query_mode: str = "per_variant",
+) -> ResultCacheKey:
+    return ResultCacheKey(
+        corpus=corpus,
+        query=normalize_cache_text(query),
+        n_results=n_results,
+        use_query_rewrite=use_query_rewrite,
+        fingerprint=fingerprint,
+        vector_query_mode=vector_query_mode,
+    )
+
+
+class RetrievalResultCache:
+    """LRU + TTL cache of fused retrieval results, invalidated per corpus when an index fingerprint changes."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        enabled: bool = RESULT_CACHE_ENABLED,
+    ):
+        self.max_entries = max(max_entries, 0)
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and self.max_entries > 0
+        self._entries: "OrderedDict[ResultCacheKey, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._fingerprints: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "bypasses": 0,
+            "expirations": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def _invalidate_corpus(self, corpus: str, fingerprint: Tuple[str, str]) -> None:
+        previous = self._fingerprints.get(corpus)
+        self._fingerprints[corpus] = fingerprint
+        if previous is None or previous == fingerprint:
+            return
+        stale_keys = [key for key in self._entries if key.corpus == corpus]
+        for key in stale_keys:
+            del self._entries[key]
+        self._counters["invalidations"] += len(stale_keys)
+        logger.info("Index fingerprint changed for %s, dropped %d cached results.", corpus, len(stale_keys))
+
+    def get(self, key: ResultCacheKey) -> List[Dict[str, Any]] | None:
+        with self._lock:
+            self._invalidate_corpus(key.corpus, key.fingerprint)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            stored_at, results = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+        return copy.deepcopy(results)
+
+    def put(self, key: ResultCacheKey, results: List[Dict[str, Any]]) -> None:
+        stored = copy.deepcopy(results)
+        with self._lock:
+            self._invalidate_corpus(key.corpus, key.fingerprint)
+            self._entries[key] = (time.monotonic(), stored)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def get_or_compute(
+        self,
+        key: ResultCacheKey | None,
+        compute: Callable[[], List[Dict[str, Any]]],
+        *,
+        cacheable: Callable[[List[Dict[str, Any]]], bool] | None = None,
+    ) -> List[Dict[str, Any]]:
+        # Pas de clé: un index est absent, le résultat (dégradé) n'est pas mis en cache.
+        if not self.enabled or key is None:
+            with self._lock:
+                self._counters["bypasses"] += 1
+            return compute()
+
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        results = compute()
+        if results and (cacheable is None or cacheable(results)):
+            self.put(key, results)
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._fingerprints.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "enabled": self.enabled,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "lookups": lookups,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
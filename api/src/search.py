@@ -1,12 +1,49 @@
-import chromadb
 import pathlib
 import logging
 import os
-from typing import List, Dict, Any
-import chromadb.utils.embedding_functions as embedding_functions
-import cohere
-from src.lexical_search import search_documents_lexical, search_non_conformities_lexical
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Sequence, Tuple
+import numpy as np
+from src.ata_partition import (
+    ATA_PARTITION_ENABLED,
+    ATA_PARTITION_MIN_HITS,
+    ATA_PARTITION_OVERFETCH,
+    build_chroma_ata_where,
+    item_ata_chapter,
+)
+from src.circuit_breaker import CircuitOpenError, build_vector_breaker
+from src.doc_registry import DOC_REGISTRY_PATH, get_doc_registry
+from src.embeddings import EmbeddingCacheMiss, embed_texts, get_embedding_cache
+from src.hit_hydration import (
+    LEXICAL_REF_FIELD,
+    VECTOR_ID_REF_FIELD,
+    VECTOR_ROW_REF_FIELD,
+    hydrate_hits,
+    lighten_hit,
+)
+from src.lexical_search import (
+    DEFAULT_LEXICAL_CORPORA,
+    extract_ata_chapters,
+    get_lexical_pool,
+    load_lexical_contents,
+    read_lexical_fingerprint,
+    search_documents_lexical_many,
+    search_non_conformities_lexical_many,
+)
 from src.query_rewrite import rewrite_retrieval_query
+from src.rank_fusion import (
+    LEXICAL_CHANNEL_WEIGHT,
+    VECTOR_CHANNEL_WEIGHT,
+    RankedChannel,
+    fuse_ranked_channels,
+    normalize_result_identity,
+)
+from src.rerank_service import build_rerank_service
+from src.retrieval_confidence import assess_retrieval_confidence
+from src.retrieval_cache import ResultCacheKey, RetrievalResultCache, build_result_cache_key
+from src.vector_registry import EXPORT_STORE_BUILDERS, VectorCollectionRegistry, VectorCorpusSpec
+from src.vector_store import NC_VECTOR_CONFIG, TECH_DOCS_VECTOR_CONFIG
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -18,194 +55,171 @@ NC_DISTANCE_FACTOR = 1.2
 # Limites finales du nombre de résultats
 MAX_TECH_DOCS_RESULTS = 10
 MAX_NC_RESULTS = 10
-RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
 VECTOR_CANDIDATE_LIMIT = int(os.getenv("VECTOR_CANDIDATE_LIMIT", "15"))
 LEXICAL_CANDIDATE_LIMIT = int(os.getenv("LEXICAL_CANDIDATE_LIMIT", "15"))
 
+# Moteur vectoriel: "chroma" (PersistentClient) ou un moteur NumPy sur vector-export-v1
+# ("export_exact", "export_int8" / "export_fp16" avec relecture float32 de la shortlist,
+#  "export_matryoshka": candidats sur un préfixe 256/512 dims puis rerank sur les 3072 dims,
+#  "export_ivf": listes inversées k-means, RETRIEVAL_IVF_NPROBE listes sondées par requête)
+SUPPORTED_VECTOR_ENGINES = ("chroma", *EXPORT_STORE_BUILDERS)
+VECTOR_ENGINE = os.getenv("RETRIEVAL_VECTOR_ENGINE", "chroma").strip().lower()
+if VECTOR_ENGINE not in SUPPORTED_VECTOR_ENGINES:
+    logger.warning("Unknown RETRIEVAL_VECTOR_ENGINE=%s, falling back to chroma.", VECTOR_ENGINE)
+    VECTOR_ENGINE = "chroma"
+logger.info("Using vector engine: %s", VECTOR_ENGINE)
+
+# "per_variant": une recherche vectorielle par variante, fusionnées par RRF.
+# "centroid": une seule recherche par corpus sur la moyenne pondérée des embeddings de variantes.
+SUPPORTED_VECTOR_QUERY_MODES = ("per_variant", "centroid")
+VECTOR_QUERY_MODE = os.getenv("RETRIEVAL_VECTOR_QUERY_MODE", "per_variant").strip().lower()
+if VECTOR_QUERY_MODE not in SUPPORTED_VECTOR_QUERY_MODES:
+    logger.warning("Unknown RETRIEVAL_VECTOR_QUERY_MODE=%s, falling back to per_variant.", VECTOR_QUERY_MODE)
+    VECTOR_QUERY_MODE = "per_variant"
+# Poids de la requête d'origine (première variante) dans le centroïde, les autres variantes valent 1.
+CENTROID_ORIGINAL_WEIGHT = float(os.getenv("RETRIEVAL_CENTROID_ORIGINAL_WEIGHT", "2.0"))
+
 # Build paths relative to this script's location
 SCRIPT_DIR = pathlib.Path(__file__).parent.parent
-DB_TECH_DOCS_PATH = str(SCRIPT_DIR / "data/a220-tech-docs/vectordb")
-DB_NC_PATH = str(SCRIPT_DIR / "data/a220-non-conformities/vectordb")
-
-# This will use the OPENAI_API_KEY environment variable.
-# We specify the model that matches the embedding dimensions (3072).
-openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                model_name="text-embedding-3-large"
-            )
-
-# Initialize ChromaDB clients
-logger.info("Initializing ChromaDB client for tech docs at: %s", DB_TECH_DOCS_PATH)
-client_tech_docs = chromadb.PersistentClient(path=DB_TECH_DOCS_PATH)
-logger.info("Initializing ChromaDB client for non-conformities at: %s", DB_NC_PATH)
-client_nc = chromadb.PersistentClient(path=DB_NC_PATH)
+DB_TECH_DOCS_PATH = SCRIPT_DIR / "data/a220-tech-docs/vectordb"
+DB_NC_PATH = SCRIPT_DIR / "data/a220-non-conformities/vectordb"
 
-# Get collection names dynamically
-def get_collection_name(client, db_name: str):
-    """Get the first available collection name and log findings."""
-    logger.info("Listing collections for %s...", db_name)
-    try:
-        collections = client.list_collections()
-        if collections:
-            collection_names = [c.name for c in collections]
-            logger.info("Found collections for %s: %s", db_name, collection_names)
-            return collections[0].name
-        logger.warning("No collections found for %s.", db_name)
-        return None
-    except Exception as e:
-        logger.error("Failed to list collections for %s: %s", db_name, e)
-        return None
+# Profondeur adaptative: requête d'origine seule, puis variantes à règles, puis réécriture LLM,
+# en ne descendant d'un palier que si la confiance du palier précédent n'est pas "high".
+RETRIEVAL_TIERS = ("original", "rules", "llm")
+ADAPTIVE_DEPTH_ENABLED = os.getenv("RETRIEVAL_ADAPTIVE_DEPTH", "true").lower() in ("1", "true", "t")
+ADAPTIVE_DEPTH_STOP_LEVEL = "high"
 
-# Assume collection names are known or can be discovered.
-# For now, let's use a placeholder name. You may need to adjust this.
+# Noms préférés; la découverte via get_collection_name prend le relais s'ils n'existent pas.
 COLLECTION_TECH_DOCS = "langchain"
 COLLECTION_NC = "non_conformities"
 
-logger.info("Using tech docs collection: %s", COLLECTION_TECH_DOCS)
-logger.info("Using non-conformities collection: %s", COLLECTION_NC)
 
-# --- Configuration ---
-RERANKING_ENABLED = os.getenv("RERANKING_ENABLED", "false").lower() in ("true", "1", "t")
+def build_openai_embedding_function():
+    # Chroma n'est importé que lorsqu'il sert effectivement de moteur vectoriel.
+    import chromadb.utils.embedding_functions as embedding_functions
 
-# Cohere Client (initialisé uniquement si le reranking est activé)
-co = None
-if RERANKING_ENABLED:
-    COHERE_API_KEY = os.getenv("COHERE_API_KEY")
-    if COHERE_API_KEY:
-        logger.info("Reranking is enabled. Initializing Cohere client...")
-        co = cohere.Client(COHERE_API_KEY)
-    else:
-        logger.warning("RERANKING_ENABLED is true, but COHERE_API_KEY is not found. Reranking will be disabled.")
-else:
-    logger.info("Reranking is disabled.")
+    # We specify the model that matches the embedding dimensions (3072).
+    return embedding_functions.OpenAIEmbeddingFunction(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        model_name="text-embedding-3-large",
+    )
 
 
-def normalize_result_identity(item: Dict[str, Any]) -> str:
-    doc = item.get("doc") or item.get("chunk_id") or ""
-    normalized = pathlib.Path(str(doc).split(" ")[0]).stem.lower()
-    return normalized
+VECTOR_REGISTRY = VectorCollectionRegistry(
+    [
+        VectorCorpusSpec(
+            name="tech_docs",
+            chroma_path=DB_TECH_DOCS_PATH,
+            preferred_collection=COLLECTION_TECH_DOCS,
+            export_config=TECH_DOCS_VECTOR_CONFIG,
+            ata_metadata_field="ATA",
+        ),
+        VectorCorpusSpec(
+            name="non_conformities",
+            chroma_path=DB_NC_PATH,
+            preferred_collection=COLLECTION_NC,
+            export_config=NC_VECTOR_CONFIG,
+        ),
+    ],
+    engine=VECTOR_ENGINE,
+    embedding_function_factory=build_openai_embedding_function,
+)
 
 
-def merge_result_payload(existing: Dict[str, Any], incoming: Dict[str, Any], channel: str) -> Dict[str, Any]:
-    merged = dict(existing)
-    for key, value in incoming.items():
-        if key not in merged or merged.get(key) in (None, "", []):
-            merged[key] = value
+RESULT_CACHE = RetrievalResultCache()
 
-    if channel == "vector" and "distance" in incoming:
-        merged["vector_distance"] = incoming["distance"]
-    if channel == "lexical" and "bm25_score" in incoming:
-        merged["lexical_score"] = incoming["bm25_score"]
+# Disjoncteur du canal vectoriel (embedding + requête), None s'il est désactivé.
+# Un embedding absent du cache en mode rejeu hors ligne n'est pas une panne du canal vectoriel.
+VECTOR_BREAKER = build_vector_breaker(ignored_exceptions=(EmbeddingCacheMiss,))
 
-    if len(str(incoming.get("content", ""))) > len(str(merged.get("content", ""))):
-        merged["content"] = incoming.get("content")
+# Palier ayant produit la réponse, par corpus (exposé dans /retrieval/status).
+RETRIEVAL_TIER_COUNTS: Counter = Counter()
+DEGRADED_RESPONSE_COUNTS: Counter = Counter()
+RETRIEVAL_TIER_LOCK = threading.Lock()
 
-    return merged
 
+def warm_vector_registry() -> Dict[str, Dict[str, Any]]:
+    return VECTOR_REGISTRY.warm()
+
+
+def get_retrieval_status() -> Dict[str, Any]:
+    return {
+        "vector_engine": VECTOR_ENGINE,
+        "vector_query_mode": VECTOR_QUERY_MODE,
+        "vector_corpora": VECTOR_REGISTRY.status(),
+        "result_cache": RESULT_CACHE.stats(),
+        "rerank": RERANK_SERVICE.stats() if RERANK_SERVICE is not None else {"enabled": False},
+        "embedding_cache": cache.stats() if (cache := get_embedding_cache()) else {"enabled": False},
+        "doc_registry": get_doc_registry(DOC_REGISTRY_PATH).stats(),
+        "lexical_pools": {name: get_lexical_pool(config).stats() for name, config in DEFAULT_LEXICAL_CORPORA.items()},
+        "adaptive_depth": get_adaptive_depth_stats(),
+        "vector_breaker": get_vector_breaker_stats(),
+    }
 
-def reciprocal_rank_fuse(
-    *,
-    vector_results: List[Dict[str, Any]],
-    lexical_results: List[Dict[str, Any]],
-    final_limit: int,
-) -> List[Dict[str, Any]]:
-    fused: Dict[str, Dict[str, Any]] = {}
-
-    for channel_name, results in (
-        ("vector", vector_results),
-        ("lexical", lexical_results),
-    ):
-        for rank, item in enumerate(results, start=1):
-            identity = normalize_result_identity(item)
-            if not identity:
-                continue
-
-            if identity not in fused:
-                fused[identity] = {
-                    "item": dict(item),
-                    "rrf_score": 0.0,
-                    "best_rank": rank,
-                    "channels": set(),
-                }
-
-            fused_entry = fused[identity]
-            fused_entry["item"] = merge_result_payload(
-                fused_entry["item"],
-                item,
-                channel_name,
-            )
-            fused_entry["rrf_score"] += 1.0 / (RRF_K + rank)
-            fused_entry["best_rank"] = min(fused_entry["best_rank"], rank)
-            fused_entry["channels"].add(channel_name)
-
-    ranked = sorted(
-        fused.values(),
-        key=lambda entry: (
-            -entry["rrf_score"],
-            entry["best_rank"],
-            str(entry["item"].get("doc", "")),
-        ),
-    )
 
-    results: List[Dict[str, Any]] = []
-    for output_rank, entry in enumerate(ranked[:final_limit], start=1):
-        result = dict(entry["item"])
-        result["retrieval_channels"] = sorted(entry["channels"])
-        result["rrf_score"] = round(entry["rrf_score"], 8)
-        result["retrieval_rank"] = output_rank
-        results.append(result)
-    return results
+def get_vector_breaker_stats() -> Dict[str, Any]:
+    if VECTOR_BREAKER is None:
+        return {"enabled": False}
+    with RETRIEVAL_TIER_LOCK:
+        degraded = dict(sorted(DEGRADED_RESPONSE_COUNTS.items()))
+    return {"enabled": True, **VECTOR_BREAKER.stats(), "degraded_responses": degraded}
 
 
-def reciprocal_rank_fuse_batches(
+def call_vector_channel(fn: Any, *args: Any, **kwargs: Any) -> Any:
+    if VECTOR_BREAKER is None:
+        return fn(*args, **kwargs)
+    return VECTOR_BREAKER.call(fn, *args, **kwargs)
+
+
+def vector_channel_available() -> bool:
+    return VECTOR_BREAKER is None or VECTOR_BREAKER.available()
+
+
+def vector_channel_open() -> bool:
+    return VECTOR_BREAKER is not None and VECTOR_BREAKER.state == "open"
+
+
+def get_adaptive_depth_stats() -> Dict[str, Any]:
+    with RETRIEVAL_TIER_LOCK:
+        answered = {f"{corpus}:{tier}": count for (corpus, tier), count in sorted(RETRIEVAL_TIER_COUNTS.items())}
+    return {"enabled": ADAPTIVE_DEPTH_ENABLED, "answered_by_tier": answered}
+
+
+def record_retrieval_tier(corpus: str, tier: str, *, degraded: bool = False) -> None:
+    with RETRIEVAL_TIER_LOCK:
+        RETRIEVAL_TIER_COUNTS[(corpus, tier)] += 1
+        if degraded:
+            DEGRADED_RESPONSE_COUNTS[corpus] += 1
+
+
+def get_result_cache_key(
     *,
-    ranked_batches: List[List[Dict[str, Any]]],
-    channel: str,
-    final_limit: int,
-) -> List[Dict[str, Any]]:
-    fused: Dict[str, Dict[str, Any]] = {}
-
-    for batch_index, results in enumerate(ranked_batches, start=1):
-        for rank, item in enumerate(results, start=1):
-            identity = normalize_result_identity(item)
-            if not identity:
-                continue
-
-            if identity not in fused:
-                fused[identity] = {
-                    "item": dict(item),
-                    "rrf_score": 0.0,
-                    "best_rank": rank,
-                    "query_batches": set(),
-                }
-
-            fused_entry = fused[identity]
-            fused_entry["item"] = merge_result_payload(
-                fused_entry["item"],
-                item,
-                channel,
-            )
-            fused_entry["rrf_score"] += 1.0 / (RRF_K + rank)
-            fused_entry["best_rank"] = min(fused_entry["best_rank"], rank)
-            fused_entry["query_batches"].add(batch_index)
-
-    ranked = sorted(
-        fused.values(),
-        key=lambda entry: (
-            -entry["rrf_score"],
-            entry["best_rank"],
-            str(entry["item"].get("doc", "")),
-        ),
+    corpus: str,
+    query: str,
+    n_results: int,
+    use_query_rewrite: bool,
+    vector_query_mode: str = "per_variant",
+) -> ResultCacheKey | None:
+    vector_fingerprint = VECTOR_REGISTRY.fingerprint(corpus)
+    lexical_fingerprint = read_lexical_fingerprint(DEFAULT_LEXICAL_CORPORA[corpus])
+    if vector_fingerprint is None or lexical_fingerprint is None:
+        return None
+    return build_result_cache_key(
+        corpus=corpus,
+        query=query,
+        n_results=n_results,
+        use_query_rewrite=use_query_rewrite,
+        fingerprint=(vector_fingerprint, lexical_fingerprint),
+        vector_query_mode=vector_query_mode,
     )
 
-    results: List[Dict[str, Any]] = []
-    for output_rank, entry in enumerate(ranked[:final_limit], start=1):
-        result = dict(entry["item"])
-        result[f"{channel}_rrf_score"] = round(entry["rrf_score"], 8)
-        result[f"{channel}_variant_hits"] = len(entry["query_batches"])
-        result[f"{channel}_rank"] = output_rank
-        results.append(result)
-    return results
+# --- Configuration ---
+# Budget du rerank: un seul appel par corpus, sur les N premiers candidats fusionnés.
+RERANK_CANDIDATE_LIMIT = int(os.getenv("RERANK_CANDIDATE_LIMIT", "25"))
+
+# Service de rerank (Cohere ou stub local), None si le reranking est désactivé
+RERANK_SERVICE = build_rerank_service()
 
 
 def collect_query_variants(
@@ -213,177 +227,547 @@ def collect_query_variants(
     *,
     corpus: str,
     use_query_rewrite: bool,
+    tier: str = "llm",
 ) -> List[str]:
     normalized_query = str(query).strip()
-    if not use_query_rewrite:
+    if not use_query_rewrite or tier == "original":
         return [normalized_query]
 
-    rewrite = rewrite_retrieval_query(normalized_query, corpus=corpus)
+    rewrite = rewrite_retrieval_query(normalized_query, corpus=corpus, use_llm=tier == "llm")
     return list(rewrite.variants) or [normalized_query]
 
 
+def embed_query_variants(variants: Iterable[str]) -> Dict[str, np.ndarray]:
+    """Embeds every distinct variant in a single batched request."""
+    distinct_variants = list(dict.fromkeys(str(variant) for variant in variants if str(variant).strip()))
+    if not distinct_variants:
+        return {}
+    try:
+        vectors = call_vector_channel(embed_texts, distinct_variants)
+    except CircuitOpenError:
+        logger.info("Vector channel circuit is open, skipping %d query embeddings.", len(distinct_variants))
+        return {}
+    except Exception as e:
+        logger.error("Failed to embed %d query variants. Error: %s", len(distinct_variants), e, exc_info=True)
+        return {}
+    return dict(zip(distinct_variants, vectors))
+
+
+def prepare_query_embeddings(
+    query: str,
+    *,
+    use_query_rewrite: bool = True,
+    corpora: Sequence[str] = ("tech_docs", "non_conformities"),
+) -> Dict[str, np.ndarray]:
+    """Collects the variants of every corpus for a request and embeds them once."""
+    # En profondeur adaptative, la réécriture LLM n'est pas anticipée: ses variantes
+    # sont embeddées plus tard, seulement si ce palier est atteint.
+    tier = "rules" if ADAPTIVE_DEPTH_ENABLED else "llm"
+    variants: List[str] = []
+    for corpus in corpora:
+        variants.extend(
+            collect_query_variants(query, corpus=corpus, use_query_rewrite=use_query_rewrite, tier=tier)
+        )
+    return embed_query_variants(variants)
+
+
+def resolve_query_embeddings(
+    query_variants: Sequence[str],
+    query_embeddings: Dict[str, np.ndarray] | None,
+) -> Dict[str, np.ndarray]:
+    resolved = dict(query_embeddings or {})
+    missing = [variant for variant in query_variants if variant not in resolved]
+    if missing:
+        resolved.update(embed_query_variants(missing))
+    return resolved
+
+
+def combine_variant_embeddings(
+    query_variants: Sequence[str],
+    variant_embeddings: Dict[str, np.ndarray],
+) -> np.ndarray | None:
+    """Weighted centroid of the variant embeddings, rescaled to their mean norm."""
+    variants = [variant for variant in query_variants if variant in variant_embeddings]
+    if not variants:
+        return None
+    matrix = np.stack([np.asarray(variant_embeddings[variant], dtype=np.float32) for variant in variants])
+    weights = np.ones(len(variants), dtype=np.float32)
+    if variants[0] == query_variants[0]:
+        weights[0] = CENTROID_ORIGINAL_WEIGHT
+    centroid = weights @ matrix / weights.sum()
+    norm = float(np.linalg.norm(centroid))
+    if norm == 0.0:
+        return centroid
+    return centroid * (float(np.linalg.norm(matrix, axis=1).mean()) / norm)
+
+
+def vector_query_batches(
+    search_vector: Any,
+    query_variants: Sequence[str],
+    variant_embeddings: Dict[str, np.ndarray],
+    *,
+    candidate_limit: int,
+    ata_chapters: Sequence[str],
+    vector_query_mode: str,
+) -> List[List[Dict[str, Any]]]:
+    if vector_query_mode == "centroid" and len(query_variants) > 1:
+        centroid = combine_variant_embeddings(query_variants, variant_embeddings)
+        if centroid is None:
+            return []
+        return [
+            search_vector(
+                query_variants[0],
+                n_results=candidate_limit,
+                result_limit=candidate_limit,
+                query_embedding=centroid,
+                ata_chapters=ata_chapters,
+            )
+        ]
+    return [
+        search_vector(
+            variant,
+            n_results=candidate_limit,
+            result_limit=candidate_limit,
+            query_embedding=variant_embeddings[variant],
+            ata_chapters=ata_chapters,
+        )
+        for variant in query_variants
+        if variant in variant_embeddings
+    ]
+
+
+def resolve_ata_chapters(
+    query: str,
+    *,
+    corpus: str,
+    use_query_rewrite: bool,
+    tier: str = "llm",
+) -> Tuple[str, ...]:
+    """ATA chapters used to scope both channels: explicit in the query, or inferred by the rewrite."""
+    if not ATA_PARTITION_ENABLED:
+        return ()
+    normalized_query = str(query).strip()
+    if not use_query_rewrite:
+        return tuple(extract_ata_chapters(normalized_query))
+    # Les indices ATA à règles sont gratuits: le palier "original" partage le périmètre du palier "rules".
+    return tuple(rewrite_retrieval_query(normalized_query, corpus=corpus, use_llm=tier == "llm").ata_hints)
+
+
+def run_vector_query(
+    handle: Any,
+    *,
+    corpus: str,
+    query_embedding: np.ndarray,
+    n_results: int,
+    ata_chapters: Sequence[str] = (),
+) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
+    if VECTOR_ENGINE != "chroma":
+        rows = handle.partition_rows(ata_chapters) if ata_chapters else None
+        if rows is not None and rows.size == 0:
+            return [], [], []
+        hits = [lighten_hit(hit) for hit in handle.search(query_embedding, limit=n_results, rows=rows)]
+        snippets = [hit.pop("snippet") for hit in hits]
+        distances = [hit.pop("distance") for hit in hits]
+        return snippets, hits, distances
+
+    ata_field = VECTOR_REGISTRY.specs[corpus].ata_metadata_field
+    query_options: Dict[str, Any] = {}
+    fetch_limit = n_results
+    if ata_chapters and ata_field:
+        query_options["where"] = build_chroma_ata_where(ata_field, ata_chapters)
+    elif ata_chapters:
+        fetch_limit = n_results * ATA_PARTITION_OVERFETCH
+
+    # Pas de documents: le texte complet n'est rechargé que pour le top-k final.
+    results = handle.query(
+        query_embeddings=[query_embedding],
+        n_results=fetch_limit,
+        include=["metadatas", "distances"],
+        **query_options,
+    )
+    ids = results.get('ids', [[]])[0]
+    metadatas = [
+        lighten_hit(metadata or {}, **{VECTOR_ID_REF_FIELD: embedding_id})
+        for embedding_id, metadata in zip(ids, results.get('metadatas', [[]])[0])
+    ]
+    documents = [metadata.pop("snippet") for metadata in metadatas]
+    if not VECTOR_REGISTRY.uses_doc_ids(corpus):
+        # doc_id écrits par un autre registre (ou absents): la fusion repasse sur le nom de document.
+        for metadata in metadatas:
+            metadata.pop("doc_id", None)
+    distances = results.get('distances', [[]])[0]
+    if ata_chapters and not ata_field:
+        wanted = set(ata_chapters)
+        kept = [index for index, metadata in enumerate(metadatas) if item_ata_chapter(metadata) in wanted]
+        kept = kept[:n_results]
+        documents = [documents[index] for index in kept]
+        metadatas = [metadatas[index] for index in kept]
+        distances = [distances[index] for index in kept]
+    return documents, metadatas, distances
+
+
+def query_vector_corpus(
+    *,
+    corpus: str,
+    query: str,
+    n_results: int,
+    query_embedding: np.ndarray | None = None,
+    ata_chapters: Sequence[str] = (),
+) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
+    """Retourne (snippets, metadatas légères, distances) quel que soit le moteur vectoriel."""
+    handle = VECTOR_REGISTRY.resolve(corpus)
+    if query_embedding is None:
+        query_embedding = embed_texts([query])[0]
+
+    ata_scope = None
+    if ata_chapters:
+        documents, metadatas, distances = run_vector_query(
+            handle,
+            corpus=corpus,
+            query_embedding=query_embedding,
+            n_results=n_results,
+            ata_chapters=ata_chapters,
+        )
+        ata_scope = "partition"
+        if len(documents) < ATA_PARTITION_MIN_HITS:
+            logger.info(
+                "ATA partition %s of %s returned %d hits, falling back to global vector search.",
+                ",".join(ata_chapters),
+                corpus,
+                len(documents),
+            )
+            ata_scope = "global"
+    if ata_scope != "partition":
+        documents, metadatas, distances = run_vector_query(
+            handle,
+            corpus=corpus,
+            query_embedding=query_embedding,
+            n_results=n_results,
+        )
+    if ata_scope:
+        for metadata in metadatas:
+            metadata["ata_scope"] = ata_scope
+    return documents, metadatas, distances
+
+
 def search_documents_vector(
     query: str,
     n_results: int = VECTOR_CANDIDATE_LIMIT,
     result_limit: int = MAX_TECH_DOCS_RESULTS,
+    *,
+    query_embedding: np.ndarray | None = None,
+    ata_chapters: Sequence[str] = (),
 ) -> List[Dict[str, Any]]:
     """
-    Searches for documents, then optionally reranks them using Cohere for relevance.
+    Searches for documents by vector similarity; reranking happens once after fusion.
     """
-    if not COLLECTION_TECH_DOCS:
-        logger.warning("No tech docs collection available. Returning empty search results.")
-        return []
-    
-    logger.info("Querying tech docs collection '%s' for: '%s'", COLLECTION_TECH_DOCS, query)
+    logger.info("Querying tech docs vectors for: '%s'", query)
     try:
-        collection = client_tech_docs.get_collection(name=COLLECTION_TECH_DOCS, embedding_function=openai_ef)
-        results = collection.query(query_texts=[query], n_results=n_results)
-        
-        documents = results.get('documents', [[]])[0]
-        metadatas = results.get('metadatas', [[]])[0]
-
-        if not documents:
-            return []
-
-        # Reranking avec Cohere si activé et disponible
-        if co and RERANKING_ENABLED:
-            logger.info("Reranking %d tech docs with Cohere...", len(documents))
-            reranked_results = co.rerank(
-                model='rerank-english-v2.0',
-                query=query,
-                documents=[doc for doc in documents],
-                top_n=result_limit
-            )
-            
-            final_results = []
-            for hit in reranked_results.results:
-                original_doc = documents[hit.index]
-                metadata = metadatas[hit.index]
-                metadata['relevance_score'] = hit.relevance_score
-                final_results.append({
-                    "content": original_doc,
-                    **metadata
-                })
-            logger.info("Returning %d reranked results for tech docs.", len(final_results))
-            return final_results
-        else:
-            # Fallback si Cohere n'est pas utilisé : on retourne les N meilleurs résultats bruts
-            logger.info("Returning top %d results for tech docs without reranking.", MAX_TECH_DOCS_RESULTS)
-            top_results = []
-            distances = results.get('distances', [[]])[0]
-            for i in range(len(documents)):
-                metadata = metadatas[i]
-                metadata['distance'] = distances[i] if i < len(distances) else -1.0
-                top_results.append({
-                    "content": documents[i],
-                    **metadata
-                })
-            return top_results[:result_limit]
-
+        documents, metadatas, distances = call_vector_channel(
+            query_vector_corpus,
+            corpus="tech_docs",
+            query=query,
+            n_results=n_results,
+            query_embedding=query_embedding,
+            ata_chapters=ata_chapters,
+        )
+    except CircuitOpenError:
+        logger.info("Vector channel circuit is open, skipping tech docs vectors.")
+        return []
     except Exception as e:
-        logger.error(f"Failed to query or rerank tech docs. Error: {e}", exc_info=True)
+        logger.error(f"Failed to query tech docs. Error: {e}", exc_info=True)
         return []
 
+    top_results = []
+    for i in range(len(documents)):
+        metadata = metadatas[i]
+        metadata['distance'] = distances[i] if i < len(distances) else -1.0
+        top_results.append({
+            "snippet": documents[i],
+            **metadata
+        })
+    return top_results[:result_limit]
+
 
 def search_non_conformities_vector(
     query: str,
     n_results: int = VECTOR_CANDIDATE_LIMIT,
     result_limit: int = MAX_NC_RESULTS,
+    *,
+    query_embedding: np.ndarray | None = None,
+    ata_chapters: Sequence[str] = (),
 ) -> List[Dict[str, Any]]:
     """
-    Searches for non-conformities, then optionally reranks them using Cohere for relevance.
+    Searches for non-conformities by vector similarity; reranking happens once after fusion.
     """
-    if not COLLECTION_NC:
-        logger.warning("No non-conformities collection available. Returning empty search results.")
-        return []
-    
-    logger.info("Querying non-conformities collection '%s' for: '%s'", COLLECTION_NC, query)
+    logger.info("Querying non-conformities vectors for: '%s'", query)
     try:
-        collection = client_nc.get_collection(name=COLLECTION_NC, embedding_function=openai_ef)
-        results = collection.query(query_texts=[query], n_results=n_results)
-        
-        documents = results.get('documents', [[]])[0]
-        metadatas = results.get('metadatas', [[]])[0]
+        documents, metadatas, distances = call_vector_channel(
+            query_vector_corpus,
+            corpus="non_conformities",
+            query=query,
+            n_results=n_results,
+            query_embedding=query_embedding,
+            ata_chapters=ata_chapters,
+        )
+    except CircuitOpenError:
+        logger.info("Vector channel circuit is open, skipping non-conformities vectors.")
+        return []
+    except Exception as e:
+        logger.error(f"Failed to query non-conformities. Error: {e}", exc_info=True)
+        return []
 
-        if not documents:
-            return []
+    top_results = []
+    for i in range(len(documents)):
+        metadata = metadatas[i]
+        metadata['distance'] = distances[i] if i < len(distances) else -1.0
+        top_results.append({
+            "snippet": documents[i],
+            **metadata
+        })
+    return top_results[:result_limit]
+
+
+def load_chroma_payloads(collection: Any, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    payload = collection.get(ids=ids, include=["documents", "metadatas"])
+    return {
+        embedding_id: {**(metadata or {}), "content": document or ""}
+        for embedding_id, document, metadata in zip(
+            payload.get("ids") or [],
+            payload.get("documents") or [],
+            payload.get("metadatas") or [],
+        )
+    }
+
+
+def hydrate_corpus_results(corpus: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Loads full content (and heavy metadata) for the hits that leave retrieval."""
+    lexical_config = DEFAULT_LEXICAL_CORPORA[corpus]
+
+    def load_vector_payloads(refs: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        try:
+            handle = VECTOR_REGISTRY.resolve(corpus)
+            if VECTOR_ENGINE == "chroma":
+                return load_chroma_payloads(handle, refs)
+            return handle.load_payloads(refs)
+        except Exception as e:
+            logger.error(f"Failed to hydrate {corpus} vector hits. Error: {e}")
+            return {}
+
+    return hydrate_hits(
+        results,
+        {
+            LEXICAL_REF_FIELD: lambda rowids: load_lexical_contents(lexical_config, rowids),
+            VECTOR_ROW_REF_FIELD: load_vector_payloads,
+            VECTOR_ID_REF_FIELD: load_vector_payloads,
+        },
+    )
 
-        # Reranking avec Cohere si activé et disponible
-        if co and RERANKING_ENABLED:
-            logger.info("Reranking %d non-conformities with Cohere...", len(documents))
-            reranked_results = co.rerank(
-                model='rerank-english-v2.0',
-                query=query,
-                documents=[doc for doc in documents],
-                top_n=result_limit
-            )
-            
-            final_results = []
-            for hit in reranked_results.results:
-                original_doc = documents[hit.index]
-                metadata = metadatas[hit.index]
-                metadata['relevance_score'] = hit.relevance_score
-                final_results.append({
-                    "content": original_doc,
-                    **metadata
-                })
-            logger.info("Returning %d reranked results for non-conformities.", len(final_results))
-            return final_results
-        else:
-            logger.info("Returning top %d results for non-conformities without reranking.", MAX_NC_RESULTS)
-            top_results = []
-            distances = results.get('distances', [[]])[0]
-            for i in range(len(documents)):
-                metadata = metadatas[i]
-                metadata['distance'] = distances[i] if i < len(distances) else -1.0
-                top_results.append({
-                    "content": documents[i],
-                    **metadata
-                })
-            return top_results[:result_limit]
 
-    except Exception as e:
-        logger.error(f"Failed to query or rerank non-conformities. Error: {e}", exc_info=True)
-        return []
+def rerank_pool_size(final_limit: int) -> int:
+    if RERANK_SERVICE is not None:
+        return max(final_limit, RERANK_CANDIDATE_LIMIT)
+    return final_limit
 
 
-def search_documents(
+def rerank_fused_results(
     query: str,
-    n_results: int = 15,
+    results: List[Dict[str, Any]],
     *,
-    use_query_rewrite: bool = True,
+    final_limit: int,
 ) -> List[Dict[str, Any]]:
-    final_limit = min(max(n_results, 1), MAX_TECH_DOCS_RESULTS)
-    candidate_limit = max(final_limit, VECTOR_CANDIDATE_LIMIT, LEXICAL_CANDIDATE_LIMIT)
-    query_variants = collect_query_variants(
+    """Reranks the fused vector + lexical candidates once, top_n capped at final_limit."""
+    if RERANK_SERVICE is None or not results:
+        return results[:final_limit]
+
+    candidates = results[:RERANK_CANDIDATE_LIMIT]
+    logger.info("Reranking %d fused candidates...", len(candidates))
+    ranking = RERANK_SERVICE.rerank(
         query,
-        corpus="tech_docs",
-        use_query_rewrite=use_query_rewrite,
+        [str(item.get("content") or "") for item in candidates],
+        candidate_ids=[str(item.get("doc_id", normalize_result_identity(item))) for item in candidates],
+        top_n=final_limit,
+    )
+    if ranking is None:
+        # Deadline manquée ou erreur: ordre RRF, marqué pour ne pas être mis en cache.
+        return [{**item, "rerank_status": "fallback"} for item in results[:final_limit]]
+
+    reranked: List[Dict[str, Any]] = []
+    for rank, (index, relevance_score) in enumerate(ranking, start=1):
+        item = dict(candidates[index])
+        item["relevance_score"] = relevance_score
+        item["rerank_rank"] = rank
+        reranked.append(item)
+    return reranked
+
+
+def is_cacheable_result(results: List[Dict[str, Any]]) -> bool:
+    return not any(
+        item.get("rerank_status") == "fallback" or item.get("retrieval_degraded")
+        for item in results
     )
-    vector_results = reciprocal_rank_fuse_batches(
-        ranked_batches=[
-            search_documents_vector(
+
+
+def retrieval_tiers(use_query_rewrite: bool) -> Tuple[str, ...]:
+    if not use_query_rewrite:
+        return ("original",)
+    return RETRIEVAL_TIERS if ADAPTIVE_DEPTH_ENABLED else ("llm",)
+
+
+def search_corpus_adaptive(
+    corpus: str,
+    query: str,
+    *,
+    search_vector: Any,
+    search_lexical_many: Any,
+    final_limit: int,
+    use_query_rewrite: bool,
+    query_embeddings: Dict[str, np.ndarray] | None,
+    vector_query_mode: str,
+) -> List[Dict[str, Any]]:
+    """Fuses vector + lexical hits tier by tier, escalating only while confidence stays below high."""
+    candidate_limit = max(final_limit, VECTOR_CANDIDATE_LIMIT, LEXICAL_CANDIDATE_LIMIT)
+    tiers = retrieval_tiers(use_query_rewrite)
+    degraded = not vector_channel_available()
+    if degraded:
+        # Canal vectoriel coupé: lexical seul, et pas de réécriture LLM (même fournisseur en incident).
+        tiers = tuple(dict.fromkeys("rules" if tier == "llm" else tier for tier in tiers))
+    # Un palier ne relance que les variantes qu'il ajoute: les recherches déjà faites sont réutilisées.
+    vector_hits: Dict[Tuple[Any, ...], List[Dict[str, Any]]] = {}
+    lexical_hits: Dict[Tuple[Any, ...], List[Dict[str, Any]]] = {}
+
+    def cached_vector(variant: str, *, query_embedding: np.ndarray, ata_chapters: Sequence[str], **kwargs: Any):
+        key = (variant, tuple(ata_chapters), np.asarray(query_embedding, dtype=np.float32).tobytes())
+        if key not in vector_hits:
+            vector_hits[key] = search_vector(
                 variant,
+                query_embedding=query_embedding,
+                ata_chapters=ata_chapters,
+                **kwargs,
+            )
+        return vector_hits[key]
+
+    def cached_lexical(variants: Sequence[str], ata_chapters: Sequence[str]) -> List[List[Dict[str, Any]]]:
+        # Toutes les variantes manquantes du palier partent ensemble: un seul lot SQL par corpus.
+        missing = [variant for variant in dict.fromkeys(variants) if (variant, tuple(ata_chapters)) not in lexical_hits]
+        if missing:
+            batches = search_lexical_many(
+                missing,
                 n_results=candidate_limit,
-                result_limit=candidate_limit,
+                ata_chapters=ata_chapters,
+                min_partition_hits=ATA_PARTITION_MIN_HITS,
             )
-            for variant in query_variants
-        ],
-        channel="vector",
-        final_limit=candidate_limit,
+            for variant, hits in zip(missing, batches):
+                lexical_hits[(variant, tuple(ata_chapters))] = hits
+        return [lexical_hits[(variant, tuple(ata_chapters))] for variant in variants]
+
+    fused_results: List[Dict[str, Any]] = []
+    answered_tier = tiers[0]
+    searched: Tuple[Any, ...] | None = None
+    for tier in tiers:
+        query_variants = collect_query_variants(
+            query,
+            corpus=corpus,
+            use_query_rewrite=use_query_rewrite,
+            tier=tier,
+        )
+        ata_chapters = resolve_ata_chapters(query, corpus=corpus, use_query_rewrite=use_query_rewrite, tier=tier)
+        if (tuple(query_variants), ata_chapters) == searched:
+            # Le palier n'apporte ni variante ni chapitre ATA nouveau.
+            continue
+        searched = (tuple(query_variants), ata_chapters)
+        if not degraded:
+            query_embeddings = resolve_query_embeddings(query_variants, query_embeddings)
+        vector_channel = RankedChannel(
+            "vector",
+            [] if degraded else vector_query_batches(
+                cached_vector,
+                query_variants,
+                query_embeddings or {},
+                candidate_limit=candidate_limit,
+                ata_chapters=ata_chapters,
+                vector_query_mode=vector_query_mode,
+            ),
+            weight=VECTOR_CHANNEL_WEIGHT,
+            limit=candidate_limit,
+        )
+        lexical_channel = RankedChannel(
+            "lexical",
+            cached_lexical(query_variants, ata_chapters),
+            weight=LEXICAL_CHANNEL_WEIGHT,
+            limit=candidate_limit,
+        )
+        fused_results = fuse_ranked_channels(
+            [vector_channel, lexical_channel],
+            final_limit=rerank_pool_size(final_limit),
+        )
+        answered_tier = tier
+        if len(tiers) == 1:
+            break
+        confidence = assess_retrieval_confidence(fused_results, [])
+        if confidence["level"] == ADAPTIVE_DEPTH_STOP_LEVEL:
+            break
+        logger.info("%s retrieval confidence %s at tier %s, escalating.", corpus, confidence["level"], tier)
+
+    # Circuit ouvert pendant la requête: les recherches vectorielles restantes ont été court-circuitées.
+    degraded = degraded or vector_channel_open()
+    record_retrieval_tier(corpus, answered_tier, degraded=degraded)
+    if len(tiers) > 1:
+        fused_results = [{**item, "retrieval_tier": answered_tier} for item in fused_results]
+    if degraded:
+        fused_results = [{**item, "retrieval_degraded": "lexical_only"} for item in fused_results]
+    # Seul le pool de rerank (le top-k sans rerank) est hydraté.
+    fused_results = hydrate_corpus_results(corpus, fused_results)
+    return rerank_fused_results(query, fused_results, final_limit=final_limit)
+
+
+def search_documents(
+    query: str,
+    n_results: int = 15,
+    *,
+    use_query_rewrite: bool = True,
+    query_embeddings: Dict[str, np.ndarray] | None = None,
+    vector_query_mode: str | None = None,
+) -> List[Dict[str, Any]]:
+    vector_query_mode = vector_query_mode or VECTOR_QUERY_MODE
+    cache_key = get_result_cache_key(
+        corpus="tech_docs",
+        query=query,
+        n_results=n_results,
+        use_query_rewrite=use_query_rewrite,
+        vector_query_mode=vector_query_mode,
     )
-    lexical_results = reciprocal_rank_fuse_batches(
-        ranked_batches=[
-            search_documents_lexical(variant, n_results=candidate_limit)
-            for variant in query_variants
-        ],
-        channel="lexical",
-        final_limit=candidate_limit,
+    return RESULT_CACHE.get_or_compute(
+        cache_key,
+        lambda: search_documents_uncached(
+            query,
+            n_results,
+            use_query_rewrite=use_query_rewrite,
+            query_embeddings=query_embeddings,
+            vector_query_mode=vector_query_mode,
+        ),
+        cacheable=is_cacheable_result,
     )
-    return reciprocal_rank_fuse(
-        vector_results=vector_results,
-        lexical_results=lexical_results,
-        final_limit=final_limit,
+
+
+def search_documents_uncached(
+    query: str,
+    n_results: int = 15,
+    *,
+    use_query_rewrite: bool = True,
+    query_embeddings: Dict[str, np.ndarray] | None = None,
+    vector_query_mode: str | None = None,
+) -> List[Dict[str, Any]]:
+    vector_query_mode = vector_query_mode or VECTOR_QUERY_MODE
+    return search_corpus_adaptive(
+        "tech_docs",
+        query,
+        search_vector=search_documents_vector,
+        search_lexical_many=search_documents_lexical_many,
+        final_limit=min(max(n_results, 1), MAX_TECH_DOCS_RESULTS),
+        use_query_rewrite=use_query_rewrite,
+        query_embeddings=query_embeddings,
+        vector_query_mode=vector_query_mode,
     )
 
 
@@ -392,38 +776,48 @@ def search_non_conformities(
     n_results: int = 15,
     *,
     use_query_rewrite: bool = True,
+    query_embeddings: Dict[str, np.ndarray] | None = None,
+    vector_query_mode: str | None = None,
 ) -> List[Dict[str, Any]]:
-    final_limit = min(max(n_results, 1), MAX_NC_RESULTS)
-    candidate_limit = max(final_limit, VECTOR_CANDIDATE_LIMIT, LEXICAL_CANDIDATE_LIMIT)
-    query_variants = collect_query_variants(
-        query,
+    vector_query_mode = vector_query_mode or VECTOR_QUERY_MODE
+    cache_key = get_result_cache_key(
         corpus="non_conformities",
+        query=query,
+        n_results=n_results,
         use_query_rewrite=use_query_rewrite,
+        vector_query_mode=vector_query_mode,
     )
-    vector_results = reciprocal_rank_fuse_batches(
-        ranked_batches=[
-            search_non_conformities_vector(
-                variant,
-                n_results=candidate_limit,
-                result_limit=candidate_limit,
-            )
-            for variant in query_variants
-        ],
-        channel="vector",
-        final_limit=candidate_limit,
-    )
-    lexical_results = reciprocal_rank_fuse_batches(
-        ranked_batches=[
-            search_non_conformities_lexical(variant, n_results=candidate_limit)
-            for variant in query_variants
-        ],
-        channel="lexical",
-        final_limit=candidate_limit,
+    return RESULT_CACHE.get_or_compute(
+        cache_key,
+        lambda: search_non_conformities_uncached(
+            query,
+            n_results,
+            use_query_rewrite=use_query_rewrite,
+            query_embeddings=query_embeddings,
+            vector_query_mode=vector_query_mode,
+        ),
+        cacheable=is_cacheable_result,
     )
-    return reciprocal_rank_fuse(
-        vector_results=vector_results,
-        lexical_results=lexical_results,
-        final_limit=final_limit,
+
+
+def search_non_conformities_uncached(
+    query: str,
+    n_results: int = 15,
+    *,
+    use_query_rewrite: bool = True,
+    query_embeddings: Dict[str, np.ndarray] | None = None,
+    vector_query_mode: str | None = None,
+) -> List[Dict[str, Any]]:
+    vector_query_mode = vector_query_mode or VECTOR_QUERY_MODE
+    return search_corpus_adaptive(
+        "non_conformities",
+        query,
+        search_vector=search_non_conformities_vector,
+        search_lexical_many=search_non_conformities_lexical_many,
+        final_limit=min(max(n_results, 1), MAX_NC_RESULTS),
+        use_query_rewrite=use_query_rewrite,
+        query_embeddings=query_embeddings,
+        vector_query_mode=vector_query_mode,
     )
 
 def format_search_results(results: Any) -> Dict[str, Any]:
@@ -0,0 +1,236 @@
+import argparse
+import json
+import logging
+import math
+import os
+import pathlib
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from src.vector_quantization import compute_source_fingerprint, iter_row_blocks
+from src.vector_store import DEFAULT_VECTOR_CORPORA, ExactVectorStore, VectorExportConfig
+
+
+logger = logging.getLogger(__name__)
+
+IVF_EXPORT_VERSION = "vector-ivf-v1"
+# Nombre de listes sondées par requête: le seul réglage rappel / latence au runtime.
+IVF_NPROBE = int(os.getenv("RETRIEVAL_IVF_NPROBE", "8"))
+IVF_KMEANS_ITERATIONS = 20
+# Points d'entraînement par centroïde pour le k-means.
+IVF_TRAINING_POINTS_PER_LIST = 256
+
+
+def ivf_manifest_path(config: VectorExportConfig) -> pathlib.Path:
+    return config.manifest_path.parent / "ivf.json"
+
+
+def default_nlist(count: int) -> int:
+    return max(1, min(count, int(4 * math.sqrt(count))))
+
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # Seul le terme ||c||^2 - 2 x.c départage les centroïdes.
+    scores = vectors @ centroids.T
+    scores *= -2.0
+    scores += np.einsum("ij,ij->i", centroids, centroids)[np.newaxis, :]
+    return np.argmin(scores, axis=1)
+
+
+def train_centroids(
+    store: ExactVectorStore,
+    nlist: int,
+    *,
+    iterations: int = IVF_KMEANS_ITERATIONS,
+    seed: int = 13,
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    sample_size = min(store.count, nlist * IVF_TRAINING_POINTS_PER_LIST)
+    sample_rows = np.sort(rng.choice(store.count, size=sample_size, replace=False))
+    sample = np.asarray(store.vectors[sample_rows], dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = assign_to_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, np.newaxis]
+        if empty.any():
+            # Liste vide: on la ré-ensemence sur un point tiré au hasard.
+            centroids[empty] = sample[rng.choice(sample_size, size=int(empty.sum()), replace=False)]
+    return centroids
+
+
+def build_ivf_export(
+    config: VectorExportConfig,
+    *,
+    nlist: int | None = None,
+    iterations: int = IVF_KMEANS_ITERATIONS,
+    seed: int = 13,
+) -> Dict[str, Any]:
+    store = ExactVectorStore(config)
+    nlist = default_nlist(store.count) if nlist is None else nlist
+    if nlist <= 0 or nlist > store.count:
+        raise ValueError(f"nlist must be between 1 and {store.count}, got {nlist}")
+
+    centroids = train_centroids(store, nlist, iterations=iterations, seed=seed)
+    assignments = np.empty(store.count, dtype=np.int64)
+    for start, end in iter_row_blocks(store.count):
+        assignments[start:end] = assign_to_centroids(
+            np.asarray(store.vectors[start:end], dtype=np.float32),
+            centroids,
+        )
+
+    # Listes contiguës: lignes triées par liste, puis par ligne d'origine pour des lectures séquentielles.
+    order = np.lexsort((np.arange(store.count), assignments))
+    offsets = np.zeros(nlist + 1, dtype="<i8")
+    offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+
+    export_root = config.manifest_path.parent
+    vectors_path = export_root / "ivf-vectors.f32"
+    tmp_vectors_path = vectors_path.with_suffix(".f32.tmp")
+    with tmp_vectors_path.open("wb") as vectors_fp:
+        for start, end in iter_row_blocks(store.count):
+            rows = order[start:end]
+            sorted_rows = np.sort(rows)
+            block = np.asarray(store.vectors[sorted_rows], dtype="<f4")
+            vectors_fp.write(block[np.searchsorted(sorted_rows, rows)].tobytes())
+    os.replace(tmp_vectors_path, vectors_path)
+    order.astype("<i8").tofile(export_root / "ivf-rows.i64")
+    store.squared_norms[order].astype("<f4").tofile(export_root / "ivf-squared-norms.f32")
+    offsets.tofile(export_root / "ivf-offsets.i64")
+    centroids.astype("<f4").tofile(export_root / "ivf-centroids.f32")
+
+    list_sizes = np.diff(offsets)
+    manifest = {
+        "version": IVF_EXPORT_VERSION,
+        "corpus": config.name,
+        "count": store.count,
+        "dimensions": store.dimensions,
+        "nlist": nlist,
+        "vectorsPath": vectors_path.name,
+        "rowsPath": "ivf-rows.i64",
+        "squaredNormsPath": "ivf-squared-norms.f32",
+        "offsetsPath": "ivf-offsets.i64",
+        "centroidsPath": "ivf-centroids.f32",
+        "sourceFingerprint": compute_source_fingerprint(store),
+    }
+    manifest_path = ivf_manifest_path(config)
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return {
+        "corpus": config.name,
+        "count": store.count,
+        "nlist": nlist,
+        "min_list_size": int(list_sizes.min()),
+        "max_list_size": int(list_sizes.max()),
+        "manifest": str(manifest_path),
+    }
+
+
+class IVFVectorStore(ExactVectorStore):
+    """Inverted-file index: exact L2 over the nprobe lists closest to the query."""
+
+    def __init__(self, config: VectorExportConfig, *, nprobe: int = IVF_NPROBE):
+        super().__init__(config)
+        manifest_path = ivf_manifest_path(config)
+        if not manifest_path.exists():
+            raise FileNotFoundError(
+                f"IVF index not found: {manifest_path} (run python -m src.vector_ivf)"
+            )
+        ivf = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if ivf.get("version") != IVF_EXPORT_VERSION:
+            raise ValueError(f"Unsupported IVF index: {manifest_path}")
+        if ivf.get("sourceFingerprint") != compute_source_fingerprint(self):
+            raise ValueError(f"IVF index is stale for {config.name}: rebuild {manifest_path}")
+
+        export_root = manifest_path.parent
+        self.nlist = int(ivf["nlist"])
+        self.nprobe = min(max(nprobe, 1), self.nlist)
+        self.list_vectors = np.memmap(
+            export_root / ivf["vectorsPath"],
+            dtype="<f4",
+            mode="r",
+            shape=(self.count, self.dimensions),
+        )
+        self.list_rows = np.memmap(export_root / ivf["rowsPath"], dtype="<i8", mode="r")
+        self.list_squared_norms = np.memmap(export_root / ivf["squaredNormsPath"], dtype="<f4", mode="r")
+        self.offsets = np.fromfile(export_root / ivf["offsetsPath"], dtype="<i8")
+        self.centroids = np.fromfile(export_root / ivf["centroidsPath"], dtype="<f4").reshape(
+            self.nlist, self.dimensions
+        )
+
+    def probe_lists(self, queries: np.ndarray) -> np.ndarray:
+        distances = queries @ self.centroids.T
+        distances *= -2.0
+        distances += np.einsum("ij,ij->i", self.centroids, self.centroids)[np.newaxis, :]
+        if self.nprobe >= self.nlist:
+            return np.tile(np.arange(self.nlist), (queries.shape[0], 1))
+        return np.argpartition(distances, self.nprobe - 1, axis=1)[:, : self.nprobe]
+
+    def search_many(
+        self,
+        query_vectors: Sequence[Sequence[float]] | np.ndarray,
+        *,
+        limit: int = 10,
+        rows: np.ndarray | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        if rows is not None:
+            # Une partition ATA est déjà restreinte: scan exact de ses lignes.
+            return super().search_many(query_vectors, limit=limit, rows=rows)
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer")
+        queries = self.as_query_matrix(query_vectors)
+
+        results: List[List[Dict[str, Any]]] = []
+        for query, lists in zip(queries, self.probe_lists(queries)):
+            spans = [(int(self.offsets[index]), int(self.offsets[index + 1])) for index in np.sort(lists)]
+            spans = [(start, end) for start, end in spans if end > start]
+            if not spans:
+                results.append([])
+                continue
+            vectors = np.concatenate([self.list_vectors[start:end] for start, end in spans])
+            squared_norms = np.concatenate([self.list_squared_norms[start:end] for start, end in spans])
+            candidate_rows = np.concatenate([self.list_rows[start:end] for start, end in spans])
+            distances = squared_norms - 2.0 * (vectors @ query) + float(query @ query)
+            np.maximum(distances, 0.0, out=distances)
+            ranked = self.top_k_rows(distances, limit)
+            results.append(self.build_results(candidate_rows[ranked], distances[ranked]))
+        return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build IVF (k-means) indexes from vector-export-v1 artifacts.")
+    parser.add_argument(
+        "--corpus",
+        choices=["all", *DEFAULT_VECTOR_CORPORA.keys()],
+        default="all",
+        help="Corpus to index.",
+    )
+    parser.add_argument(
+        "--nlist",
+        type=int,
+        default=None,
+        help="Number of inverted lists (default: 4 * sqrt(count)).",
+    )
+    parser.add_argument("--iterations", type=int, default=IVF_KMEANS_ITERATIONS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    corpus_names = list(DEFAULT_VECTOR_CORPORA) if args.corpus == "all" else [args.corpus]
+    for corpus_name in corpus_names:
+        print(
+            build_ivf_export(
+                DEFAULT_VECTOR_CORPORA[corpus_name],
+                nlist=args.nlist,
+                iterations=args.iterations,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import json
+import logging
+import os
+import pathlib
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from src.vector_quantization import compute_source_fingerprint, iter_row_blocks
+from src.vector_store import DEFAULT_VECTOR_CORPORA, ExactVectorStore, VectorExportConfig
+
+
+logger = logging.getLogger(__name__)
+
+PREFIX_EXPORT_VERSION = "vector-prefix-v1"
+SUPPORTED_PREFIX_DIMENSIONS = (256, 512)
+# text-embedding-3-large reste exploitable tronqué à ses premières dimensions (Matryoshka).
+MATRYOSHKA_DIMENSIONS = int(os.getenv("RETRIEVAL_MATRYOSHKA_DIMENSIONS", "256"))
+MATRYOSHKA_CANDIDATES = int(os.getenv("RETRIEVAL_MATRYOSHKA_CANDIDATES", "300"))
+
+
+def prefix_manifest_path(config: VectorExportConfig, dimensions: int) -> pathlib.Path:
+    return config.manifest_path.parent / f"prefix-{dimensions}.json"
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def build_prefix_export(config: VectorExportConfig, *, dimensions: int) -> Dict[str, Any]:
+    store = ExactVectorStore(config)
+    if dimensions <= 0 or dimensions >= store.dimensions:
+        raise ValueError(
+            f"Prefix dimensions must be between 1 and {store.dimensions - 1}, got {dimensions}"
+        )
+
+    export_root = config.manifest_path.parent
+    prefix_path = export_root / f"prefix-{dimensions}.f32"
+    tmp_prefix_path = prefix_path.with_suffix(".f32.tmp")
+    with tmp_prefix_path.open("wb") as prefix_fp:
+        for start, end in iter_row_blocks(store.count):
+            block = np.asarray(store.vectors[start:end, :dimensions], dtype=np.float32)
+            prefix_fp.write(normalize_rows(block).astype("<f4").tobytes())
+    os.replace(tmp_prefix_path, prefix_path)
+
+    manifest = {
+        "version": PREFIX_EXPORT_VERSION,
+        "corpus": config.name,
+        "metric": "cosine",
+        "count": store.count,
+        "dimensions": dimensions,
+        "sourceDimensions": store.dimensions,
+        "prefixPath": prefix_path.name,
+        "sourceFingerprint": compute_source_fingerprint(store),
+    }
+    manifest_path = prefix_manifest_path(config, dimensions)
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return {
+        "corpus": config.name,
+        "dimensions": dimensions,
+        "source_dimensions": store.dimensions,
+        "count": store.count,
+        "prefix_bytes": prefix_path.stat().st_size,
+        "manifest": str(manifest_path),
+    }
+
+
+class MatryoshkaVectorStore(ExactVectorStore):
+    """Candidate selection on a renormalized embedding prefix, then exact L2 rerank on all dimensions."""
+
+    def __init__(
+        self,
+        config: VectorExportConfig,
+        *,
+        prefix_dimensions: int = MATRYOSHKA_DIMENSIONS,
+        candidates: int = MATRYOSHKA_CANDIDATES,
+    ):
+        super().__init__(config)
+        self.prefix_dimensions = prefix_dimensions
+        self.candidates = max(candidates, 1)
+
+        manifest_path = prefix_manifest_path(config, prefix_dimensions)
+        if not manifest_path.exists():
+            raise FileNotFoundError(
+                f"Prefix index not found: {manifest_path} "
+                f"(run python -m src.vector_matryoshka --dimensions {prefix_dimensions})"
+            )
+        prefix = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if prefix.get("version") != PREFIX_EXPORT_VERSION or prefix.get("dimensions") != prefix_dimensions:
+            raise ValueError(f"Unsupported prefix index: {manifest_path}")
+        if prefix.get("sourceFingerprint") != compute_source_fingerprint(self):
+            raise ValueError(f"Prefix index is stale for {config.name}: rebuild {manifest_path}")
+
+        self.prefix_vectors = np.memmap(
+            manifest_path.parent / prefix["prefixPath"],
+            dtype="<f4",
+            mode="r",
+            shape=(self.count, prefix_dimensions),
+        )
+
+    @property
+    def scan_bytes_per_vector(self) -> int:
+        return self.prefix_dimensions * 4
+
+    def search_many(
+        self,
+        query_vectors: Sequence[Sequence[float]] | np.ndarray,
+        *,
+        limit: int = 10,
+        rows: np.ndarray | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer")
+        queries = self.as_query_matrix(query_vectors)
+        prefix_queries = normalize_rows(queries[:, : self.prefix_dimensions])
+        prefix_vectors = self.prefix_vectors if rows is None else self.prefix_vectors[rows]
+        # Distance cosinus sur le préfixe: 1 - similarité, pour réutiliser top_k_rows.
+        prefix_distances = 1.0 - prefix_queries @ prefix_vectors.T
+        shortlist_size = max(self.candidates, limit)
+
+        results: List[List[Dict[str, Any]]] = []
+        for query, row_distances in zip(queries, prefix_distances):
+            shortlist = self.top_k_rows(row_distances, shortlist_size)
+            if rows is not None:
+                shortlist = rows[shortlist]
+            exact = self.exact_distances(query, shortlist)
+            order = np.argsort(exact, kind="stable")[:limit]
+            results.append(self.build_results(shortlist[order], exact[order]))
+        return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build Matryoshka prefix indexes from vector-export-v1 artifacts.")
+    parser.add_argument(
+        "--corpus",
+        choices=["all", *DEFAULT_VECTOR_CORPORA.keys()],
+        default="all",
+        help="Corpus to index.",
+    )
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        nargs="+",
+        default=list(SUPPORTED_PREFIX_DIMENSIONS),
+        help="Prefix sizes to build.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    corpus_names = list(DEFAULT_VECTOR_CORPORA) if args.corpus == "all" else [args.corpus]
+    for corpus_name in corpus_names:
+        for dimensions in args.dimensions:
+            print(build_prefix_export(DEFAULT_VECTOR_CORPORA[corpus_name], dimensions=dimensions))
+
+
+if __name__ == "__main__":
+    main()
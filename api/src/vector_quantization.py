@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pathlib
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from src.vector_store import DEFAULT_VECTOR_CORPORA, ExactVectorStore, VectorExportConfig, load_manifest
+
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_EXPORT_VERSION = "vector-quant-v1"
+SUPPORTED_PRECISIONS = ("int8", "fp16")
+CODE_DTYPES = {"int8": np.dtype("i1"), "fp16": np.dtype("<f2")}
+# Taille de la shortlist relue en float32 = limit * facteur.
+QUANTIZED_RESCORE_FACTOR = int(os.getenv("RETRIEVAL_QUANTIZED_RESCORE_FACTOR", "8"))
+# Nombre de lignes décodées à la fois pendant le premier passage.
+QUANTIZED_SCAN_ROWS = int(os.getenv("RETRIEVAL_QUANTIZED_SCAN_ROWS", "16384"))
+
+
+def quantized_manifest_path(config: VectorExportConfig, precision: str) -> pathlib.Path:
+    return config.manifest_path.parent / f"quantized-{precision}.json"
+
+
+def fingerprint_vectors(count: int, dimensions: int, squared_norms: np.ndarray) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{count}:{dimensions}".encode("utf-8"))
+    digest.update(squared_norms.tobytes())
+    return digest.hexdigest()
+
+
+def compute_source_fingerprint(store: ExactVectorStore) -> str:
+    return fingerprint_vectors(store.count, store.dimensions, store.squared_norms)
+
+
+def export_source_fingerprint(config: VectorExportConfig) -> str:
+    """Same fingerprint as compute_source_fingerprint, without loading the export items."""
+    manifest = load_manifest(config.manifest_path)
+    squared_norms = np.fromfile(manifest["squaredNormsPath"], dtype="<f4")
+    return fingerprint_vectors(manifest["count"], manifest["dimensions"], squared_norms)
+
+
+def iter_row_blocks(count: int, block_rows: int = QUANTIZED_SCAN_ROWS):
+    for start in range(0, count, block_rows):
+        yield start, min(start + block_rows, count)
+
+
+def build_quantized_export(config: VectorExportConfig, *, precision: str) -> Dict[str, Any]:
+    if precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(f"Unsupported precision: {precision}")
+
+    store = ExactVectorStore(config)
+    export_root = config.manifest_path.parent
+    codes_path = export_root / f"vectors.{precision}"
+    code_norms_path = export_root / f"squared_norms.{precision}.f32"
+    scales_path = export_root / "scales.int8.f32"
+
+    scales = None
+    if precision == "int8":
+        # Échelle symétrique par dimension: max |x_d| / 127.
+        max_abs = np.zeros(store.dimensions, dtype=np.float32)
+        for start, end in iter_row_blocks(store.count):
+            np.maximum(max_abs, np.abs(store.vectors[start:end]).max(axis=0), out=max_abs)
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype("<f4")
+
+    tmp_codes_path = codes_path.with_suffix(codes_path.suffix + ".tmp")
+    code_norms = np.empty(store.count, dtype="<f4")
+    with tmp_codes_path.open("wb") as codes_fp:
+        for start, end in iter_row_blocks(store.count):
+            block = np.asarray(store.vectors[start:end], dtype=np.float32)
+            if scales is not None:
+                codes = np.clip(np.rint(block / scales), -127, 127).astype(CODE_DTYPES[precision])
+                decoded = codes.astype(np.float32) * scales
+            else:
+                codes = block.astype(CODE_DTYPES[precision])
+                decoded = codes.astype(np.float32)
+            code_norms[start:end] = np.einsum("ij,ij->i", decoded, decoded)
+            codes_fp.write(codes.tobytes())
+    os.replace(tmp_codes_path, codes_path)
+    code_norms.tofile(code_norms_path)
+    if scales is not None:
+        scales.tofile(scales_path)
+
+    manifest = {
+        "version": QUANTIZED_EXPORT_VERSION,
+        "corpus": config.name,
+        "precision": precision,
+        "count": store.count,
+        "dimensions": store.dimensions,
+        "codesPath": codes_path.name,
+        "codeSquaredNormsPath": code_norms_path.name,
+        "scalesPath": scales_path.name if scales is not None else None,
+        "sourceFingerprint": compute_source_fingerprint(store),
+    }
+    manifest_path = quantized_manifest_path(config, precision)
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+
+    return {
+        "corpus": config.name,
+        "precision": precision,
+        "count": store.count,
+        "dimensions": store.dimensions,
+        "float32_bytes": store.count * store.dimensions * 4,
+        "code_bytes": codes_path.stat().st_size,
+        "manifest": str(manifest_path),
+    }
+
+
+class QuantizedVectorStore(ExactVectorStore):
+    """First pass over int8/fp16 codes, then exact float32 rescoring of a shortlist."""
+
+    def __init__(
+        self,
+        config: VectorExportConfig,
+        *,
+        precision: str = "int8",
+        rescore_factor: int = QUANTIZED_RESCORE_FACTOR,
+    ):
+        super().__init__(config)
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(f"Unsupported precision: {precision}")
+        self.precision = precision
+        self.rescore_factor = max(rescore_factor, 1)
+
+        manifest_path = quantized_manifest_path(config, precision)
+        if not manifest_path.exists():
+            raise FileNotFoundError(
+                f"Quantized export not found: {manifest_path} "
+                f"(run python -m src.vector_quantization --precision {precision})"
+            )
+        quantized = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if quantized.get("version") != QUANTIZED_EXPORT_VERSION or quantized.get("precision") != precision:
+            raise ValueError(f"Unsupported quantized export: {manifest_path}")
+        if quantized.get("sourceFingerprint") != compute_source_fingerprint(self):
+            raise ValueError(f"Quantized export is stale for {config.name}: rebuild {manifest_path}")
+
+        export_root = manifest_path.parent
+        self.codes = np.memmap(
+            export_root / quantized["codesPath"],
+            dtype=CODE_DTYPES[precision],
+            mode="r",
+            shape=(self.count, self.dimensions),
+        )
+        self.code_squared_norms = np.fromfile(export_root / quantized["codeSquaredNormsPath"], dtype="<f4")
+        self.scales = (
+            np.fromfile(export_root / quantized["scalesPath"], dtype="<f4")
+            if quantized.get("scalesPath")
+            else None
+        )
+
+    @property
+    def scan_bytes_per_vector(self) -> int:
+        return self.dimensions * CODE_DTYPES[self.precision].itemsize
+
+    def approximate_distances(self, queries: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        # Le produit q.(s * code) = (q * s).code évite de décoder le corpus entier.
+        scaled_queries = queries * self.scales if self.scales is not None else queries
+        row_count = self.count if rows is None else rows.shape[0]
+        dots = np.empty((queries.shape[0], row_count), dtype=np.float32)
+        for start, end in iter_row_blocks(row_count):
+            codes = self.codes[start:end] if rows is None else self.codes[rows[start:end]]
+            dots[:, start:end] = scaled_queries @ np.asarray(codes, dtype=np.float32).T
+        dots *= -2.0
+        dots += (self.code_squared_norms if rows is None else self.code_squared_norms[rows])[np.newaxis, :]
+        dots += np.einsum("ij,ij->i", queries, queries)[:, np.newaxis]
+        np.maximum(dots, 0.0, out=dots)
+        return dots
+
+    def search_many(
+        self,
+        query_vectors: Sequence[Sequence[float]] | np.ndarray,
+        *,
+        limit: int = 10,
+        rows: np.ndarray | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer")
+        queries = self.as_query_matrix(query_vectors)
+        approximate = self.approximate_distances(queries, rows)
+        shortlist_size = limit * self.rescore_factor
+
+        results: List[List[Dict[str, Any]]] = []
+        for query, row_distances in zip(queries, approximate):
+            shortlist = self.top_k_rows(row_distances, shortlist_size)
+            if rows is not None:
+                shortlist = rows[shortlist]
+            exact = self.exact_distances(query, shortlist)
+            order = np.argsort(exact, kind="stable")[:limit]
+            results.append(self.build_results(shortlist[order], exact[order]))
+        return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build int8 / fp16 codes from vector-export-v1 artifacts.")
+    parser.add_argument(
+        "--corpus",
+        choices=["all", *DEFAULT_VECTOR_CORPORA.keys()],
+        default="all",
+        help="Corpus to quantize.",
+    )
+    parser.add_argument(
+        "--precision",
+        choices=["all", *SUPPORTED_PRECISIONS],
+        default="int8",
+        help="Code precision to build.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    corpus_names = list(DEFAULT_VECTOR_CORPORA) if args.corpus == "all" else [args.corpus]
+    precisions = list(SUPPORTED_PRECISIONS) if args.precision == "all" else [args.precision]
+    for corpus_name in corpus_names:
+        for precision in precisions:
+            print(build_quantized_export(DEFAULT_VECTOR_CORPORA[corpus_name], precision=precision))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import logging
+import os
+import pathlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from src.doc_registry import registry_matches
+from src.vector_ivf import IVFVectorStore
+from src.vector_matryoshka import MatryoshkaVectorStore
+from src.vector_quantization import QuantizedVectorStore
+from src.vector_shards import ShardedChromaCollection, ShardedVectorStore, chroma_shard_names, shards_manifest_path
+from src.vector_store import ExactVectorStore, VectorExportConfig
+
+
+logger = logging.getLogger(__name__)
+
+# Intervalle minimal entre deux vérifications de l'index sur disque (stat du fichier signature).
+INDEX_CHECK_INTERVAL_SECONDS = float(os.getenv("RETRIEVAL_INDEX_CHECK_INTERVAL_SECONDS", "5"))
+
+
+EXPORT_STORE_BUILDERS: Dict[str, Callable[[VectorExportConfig], Any]] = {
+    "export_exact": ExactVectorStore,
+    "export_int8": lambda config: QuantizedVectorStore(config, precision="int8"),
+    "export_fp16": lambda config: QuantizedVectorStore(config, precision="fp16"),
+    "export_matryoshka": MatryoshkaVectorStore,
+    "export_ivf": IVFVectorStore,
+    "export_sharded": ShardedVectorStore,
+}
+
+
+def build_export_store(engine: str, config: VectorExportConfig) -> Any:
+    if engine not in EXPORT_STORE_BUILDERS:
+        raise ValueError(f"Unsupported export vector engine: {engine}")
+    return EXPORT_STORE_BUILDERS[engine](config)
+
+
+@dataclass(frozen=True)
+class VectorCorpusSpec:
+    name: str
+    chroma_path: pathlib.Path
+    preferred_collection: str
+    export_config: VectorExportConfig
+    # Champ de métadonnée Chroma portant le chapitre ATA (None: pas de filtre `where` possible).
+    ata_metadata_field: str | None = None
+
+
+@dataclass
+class RegistryEntry:
+    handle: Any
+    collection_name: str | None
+    signature: Tuple[int, int] | None
+    count: int
+    resolved_at: float
+    checked_at: float
+    # ef de recherche HNSW persisté dans la collection Chroma (fixé au build par le dataprep).
+    hnsw_search_ef: int | None = None
+    # Registre ayant attribué les doc_id des métadonnées Chroma (dataprep), None: pas de doc_id.
+    doc_registry_id: str | None = None
+
+
+def list_collection_names(client) -> list[str]:
+    try:
+        return [getattr(collection, "name", collection) for collection in client.list_collections()]
+    except Exception as e:
+        logger.error("Failed to list collections: %s", e)
+        return []
+
+
+def get_collection_name(client, db_name: str, preferred: str | None = None) -> str | None:
+    """Discovers the collection to pin, preferring the configured name when it exists."""
+    logger.info("Listing collections for %s...", db_name)
+    try:
+        collections = client.list_collections()
+    except Exception as e:
+        logger.error("Failed to list collections for %s: %s", db_name, e)
+        return None
+
+    collection_names = [getattr(collection, "name", collection) for collection in collections]
+    if not collection_names:
+        logger.warning("No collections found for %s.", db_name)
+        return None
+    logger.info("Found collections for %s: %s", db_name, collection_names)
+    if preferred and preferred in collection_names:
+        return preferred
+    return collection_names[0]
+
+
+def persisted_hnsw_search_ef(collection) -> int | None:
+    """HNSW search ef stored with a collection; read only, the serving path never modifies the index."""
+    try:
+        configuration = getattr(collection, "configuration", None) or {}
+    except Exception as e:
+        logger.warning("Could not read the configuration of %s: %s", getattr(collection, "name", collection), e)
+        configuration = {}
+    hnsw = configuration.get("hnsw") or {}
+    if hnsw.get("ef_search") is not None:
+        return hnsw["ef_search"]
+    # Collections plus anciennes: réglage resté dans les métadonnées (hnsw:search_ef).
+    metadata = getattr(collection, "metadata", None) or {}
+    return metadata.get("hnsw:search_ef")
+
+
+class VectorCollectionRegistry:
+    """Resolves each corpus to a pinned vector handle and re-resolves it only when the index changes."""
+
+    def __init__(
+        self,
+        specs: Iterable[VectorCorpusSpec],
+        *,
+        engine: str,
+        embedding_function_factory: Callable[[], Any] | None = None,
+        check_interval: float = INDEX_CHECK_INTERVAL_SECONDS,
+    ):
+        self.specs = {spec.name: spec for spec in specs}
+        self.engine = engine
+        self.embedding_function_factory = embedding_function_factory
+        self.check_interval = check_interval
+        self._entries: Dict[str, RegistryEntry] = {}
+        self._errors: Dict[str, str] = {}
+        self._clients: Dict[str, Any] = {}
+        self._embedding_function = None
+        self._lock = threading.Lock()
+
+    def signature_path(self, spec: VectorCorpusSpec) -> pathlib.Path:
+        if self.engine == "chroma":
+            return spec.chroma_path / "chroma.sqlite3"
+        if self.engine == "export_sharded":
+            return shards_manifest_path(spec.export_config)
+        return spec.export_config.manifest_path
+
+    def read_signature(self, spec: VectorCorpusSpec) -> Tuple[int, int] | None:
+        try:
+            stat = self.signature_path(spec).stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def fingerprint(self, corpus: str) -> str | None:
+        """Identifies the on-disk index version of a corpus, None when the index is missing."""
+        signature = self.read_signature(self.specs[corpus])
+        if signature is None:
+            return None
+        return f"{self.engine}:{signature[0]}:{signature[1]}"
+
+    def get_chroma_client(self, spec: VectorCorpusSpec):
+        client = self._clients.get(spec.name)
+        if client is None:
+            import chromadb
+
+            logger.info("Initializing ChromaDB client for %s at: %s", spec.name, spec.chroma_path)
+            client = chromadb.PersistentClient(path=str(spec.chroma_path))
+            self._clients[spec.name] = client
+        return client
+
+    def get_embedding_function(self):
+        if self._embedding_function is None and self.embedding_function_factory:
+            self._embedding_function = self.embedding_function_factory()
+        return self._embedding_function
+
+    def _resolve_entry(self, spec: VectorCorpusSpec, signature: Tuple[int, int] | None) -> RegistryEntry:
+        if signature is None:
+            raise FileNotFoundError(f"Vector index not found for {spec.name}: {self.signature_path(spec)}")
+
+        now = time.time()
+        if self.engine == "chroma":
+            client = self.get_chroma_client(spec)
+            shard_names = chroma_shard_names(list_collection_names(client), spec.preferred_collection)
+            if shard_names:
+                # Corpus construit en shards (<collection>__shard_NN): interrogés en parallèle.
+                collection_name = f"{spec.preferred_collection} x{len(shard_names)} shards"
+                collection = ShardedChromaCollection(
+                    spec.preferred_collection,
+                    [
+                        client.get_collection(name=name, embedding_function=self.get_embedding_function())
+                        for name in shard_names
+                    ],
+                )
+            else:
+                collection_name = get_collection_name(client, spec.name, spec.preferred_collection)
+                if not collection_name:
+                    raise LookupError(f"No collection available for {spec.name}")
+                collection = client.get_collection(
+                    name=collection_name,
+                    embedding_function=self.get_embedding_function(),
+                )
+            count = collection.count()
+            if count <= 0:
+                raise ValueError(f"Collection {collection_name} for {spec.name} is empty")
+            return RegistryEntry(
+                collection,
+                collection_name,
+                signature,
+                count,
+                now,
+                now,
+                hnsw_search_ef=persisted_hnsw_search_ef(collection),
+                doc_registry_id=(getattr(collection, "metadata", None) or {}).get("doc_registry_id"),
+            )
+
+        store = build_export_store(self.engine, spec.export_config)
+        return RegistryEntry(
+            store,
+            None,
+            signature,
+            store.count,
+            now,
+            now,
+            doc_registry_id=store.manifest.get("docRegistryId"),
+        )
+
+    def resolve(self, corpus: str) -> Any:
+        spec = self.specs[corpus]
+        entry = self._entries.get(corpus)
+        now = time.time()
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            return entry.handle
+
+        with self._lock:
+            entry = self._entries.get(corpus)
+            if entry is not None and time.time() - entry.checked_at < self.check_interval:
+                return entry.handle
+
+            signature = self.read_signature(spec)
+            if entry is not None and signature == entry.signature:
+                entry.checked_at = time.time()
+                return entry.handle
+
+            if entry is not None:
+                logger.info("Vector index changed for %s, re-resolving collection handle.", corpus)
+                # Un nouveau client Chroma est nécessaire pour relire un index reconstruit.
+                self._clients.pop(corpus, None)
+            try:
+                entry = self._resolve_entry(spec, signature)
+            except Exception as e:
+                self._entries.pop(corpus, None)
+                self._errors[corpus] = str(e)
+                raise
+            self._entries[corpus] = entry
+            self._errors.pop(corpus, None)
+            logger.info(
+                "Pinned %s vector handle for %s (%s, %d items).",
+                self.engine,
+                corpus,
+                entry.collection_name or spec.export_config.manifest_path,
+                entry.count,
+            )
+            return entry.handle
+
+    def uses_doc_ids(self, corpus: str) -> bool:
+        """Whether the doc_id metadata of a pinned Chroma collection matches the runtime registry."""
+        entry = self._entries.get(corpus)
+        if entry is None or entry.doc_registry_id is None:
+            return False
+        return registry_matches(self.specs[corpus].export_config.registry_path, entry.doc_registry_id)
+
+    def warm(self) -> Dict[str, Dict[str, Any]]:
+        for corpus in self.specs:
+            try:
+                self.resolve(corpus)
+            except Exception as e:
+                logger.error("Vector corpus %s is not ready: %s", corpus, e)
+        return self.status()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        report: Dict[str, Dict[str, Any]] = {}
+        for corpus, spec in self.specs.items():
+            entry = self._entries.get(corpus)
+            report[corpus] = {
+                "engine": self.engine,
+                "ready": entry is not None,
+                "collection": entry.collection_name if entry else None,
+                "count": entry.count if entry else 0,
+                "index_path": str(self.signature_path(spec)),
+                "hnsw_search_ef": entry.hnsw_search_ef if entry else None,
+                "doc_registry_id": entry.doc_registry_id if entry else None,
+                "resolved_at": entry.resolved_at if entry else None,
+                "error": self._errors.get(corpus),
+            }
+        return report
@@ -0,0 +1,368 @@
+import argparse
+import heapq
+import json
+import logging
+import os
+import pathlib
+import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from src.ata_partition import item_ata_chapter
+from src.doc_registry import document_identity
+from src.hit_hydration import VECTOR_ROW_REF_FIELD
+from src.vector_quantization import compute_source_fingerprint, export_source_fingerprint, iter_row_blocks
+from src.vector_store import (
+    VECTOR_EXPORT_VERSION,
+    DEFAULT_VECTOR_CORPORA,
+    ExactVectorStore,
+    VectorExportConfig,
+)
+
+
+logger = logging.getLogger(__name__)
+
+SHARD_EXPORT_VERSION = "vector-shards-v1"
+SUPPORTED_SHARD_STRATEGIES = ("hash", "ata")
+# Les produits matriciels numpy relâchent le GIL: un thread par shard occupe un cœur.
+SHARD_MAX_WORKERS = int(os.getenv("RETRIEVAL_SHARD_MAX_WORKERS", str(min(os.cpu_count() or 1, 8))))
+# Collections Chroma d'un corpus shardé: <collection>__shard_00, <collection>__shard_01...
+CHROMA_SHARD_SEPARATOR = "__shard_"
+
+_EXECUTOR: ThreadPoolExecutor | None = None
+
+
+def get_shard_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=max(SHARD_MAX_WORKERS, 1), thread_name_prefix="vector-shard")
+    return _EXECUTOR
+
+
+def scatter(calls: Sequence[Callable[[], Any]]) -> List[Any]:
+    if len(calls) <= 1:
+        return [call() for call in calls]
+    futures = [get_shard_executor().submit(call) for call in calls]
+    return [future.result() for future in futures]
+
+
+def merge_top_k(batches: Sequence[List[Dict[str, Any]]], limit: int, *, key: str = "distance") -> List[Dict[str, Any]]:
+    """Merges per-shard lists already sorted by ascending distance."""
+    return list(heapq.merge(*batches, key=lambda hit: hit[key]))[:limit]
+
+
+def shards_manifest_path(config: VectorExportConfig) -> pathlib.Path:
+    return config.manifest_path.parent / "shards" / "shards.json"
+
+
+def assign_shards(items: Sequence[Dict[str, Any]], *, num_shards: int, strategy: str) -> np.ndarray:
+    if num_shards <= 0:
+        raise ValueError("num_shards must be a positive integer")
+    if strategy == "hash":
+        # Tous les chunks d'un document restent dans le même shard.
+        return np.asarray(
+            [zlib.crc32(document_identity(item["doc"]).encode("utf-8")) % num_shards for item in items],
+            dtype=np.int64,
+        )
+    if strategy != "ata":
+        raise ValueError(f"Unsupported shard strategy: {strategy}")
+
+    # Un chapitre n'est jamais coupé; les plus gros chapitres vont d'abord au shard le moins chargé.
+    chapters = [item_ata_chapter(item) or "" for item in items]
+    sizes: Dict[str, int] = {}
+    for chapter in chapters:
+        sizes[chapter] = sizes.get(chapter, 0) + 1
+    loads = [0] * num_shards
+    chapter_shards: Dict[str, int] = {}
+    for chapter, size in sorted(sizes.items(), key=lambda entry: (-entry[1], entry[0])):
+        shard = min(range(num_shards), key=lambda index: loads[index])
+        chapter_shards[chapter] = shard
+        loads[shard] += size
+    return np.asarray([chapter_shards[chapter] for chapter in chapters], dtype=np.int64)
+
+
+def write_shard(store: ExactVectorStore, rows: np.ndarray, root: pathlib.Path) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    with (root / "vectors.f32").open("wb") as vectors_fp:
+        for start, end in iter_row_blocks(rows.shape[0]):
+            vectors_fp.write(np.asarray(store.vectors[rows[start:end]], dtype="<f4").tobytes())
+    store.squared_norms[rows].astype("<f4").tofile(root / "squared_norms.f32")
+    with (root / "items.jsonl").open("w", encoding="utf-8") as items_fp:
+        for row in rows:
+            items_fp.write(json.dumps(store.items[int(row)], ensure_ascii=False) + "\n")
+    # Ligne d'origine de chaque vecteur: les références de hit restent celles de l'export complet.
+    rows.astype("<i8").tofile(root / "rows.i64")
+    manifest = {
+        **{key: value for key, value in store.manifest.items() if not key.endswith("Path")},
+        "version": VECTOR_EXPORT_VERSION,
+        "count": int(rows.shape[0]),
+        "vectorsPath": "vectors.f32",
+        "squaredNormsPath": "squared_norms.f32",
+        "itemsPath": "items.jsonl",
+    }
+    (root / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+
+
+def build_sharded_export(config: VectorExportConfig, *, num_shards: int, strategy: str = "hash") -> Dict[str, Any]:
+    store = ExactVectorStore(config)
+    assignments = assign_shards(store.items, num_shards=num_shards, strategy=strategy)
+    manifest_path = shards_manifest_path(config)
+    shards_root = manifest_path.parent
+    if shards_root.exists():
+        shutil.rmtree(shards_root)
+
+    shards: List[Dict[str, Any]] = []
+    for shard in range(num_shards):
+        rows = np.flatnonzero(assignments == shard)
+        if rows.size == 0:
+            continue
+        shard_root = shards_root / f"shard-{shard:02d}"
+        write_shard(store, rows, shard_root)
+        chapters = sorted({item_ata_chapter(store.items[int(row)]) or "" for row in rows} - {""})
+        shards.append(
+            {
+                "path": f"{shard_root.name}/manifest.json",
+                "rowsPath": f"{shard_root.name}/rows.i64",
+                "count": int(rows.size),
+                "chapters": chapters,
+            }
+        )
+
+    # Le manifeste est écrit en dernier: c'est la signature que surveille le registre.
+    manifest = {
+        "version": SHARD_EXPORT_VERSION,
+        "corpus": config.name,
+        "strategy": strategy,
+        "count": store.count,
+        "dimensions": store.dimensions,
+        "sourceFingerprint": compute_source_fingerprint(store),
+        "shards": shards,
+    }
+    if store.manifest.get("docRegistryId"):
+        manifest["docRegistryId"] = store.manifest["docRegistryId"]
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return {
+        "corpus": config.name,
+        "strategy": strategy,
+        "count": store.count,
+        "shards": [shard["count"] for shard in shards],
+        "manifest": str(manifest_path),
+    }
+
+
+class ShardedVectorStore:
+    """Exact search over the shards of a corpus in parallel, merged into one top-k.
+
+    Row references (vector_row, partition rows) are rows of the unsharded export.
+    """
+
+    def __init__(self, config: VectorExportConfig):
+        self.config = config
+        manifest_path = shards_manifest_path(config)
+        if not manifest_path.exists():
+            raise FileNotFoundError(
+                f"Sharded export not found: {manifest_path} (run python -m src.vector_shards --shards N)"
+            )
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("version") != SHARD_EXPORT_VERSION:
+            raise ValueError(f"Unsupported sharded export: {manifest_path}")
+        if manifest.get("sourceFingerprint") != export_source_fingerprint(config):
+            raise ValueError(f"Sharded export is stale for {config.name}: rebuild {manifest_path}")
+        self.manifest = manifest
+        self.strategy = manifest["strategy"]
+        self.count = int(manifest["count"])
+        self.dimensions = int(manifest["dimensions"])
+
+        self.shards: List[ExactVectorStore] = []
+        self.shard_rows: List[np.ndarray] = []
+        owners = np.full(self.count, -1, dtype=np.int64)
+        local_rows = np.full(self.count, -1, dtype=np.int64)
+        for index, shard in enumerate(manifest["shards"]):
+            shard_config = VectorExportConfig(
+                name=config.name,
+                manifest_path=manifest_path.parent / shard["path"],
+                registry_path=config.registry_path,
+            )
+            store = ExactVectorStore(shard_config)
+            rows = np.fromfile(manifest_path.parent / shard["rowsPath"], dtype="<i8")
+            if rows.shape[0] != store.count:
+                raise ValueError(f"Shard row map mismatch for {config.name}: {shard['rowsPath']}")
+            owners[rows] = index
+            local_rows[rows] = np.arange(rows.shape[0])
+            self.shards.append(store)
+            self.shard_rows.append(rows)
+        if (owners < 0).any():
+            raise ValueError(f"Sharded export for {config.name} does not cover every row")
+        self.owners = owners
+        self.local_rows = local_rows
+        logger.info(
+            "Loaded %d %s shards for %s: %s vectors",
+            len(self.shards),
+            self.strategy,
+            config.name,
+            [store.count for store in self.shards],
+        )
+
+    @property
+    def scan_bytes_per_vector(self) -> int:
+        return self.dimensions * 4
+
+    def partition_rows(self, chapters: Sequence[str]) -> np.ndarray:
+        selected = [
+            rows[store.partition_rows(chapters)]
+            for store, rows in zip(self.shards, self.shard_rows)
+        ]
+        return np.unique(np.concatenate(selected)) if selected else np.empty(0, dtype=np.int64)
+
+    def _search_shard(self, index: int, queries: np.ndarray, limit: int, rows: np.ndarray | None):
+        store = self.shards[index]
+        batches = store.search_many(queries, limit=limit, rows=rows)
+        global_rows = self.shard_rows[index]
+        for hits in batches:
+            for hit in hits:
+                hit[VECTOR_ROW_REF_FIELD] = int(global_rows[hit[VECTOR_ROW_REF_FIELD]])
+        return batches
+
+    def search_many(
+        self,
+        query_vectors: Sequence[Sequence[float]] | np.ndarray,
+        *,
+        limit: int = 10,
+        rows: np.ndarray | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer")
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+
+        calls = []
+        for index in range(len(self.shards)):
+            shard_rows = None
+            if rows is not None:
+                # Seuls les shards qui portent des lignes demandées (ex. partition ATA) sont interrogés.
+                shard_rows = np.sort(self.local_rows[rows[self.owners[rows] == index]])
+                if shard_rows.size == 0:
+                    continue
+            calls.append(lambda index=index, shard_rows=shard_rows: self._search_shard(index, queries, limit, shard_rows))
+        shard_batches = scatter(calls)
+
+        results: List[List[Dict[str, Any]]] = []
+        for query_index in range(queries.shape[0]):
+            merged = merge_top_k([batches[query_index] for batches in shard_batches], limit)
+            for rank, hit in enumerate(merged, start=1):
+                hit["vector_rank"] = rank
+            results.append(merged)
+        return results
+
+    def search(
+        self,
+        query_vector: Sequence[float] | np.ndarray,
+        *,
+        limit: int = 10,
+        rows: np.ndarray | None = None,
+    ) -> List[Dict[str, Any]]:
+        return self.search_many([query_vector], limit=limit, rows=rows)[0]
+
+    def load_payloads(self, rows: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        payloads: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            if 0 <= int(row) < self.count:
+                store = self.shards[int(self.owners[int(row)])]
+                payloads[int(row)] = store.items[int(self.local_rows[int(row)])]
+        return payloads
+
+
+class ShardedChromaCollection:
+    """Chroma collections of one corpus (<name>__shard_NN), queried in parallel like a single one."""
+
+    def __init__(self, name: str, collections: Sequence[Any]):
+        self.name = name
+        self.collections = list(collections)
+
+    def count(self) -> int:
+        return sum(collection.count() for collection in self.collections)
+
+    @property
+    def configuration(self) -> Dict[str, Any]:
+        # Shards construits avec les mêmes paramètres HNSW (dataprep/create_nc_db.py).
+        return self.collections[0].configuration if self.collections else {}
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return (self.collections[0].metadata or {}) if self.collections else {}
+
+    def query(self, *, query_embeddings: Sequence[Any], n_results: int, include: Sequence[str], **options: Any):
+        include = list(include)
+        fields = ["ids", *include]
+        shard_results = scatter(
+            [
+                lambda collection=collection: collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    include=include,
+                    **options,
+                )
+                for collection in self.collections
+            ]
+        )
+        merged: Dict[str, List[List[Any]]] = {field: [] for field in fields}
+        for query_index in range(len(query_embeddings)):
+            hits = []
+            for result in shard_results:
+                columns = [(result.get(field) or [[]])[query_index] for field in fields]
+                hits.append([dict(zip(fields, values)) for values in zip(*columns)])
+            top = merge_top_k(hits, n_results, key="distances")
+            for field in fields:
+                merged[field].append([hit[field] for hit in top])
+        return merged
+
+    def get(self, *, ids: Sequence[str], include: Sequence[str]):
+        merged: Dict[str, List[Any]] = {"ids": [], **{field: [] for field in include}}
+        shard_results = scatter(
+            [
+                lambda collection=collection: collection.get(ids=list(ids), include=list(include))
+                for collection in self.collections
+            ]
+        )
+        for result in shard_results:
+            for field in merged:
+                merged[field].extend(result.get(field) or [])
+        return merged
+
+
+def chroma_shard_names(collection_names: Sequence[str], preferred: str) -> List[str]:
+    prefix = f"{preferred}{CHROMA_SHARD_SEPARATOR}"
+    return sorted(name for name in collection_names if name.startswith(prefix))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Split vector-export-v1 artifacts into shards for parallel search.")
+    parser.add_argument(
+        "--corpus",
+        choices=["all", *DEFAULT_VECTOR_CORPORA.keys()],
+        default="all",
+        help="Corpus to shard.",
+    )
+    parser.add_argument("--shards", type=int, default=4, help="Number of shards.")
+    parser.add_argument(
+        "--by",
+        choices=SUPPORTED_SHARD_STRATEGIES,
+        default="hash",
+        help="hash: by document; ata: whole ATA chapters per shard.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    corpus_names = list(DEFAULT_VECTOR_CORPORA) if args.corpus == "all" else [args.corpus]
+    for corpus_name in corpus_names:
+        print(build_sharded_export(DEFAULT_VECTOR_CORPORA[corpus_name], num_shards=args.shards, strategy=args.by))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import json
+import logging
+import pathlib
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from src.ata_partition import item_ata_chapter
+from src.doc_registry import DOC_REGISTRY_PATH, registry_matches
+from src.hit_hydration import VECTOR_ROW_REF_FIELD
+
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = pathlib.Path(__file__).parent.parent
+VECTOR_EXPORT_VERSION = "vector-export-v1"
+
+
+@dataclass(frozen=True)
+class VectorExportConfig:
+    name: str
+    manifest_path: pathlib.Path
+    # Registre d'ids de documents partagé avec l'index lexical (None: pas de doc_id).
+    registry_path: pathlib.Path | None = None
+
+
+TECH_DOCS_VECTOR_CONFIG = VectorExportConfig(
+    name="tech_docs",
+    manifest_path=SCRIPT_DIR / "data" / "a220-tech-docs" / "vector-export" / "manifest.json",
+    registry_path=DOC_REGISTRY_PATH,
+)
+
+NC_VECTOR_CONFIG = VectorExportConfig(
+    name="non_conformities",
+    manifest_path=SCRIPT_DIR / "data" / "a220-non-conformities" / "vector-export" / "manifest.json",
+    registry_path=DOC_REGISTRY_PATH,
+)
+
+DEFAULT_VECTOR_CORPORA = {
+    TECH_DOCS_VECTOR_CONFIG.name: TECH_DOCS_VECTOR_CONFIG,
+    NC_VECTOR_CONFIG.name: NC_VECTOR_CONFIG,
+}
+
+
+def resolve_export_path(manifest_path: pathlib.Path, relative_path: str) -> pathlib.Path:
+    path = pathlib.Path(relative_path)
+    return path if path.is_absolute() else manifest_path.parent / path
+
+
+def load_manifest(manifest_path: pathlib.Path) -> Dict[str, Any]:
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"Vector export manifest not found: {manifest_path}")
+
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("version") != VECTOR_EXPORT_VERSION:
+        raise ValueError(f"Unsupported vector export version: {manifest.get('version')}")
+    if manifest.get("metric") != "l2":
+        raise ValueError(f"Unsupported vector metric: {manifest.get('metric')}")
+
+    dimensions = int(manifest.get("dimensions", 0))
+    count = int(manifest.get("count", 0))
+    if dimensions <= 0 or count <= 0:
+        raise ValueError(
+            f"Invalid vector export shape in {manifest_path}: count={count}, dimensions={dimensions}"
+        )
+
+    return {
+        **manifest,
+        "dimensions": dimensions,
+        "count": count,
+        "vectorsPath": resolve_export_path(manifest_path, str(manifest.get("vectorsPath", ""))),
+        "squaredNormsPath": resolve_export_path(manifest_path, str(manifest.get("squaredNormsPath", ""))),
+        "itemsPath": resolve_export_path(manifest_path, str(manifest.get("itemsPath", ""))),
+    }
+
+
+def load_items(items_path: pathlib.Path) -> List[Dict[str, Any]]:
+    if not items_path.exists():
+        raise FileNotFoundError(f"Vector export items file not found: {items_path}")
+
+    items: List[Dict[str, Any]] = []
+    with items_path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            embedding_id = record.get("embedding_id", "")
+            record["doc"] = str(record.get("doc") or embedding_id)
+            record["chunk_id"] = str(record.get("chunk_id") or embedding_id)
+            record["content"] = str(record.get("content") or "")
+            items.append(record)
+    return items
+
+
+class ExactVectorStore:
+    """Brute-force L2 search over a memory-mapped vector-export-v1 artifact."""
+
+    def __init__(self, config: VectorExportConfig):
+        self.config = config
+        self.manifest = load_manifest(config.manifest_path)
+        self.count = self.manifest["count"]
+        self.dimensions = self.manifest["dimensions"]
+
+        vectors_path = self.manifest["vectorsPath"]
+        expected_bytes = self.count * self.dimensions * 4
+        if not vectors_path.exists():
+            raise FileNotFoundError(f"Vector export vector file not found: {vectors_path}")
+        if vectors_path.stat().st_size != expected_bytes:
+            raise ValueError(
+                f"Vector export size mismatch for {config.name}: expected {expected_bytes} bytes, "
+                f"got {vectors_path.stat().st_size}"
+            )
+        self.vectors = np.memmap(
+            vectors_path,
+            dtype="<f4",
+            mode="r",
+            shape=(self.count, self.dimensions),
+        )
+
+        squared_norms_path = self.manifest["squaredNormsPath"]
+        if not squared_norms_path.exists():
+            raise FileNotFoundError(f"Vector export squared norms file not found: {squared_norms_path}")
+        self.squared_norms = np.fromfile(squared_norms_path, dtype="<f4")
+        if self.squared_norms.shape[0] != self.count:
+            raise ValueError(
+                f"Vector export squared norms mismatch for {config.name}: expected {self.count}, "
+                f"got {self.squared_norms.shape[0]}"
+            )
+
+        self.items = load_items(self.manifest["itemsPath"])
+        if len(self.items) != self.count:
+            raise ValueError(
+                f"Vector export item count mismatch for {config.name}: expected {self.count}, "
+                f"got {len(self.items)}"
+            )
+        # doc_id des items: attribués au build (métadonnée Chroma), valables pour le registre du manifeste.
+        if not registry_matches(config.registry_path, self.manifest.get("docRegistryId")):
+            if any("doc_id" in item for item in self.items):
+                logger.warning(
+                    "Vector export for %s was built with another document registry: fusing on document names.",
+                    config.name,
+                )
+            for item in self.items:
+                item.pop("doc_id", None)
+        logger.info(
+            "Loaded vector export for %s: %d vectors x %d dims",
+            config.name,
+            self.count,
+            self.dimensions,
+        )
+
+    @property
+    def scan_bytes_per_vector(self) -> int:
+        return self.dimensions * 4
+
+    def as_query_matrix(self, query_vectors: Sequence[Sequence[float]] | np.ndarray) -> np.ndarray:
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if queries.ndim != 2 or queries.shape[1] != self.dimensions:
+            raise ValueError(
+                f"Query vector dimensions mismatch for {self.config.name}: expected {self.dimensions}, "
+                f"got {queries.shape[-1]}"
+            )
+        return queries
+
+    @cached_property
+    def ata_partitions(self) -> Dict[str, np.ndarray]:
+        """Rows of each ATA chapter, from item metadata or the ATA-xx document prefix."""
+        partitions: Dict[str, List[int]] = {}
+        for row, item in enumerate(self.items):
+            chapter = item_ata_chapter(item)
+            if chapter:
+                partitions.setdefault(chapter, []).append(row)
+        return {chapter: np.asarray(rows, dtype=np.int64) for chapter, rows in partitions.items()}
+
+    def partition_rows(self, chapters: Sequence[str]) -> np.ndarray:
+        selected = [self.ata_partitions[chapter] for chapter in chapters if chapter in self.ata_partitions]
+        if not selected:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(selected))
+
+    def compute_distances(self, queries: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, one matrix product for the whole batch.
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        squared_norms = self.squared_norms if rows is None else self.squared_norms[rows]
+        distances = queries @ vectors.T
+        distances *= -2.0
+        distances += squared_norms[np.newaxis, :]
+        distances += np.einsum("ij,ij->i", queries, queries)[:, np.newaxis]
+        np.maximum(distances, 0.0, out=distances)
+        return distances
+
+    def top_k_rows(self, distances: np.ndarray, limit: int) -> np.ndarray:
+        k = min(limit, distances.shape[0])
+        if k < distances.shape[0]:
+            candidates = np.argpartition(distances, k - 1)[:k]
+        else:
+            candidates = np.arange(distances.shape[0])
+        return candidates[np.argsort(distances[candidates], kind="stable")]
+
+    def exact_distances(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        # Relecture pleine précision d'une shortlist: lignes triées pour des accès disque séquentiels.
+        order = np.argsort(rows, kind="stable")
+        deltas = np.asarray(self.vectors[rows[order]], dtype=np.float32) - query
+        distances = np.empty(rows.shape[0], dtype=np.float32)
+        distances[order] = np.einsum("ij,ij->i", deltas, deltas)
+        return distances
+
+    def build_results(self, rows: np.ndarray, distances: np.ndarray) -> List[Dict[str, Any]]:
+        """Builds result dicts for ranked rows; distances are aligned with rows."""
+        results: List[Dict[str, Any]] = []
+        for rank, (row, distance) in enumerate(zip(rows, distances), start=1):
+            results.append(
+                {
+                    **self.items[int(row)],
+                    "corpus": self.config.name,
+                    "distance": round(float(distance), 10),
+                    "vector_rank": rank,
+                    VECTOR_ROW_REF_FIELD: int(row),
+                }
+            )
+        return results
+
+    def load_payloads(self, rows: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        return {int(row): self.items[int(row)] for row in rows if 0 <= int(row) < self.count}
+
+    def search_many(
+        self,
+        query_vectors: Sequence[Sequence[float]] | np.ndarray,
+        *,
+        limit: int = 10,
+        rows: np.ndarray | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Ranks every row, or only the given subset of rows (e.g. an ATA partition)."""
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer")
+        queries = self.as_query_matrix(query_vectors)
+        distances = self.compute_distances(queries, rows)
+        results: List[List[Dict[str, Any]]] = []
+        for row_distances in distances:
+            ranked = self.top_k_rows(row_distances, limit)
+            ranked_rows = ranked if rows is None else rows[ranked]
+            results.append(self.build_results(ranked_rows, row_distances[ranked]))
+        return results
+
+    def search(
+        self,
+        query_vector: Sequence[float] | np.ndarray,
+        *,
+        limit: int = 10,
+        rows: np.ndarray | None = None,
+    ) -> List[Dict[str, Any]]:
+        return self.search_many([query_vector], limit=limit, rows=rows)[0]
+
+
+@lru_cache(maxsize=None)
+def get_exact_vector_store(config: VectorExportConfig) -> ExactVectorStore:
+    return ExactVectorStore(config)
+
+
+def has_vector_export(config: VectorExportConfig) -> bool:
+    return config.manifest_path.exists()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import json
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parent
+API_ROOT = ROOT.parent
+if str(API_ROOT) not in sys.path:
+    sys.path.insert(0, str(API_ROOT))
+
+from src.embeddings import embed_texts
+from src.vector_store import DEFAULT_VECTOR_CORPORA, ExactVectorStore
+
+from run_rrf_eval import hit_at_k
+from run_vector_engine_benchmark import recall_at_k, summarize_latency
+
+CASES_PATH = ROOT / "eval_cases.json"
+REPORT_PATH = ROOT / "hnsw_sweep_report.json"
+TOP_KS = (5, 10)
+EXPECTED_PREFIX_KEYS = {
+    "tech_docs": "expected_tech_doc_prefixes",
+    "non_conformities": "expected_nc_prefixes",
+}
+ADD_BATCH_SIZE = 1000
+# Répétitions par requête: le jeu d'éval est petit, on stabilise p50/p95.
+QUERY_REPEATS = 5
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Sweep Chroma HNSW settings on the exported vectors and replay eval_cases.json.",
+    )
+    parser.add_argument(
+        "--corpus",
+        choices=["all", *DEFAULT_VECTOR_CORPORA.keys()],
+        default="all",
+    )
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32], help="hnsw:M values.")
+    parser.add_argument(
+        "--construction-ef",
+        type=int,
+        nargs="+",
+        default=[100],
+        help="hnsw:construction_ef values.",
+    )
+    parser.add_argument(
+        "--search-ef",
+        type=int,
+        nargs="+",
+        default=[10, 20, 40, 100],
+        help="hnsw:search_ef values, applied to each built collection.",
+    )
+    return parser.parse_args()
+
+
+def scalar_metadata(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value
+        for key, value in item.items()
+        if key != "content" and isinstance(value, (str, int, float, bool))
+    }
+
+
+def build_collection(client, store: ExactVectorStore, *, m: int, construction_ef: int):
+    collection = client.create_collection(
+        name=f"sweep-m{m}-ef{construction_ef}",
+        metadata={"hnsw:space": "l2", "hnsw:M": m, "hnsw:construction_ef": construction_ef},
+        embedding_function=None,
+    )
+    started = time.perf_counter()
+    for start in range(0, store.count, ADD_BATCH_SIZE):
+        end = min(start + ADD_BATCH_SIZE, store.count)
+        items = store.items[start:end]
+        collection.add(
+            ids=[str(item.get("embedding_id") or row) for row, item in enumerate(items, start=start)],
+            embeddings=np.asarray(store.vectors[start:end], dtype=np.float32),
+            metadatas=[scalar_metadata(item) for item in items],
+        )
+    return collection, time.perf_counter() - started
+
+
+def run_queries(collection, queries: np.ndarray, limit: int) -> tuple[List[List[str]], List[float]]:
+    ranked_docs: List[List[str]] = []
+    latencies_ms: List[float] = []
+    for query in queries:
+        for _ in range(QUERY_REPEATS):
+            started = time.perf_counter()
+            payload = collection.query(query_embeddings=[query], n_results=limit, include=["metadatas"])
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+        ranked_docs.append([str(metadata.get("doc", "")) for metadata in payload["metadatas"][0]])
+    return ranked_docs, latencies_ms
+
+
+def hit_ratios(cases: List[Dict], ranked_docs: List[List[str]], prefix_key: str) -> Dict[str, float]:
+    return {
+        f"hit@{k}": round(
+            sum(
+                hit_at_k([{"doc": doc} for doc in docs], case[prefix_key], k)
+                for case, docs in zip(cases, ranked_docs)
+            )
+            / max(len(cases), 1),
+            3,
+        )
+        for k in TOP_KS
+    }
+
+
+def sweep_corpus(corpus: str, cases: List[Dict], args: argparse.Namespace) -> Dict:
+    import chromadb
+
+    store = ExactVectorStore(DEFAULT_VECTOR_CORPORA[corpus])
+    queries = np.asarray(embed_texts([case["query"] for case in cases]), dtype=np.float32)
+    limit = max(TOP_KS)
+    prefix_key = EXPECTED_PREFIX_KEYS[corpus]
+
+    exact_hits = store.search_many(queries, limit=limit)
+    exact_docs = [[hit["doc"] for hit in hits] for hits in exact_hits]
+    report = {
+        "corpus": corpus,
+        "count": store.count,
+        "cases": len(cases),
+        "exact": hit_ratios(cases, exact_docs, prefix_key),
+        "settings": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="hnsw-sweep-") as tmp_dir:
+        client = chromadb.PersistentClient(path=tmp_dir)
+        for m, construction_ef in itertools.product(args.m, args.construction_ef):
+            collection, build_seconds = build_collection(
+                client,
+                store,
+                m=m,
+                construction_ef=construction_ef,
+            )
+            for search_ef in args.search_ef:
+                # Collections temporaires du balayage: seul endroit où search_ef est modifié après le build.
+                collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+                collection = client.get_collection(collection.name)
+                ranked_docs, latencies = run_queries(collection, queries, limit)
+                report["settings"].append(
+                    {
+                        "hnsw:M": m,
+                        "hnsw:construction_ef": construction_ef,
+                        "hnsw:search_ef": search_ef,
+                        "build_seconds": round(build_seconds, 2),
+                        **hit_ratios(cases, ranked_docs, prefix_key),
+                        f"recall@{limit}_vs_exact": recall_at_k(exact_docs, ranked_docs, limit),
+                        **summarize_latency(latencies),
+                    }
+                )
+            client.delete_collection(collection.name)
+    return report
+
+
+def main() -> None:
+    args = parse_args()
+    cases = json.loads(CASES_PATH.read_text(encoding="utf-8"))["cases"]
+    corpus_names = list(DEFAULT_VECTOR_CORPORA) if args.corpus == "all" else [args.corpus]
+    report = {
+        "generated_at": time.strftime("%Y-%m-%d"),
+        "corpora": [sweep_corpus(corpus, cases, args) for corpus in corpus_names],
+    }
+    REPORT_PATH.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
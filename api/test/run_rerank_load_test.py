@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import logging
+import pathlib
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parent
+API_ROOT = ROOT.parent
+if str(API_ROOT) not in sys.path:
+    sys.path.insert(0, str(API_ROOT))
+
+from src.rerank_service import RerankService, StubRerankBackend
+
+CASES_PATH = ROOT / "eval_cases.json"
+REPORT_PATH = ROOT / "rerank_load_report.json"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load-test the rerank service offline against the stub backend.",
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent callers (API worker threads).")
+    parser.add_argument("--workers", type=int, default=4, help="Rerank service worker pool size.")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Mean stub backend latency.")
+    parser.add_argument("--deadline-ms", type=float, default=300.0)
+    parser.add_argument("--candidates", type=int, default=25)
+    parser.add_argument(
+        "--repeat-ratio",
+        type=float,
+        default=0.3,
+        help="Share of requests replaying an earlier (query, candidates) pair.",
+    )
+    parser.add_argument("--seed", type=int, default=13)
+    return parser.parse_args()
+
+
+def build_requests(args: argparse.Namespace) -> List[Dict]:
+    rng = random.Random(args.seed)
+    queries = [case["query"] for case in json.loads(CASES_PATH.read_text(encoding="utf-8"))["cases"]]
+    vocabulary = sorted({token for query in queries for token in query.split()})
+    requests: List[Dict] = []
+    for index in range(args.requests):
+        if requests and rng.random() < args.repeat_ratio:
+            requests.append(rng.choice(requests))
+            continue
+        documents = [" ".join(rng.sample(vocabulary, k=min(12, len(vocabulary)))) for _ in range(args.candidates)]
+        requests.append(
+            {
+                "query": rng.choice(queries),
+                "documents": documents,
+                "candidate_ids": [f"req{index}-doc{position}" for position in range(args.candidates)],
+            }
+        )
+    return requests
+
+
+def main() -> None:
+    args = parse_args()
+    # Les deadlines manquées sont comptées dans le rapport, pas besoin d'un warning par requête.
+    logging.getLogger("src.rerank_service").setLevel(logging.ERROR)
+    service = RerankService(
+        StubRerankBackend(latency_ms=args.latency_ms, seed=args.seed),
+        model="stub",
+        deadline_ms=args.deadline_ms,
+        max_workers=args.workers,
+    )
+    requests = build_requests(args)
+
+    def call(request: Dict) -> float:
+        started = time.perf_counter()
+        service.rerank(
+            request["query"],
+            request["documents"],
+            candidate_ids=request["candidate_ids"],
+            top_n=10,
+        )
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as callers:
+        caller_latencies = list(callers.map(call, requests))
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%d"),
+        "settings": vars(args),
+        "throughput_rps": round(len(requests) / elapsed, 2),
+        # Latence vue par l'appelant: bornée par la deadline, sauf file d'attente du pool.
+        "caller_p50_ms": round(float(np.percentile(caller_latencies, 50)), 3),
+        "caller_p95_ms": round(float(np.percentile(caller_latencies, 95)), 3),
+        "caller_max_ms": round(float(np.max(caller_latencies)), 3),
+        "service": service.stats(),
+    }
+    REPORT_PATH.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ if str(API_ROOT) not in sys.path:
     sys.path.insert(0, str(API_ROOT))
 
 from src.search import (
+    collect_query_variants,
     search_documents,
     search_documents_vector,
     search_non_conformities,
@@ -19,6 +20,7 @@ from src.search import (
 CASES_PATH = ROOT / "eval_cases.json"
 REPORT_PATH = ROOT / "rrf_eval_report.json"
 TOP_KS = (5, 10)
+LABELS = ("vector", "rrf", "rewritten", "centroid")
 
 
 def normalize_name(value: str) -> str:
@@ -47,12 +49,30 @@ def evaluate_case(case: Dict) -> Dict:
     rrf_nc = search_non_conformities(query, n_results=max(TOP_KS), use_query_rewrite=False)
     rewritten_tech = search_documents(query, n_results=max(TOP_KS), use_query_rewrite=True)
     rewritten_nc = search_non_conformities(query, n_results=max(TOP_KS), use_query_rewrite=True)
+    # Même réécriture, mais une seule recherche vectorielle par corpus sur le centroïde des variantes.
+    centroid_tech = search_documents(
+        query,
+        n_results=max(TOP_KS),
+        use_query_rewrite=True,
+        vector_query_mode="centroid",
+    )
+    centroid_nc = search_non_conformities(
+        query,
+        n_results=max(TOP_KS),
+        use_query_rewrite=True,
+        vector_query_mode="centroid",
+    )
+    rewritten_vector_searches = sum(
+        len(collect_query_variants(query, corpus=corpus, use_query_rewrite=True))
+        for corpus in ("tech_docs", "non_conformities")
+    )
 
     metrics = {}
     for label, tech_hits, nc_hits in (
         ("vector", vector_tech, vector_nc),
         ("rrf", rrf_tech, rrf_nc),
         ("rewritten", rewritten_tech, rewritten_nc),
+        ("centroid", centroid_tech, centroid_nc),
     ):
         for k in TOP_KS:
             metrics[f"{label}_tech_hit@{k}"] = hit_at_k(
@@ -71,12 +91,20 @@ def evaluate_case(case: Dict) -> Dict:
         "label": case["label"],
         "query": query,
         "metrics": metrics,
+        "vector_searches": {"rewritten": rewritten_vector_searches, "centroid": 2},
+        # Palier de profondeur adaptative ayant produit la réponse "rewritten" (original, rules, llm).
+        "retrieval_tiers": {
+            "tech_docs": rewritten_tech[0].get("retrieval_tier") if rewritten_tech else None,
+            "non_conformities": rewritten_nc[0].get("retrieval_tier") if rewritten_nc else None,
+        },
         "top_vector_tech_docs": vector_tech,
         "top_rrf_tech_docs": rrf_tech,
         "top_rewritten_tech_docs": rewritten_tech,
         "top_vector_non_conformities": vector_nc,
         "top_rrf_non_conformities": rrf_nc,
         "top_rewritten_non_conformities": rewritten_nc,
+        "top_centroid_tech_docs": centroid_tech,
+        "top_centroid_non_conformities": centroid_nc,
     }
 
 
@@ -84,7 +112,7 @@ def summarize(case_results: List[Dict]) -> Dict:
     summary = {}
     keys = [
         f"{label}_{corpus}_hit@{k}"
-        for label in ("vector", "rrf", "rewritten")
+        for label in LABELS
         for corpus in ("tech", "nc")
         for k in TOP_KS
     ]
@@ -95,6 +123,13 @@ def summarize(case_results: List[Dict]) -> Dict:
             "total": len(case_results),
             "ratio": round(hits / len(case_results), 3) if case_results else 0.0,
         }
+    for label in ("rewritten", "centroid"):
+        summary[f"{label}_vector_searches"] = sum(row["vector_searches"][label] for row in case_results)
+    tiers: Dict[str, int] = {}
+    for row in case_results:
+        for tier in row["retrieval_tiers"].values():
+            tiers[str(tier)] = tiers.get(str(tier), 0) + 1
+    summary["rewritten_retrieval_tiers"] = tiers
     return summary
 
 
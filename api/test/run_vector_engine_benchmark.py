@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parent
+API_ROOT = ROOT.parent
+if str(API_ROOT) not in sys.path:
+    sys.path.insert(0, str(API_ROOT))
+
+from src.vector_registry import EXPORT_STORE_BUILDERS, build_export_store
+from src.vector_store import DEFAULT_VECTOR_CORPORA, ExactVectorStore
+
+REPORT_PATH = ROOT / "vector_engine_benchmark_report.json"
+# Le flux actuel récupère VECTOR_CANDIDATE_LIMIT candidats par variante avant la fusion.
+VECTOR_CANDIDATE_LIMIT = int(os.getenv("VECTOR_CANDIDATE_LIMIT", "15"))
+TOP_KS = tuple(sorted({5, 10, VECTOR_CANDIDATE_LIMIT}))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare export vector engines against the float32 exact baseline.",
+    )
+    parser.add_argument(
+        "--corpus",
+        choices=["all", *DEFAULT_VECTOR_CORPORA.keys()],
+        default="all",
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=[engine for engine in EXPORT_STORE_BUILDERS if engine != "export_exact"],
+        choices=list(EXPORT_STORE_BUILDERS),
+    )
+    parser.add_argument("--sample", type=int, default=200, help="Number of sampled query vectors.")
+    parser.add_argument(
+        "--noise",
+        type=float,
+        default=0.05,
+        help="Relative gaussian noise added to sampled vectors so queries are not exact corpus rows.",
+    )
+    parser.add_argument("--seed", type=int, default=13)
+    return parser.parse_args()
+
+
+def sample_queries(store: ExactVectorStore, sample: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(store.count, size=min(sample, store.count), replace=False))
+    queries = np.asarray(store.vectors[rows], dtype=np.float32)
+    if noise > 0:
+        scale = noise * np.linalg.norm(queries, axis=1, keepdims=True) / np.sqrt(store.dimensions)
+        queries = queries + rng.normal(size=queries.shape).astype(np.float32) * scale
+    return queries
+
+
+def run_queries(store: ExactVectorStore, queries: np.ndarray, limit: int) -> tuple[List[List[str]], List[float]]:
+    ranked_ids: List[List[str]] = []
+    latencies_ms: List[float] = []
+    for query in queries:
+        started = time.perf_counter()
+        hits = store.search(query, limit=limit)
+        latencies_ms.append((time.perf_counter() - started) * 1000)
+        ranked_ids.append([hit.get("embedding_id") or hit["chunk_id"] or hit["doc"] for hit in hits])
+    return ranked_ids, latencies_ms
+
+
+def summarize_latency(latencies_ms: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies_ms)
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+    }
+
+
+def recall_at_k(baseline: List[List[str]], candidate: List[List[str]], k: int) -> float:
+    overlaps = [
+        len(set(expected[:k]) & set(found[:k])) / max(len(expected[:k]), 1)
+        for expected, found in zip(baseline, candidate)
+    ]
+    return round(float(np.mean(overlaps)), 4) if overlaps else 0.0
+
+
+def benchmark_corpus(corpus: str, engines: List[str], sample: int, noise: float, seed: int) -> Dict:
+    config = DEFAULT_VECTOR_CORPORA[corpus]
+    baseline_store = ExactVectorStore(config)
+    queries = sample_queries(baseline_store, sample, noise, seed)
+    limit = max(TOP_KS)
+    baseline_ids, baseline_latencies = run_queries(baseline_store, queries, limit)
+
+    report = {
+        "corpus": corpus,
+        "count": baseline_store.count,
+        "dimensions": baseline_store.dimensions,
+        "queries": int(queries.shape[0]),
+        "engines": {
+            "export_exact": {
+                **summarize_latency(baseline_latencies),
+                "scan_bytes_per_vector": baseline_store.scan_bytes_per_vector,
+                **{f"recall@{k}": 1.0 for k in TOP_KS},
+            }
+        },
+    }
+    for engine in engines:
+        if engine == "export_exact":
+            continue
+        store = build_export_store(engine, config)
+        ranked_ids, latencies = run_queries(store, queries, limit)
+        report["engines"][engine] = {
+            **summarize_latency(latencies),
+            "scan_bytes_per_vector": store.scan_bytes_per_vector,
+            **{f"recall@{k}": recall_at_k(baseline_ids, ranked_ids, k) for k in TOP_KS},
+        }
+    return report
+
+
+def main() -> None:
+    args = parse_args()
+    corpus_names = list(DEFAULT_VECTOR_CORPORA) if args.corpus == "all" else [args.corpus]
+    report = {
+        "generated_at": time.strftime("%Y-%m-%d"),
+        "sample": args.sample,
+        "noise": args.noise,
+        "corpora": [
+            benchmark_corpus(corpus, args.engines, args.sample, args.noise, args.seed)
+            for corpus in corpus_names
+        ],
+    }
+    REPORT_PATH.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.vector_store import VectorExportConfig
+
+
+def write_vector_export(
+    root: Path,
+    vectors: np.ndarray,
+    docs: list[str] | None = None,
+    *,
+    doc_registry_id: str | None = None,
+) -> VectorExportConfig:
+    """vector-export-v1 artifact as written by backend-ts/scripts/export_chroma_vectors.py."""
+    root.mkdir(parents=True, exist_ok=True)
+    vectors = np.asarray(vectors).astype("<f4")
+    if docs is None:
+        docs = [f"doc-{index}.md" for index in range(len(vectors))]
+    vectors.tofile(root / "vectors.f32")
+    (vectors * vectors).sum(axis=1).astype("<f4").tofile(root / "squared_norms.f32")
+    with (root / "items.jsonl").open("w", encoding="utf-8") as handle:
+        for index, doc in enumerate(docs):
+            handle.write(
+                json.dumps({"doc": doc, "chunk_id": f"chunk-{index}", "content": f"content {doc}"})
+                + "\n"
+            )
+    manifest = {
+        "version": "vector-export-v1",
+        "corpus": "tech_docs",
+        "embeddingModel": "text-embedding-3-large",
+        "metric": "l2",
+        "dimensions": int(vectors.shape[1]),
+        "count": int(vectors.shape[0]),
+        "vectorsPath": "vectors.f32",
+        "squaredNormsPath": "squared_norms.f32",
+        "itemsPath": "items.jsonl",
+    }
+    if doc_registry_id is not None:
+        manifest["docRegistryId"] = doc_registry_id
+    (root / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    return VectorExportConfig(name="tech_docs", manifest_path=root / "manifest.json")
@@ -56,28 +56,31 @@ def check_rule_based_rewrite() -> None:
 
 def check_search_variant_integration() -> None:
     original_vector = search_module.search_documents_vector
-    original_lexical = search_module.search_documents_lexical
+    original_lexical = search_module.search_documents_lexical_many
     original_rewrite = search_module.rewrite_retrieval_query
+    original_embed_texts = search_module.embed_texts
 
     vector_calls = []
     lexical_calls = []
 
-    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10):
+    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10, *, query_embedding=None, ata_chapters=()):
         vector_calls.append(query)
         if "ATA 28" in query:
             return [{"doc": "ATA-28-hit.md", "content": "fuel tank grounding", "distance": 0.1}]
         return [{"doc": "ATA-50-hit.md", "content": "static discharge cable", "distance": 0.2}]
 
-    def fake_lexical(query: str, n_results: int = 10):
-        lexical_calls.append(query)
-        if "ATA 28" in query:
-            return [{"doc": "ATA-28-hit.md", "content": "fuel tank grounding", "bm25_score": -5.0}]
-        return []
+    def fake_lexical(queries, n_results: int = 10, **kwargs):
+        lexical_calls.extend(queries)
+        return [
+            [{"doc": "ATA-28-hit.md", "content": "fuel tank grounding", "bm25_score": -5.0}] if "ATA 28" in query else []
+            for query in queries
+        ]
 
     try:
         search_module.search_documents_vector = fake_vector
-        search_module.search_documents_lexical = fake_lexical
-        search_module.rewrite_retrieval_query = lambda query, *, corpus: QueryRewriteResult(
+        search_module.search_documents_lexical_many = fake_lexical
+        search_module.embed_texts = lambda texts: [[1.0, 0.0] for _ in texts]
+        search_module.rewrite_retrieval_query = lambda query, *, corpus, **kwargs: QueryRewriteResult(
             original_query=query,
             normalized_query=query.lower(),
             corpus=corpus,
@@ -95,8 +98,9 @@ def check_search_variant_integration() -> None:
         )
     finally:
         search_module.search_documents_vector = original_vector
-        search_module.search_documents_lexical = original_lexical
+        search_module.search_documents_lexical_many = original_lexical
         search_module.rewrite_retrieval_query = original_rewrite
+        search_module.embed_texts = original_embed_texts
 
     assert vector_calls == [
         "electrostatic discharge reservoir tank",
@@ -94,8 +94,11 @@ core_module.PROMPTS = {}
 core_module.PROVIDERS = {"openai": object()}
 
 search_module = types.ModuleType("src.search")
-search_module.search_documents = lambda query, n_results=15: TECH_DOC_RESULTS
-search_module.search_non_conformities = lambda query, n_results=15: NC_RESULTS
+search_module.search_documents = lambda query, n_results=15, **kwargs: TECH_DOC_RESULTS
+search_module.search_non_conformities = lambda query, n_results=15, **kwargs: NC_RESULTS
+search_module.prepare_query_embeddings = lambda query, **kwargs: {}
+search_module.warm_vector_registry = lambda: {}
+search_module.get_retrieval_status = lambda: {}
 search_module.format_search_results = lambda results: {"sources": results if isinstance(results, list) else []}
 
 ai_stream_module = types.ModuleType("src.ai_stream")
@@ -0,0 +1,91 @@
+import gc
+import logging
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import app as app_module
+
+
+REQUEST = {
+    "provider": "openai",
+    "messages": [{"role": "000", "text": "Rewrite the report.", "description": "Rivet flushness.", "history": []}],
+}
+
+
+def test_streaming_doc_search_failure_consumes_the_nc_search(monkeypatch, caplog) -> None:
+    nc_started = threading.Event()
+
+    async def fake_run_prompt(name, provider, **variables):
+        return "ATA 56 windshield rivet flushness"
+
+    def failing_doc_search(query, **kwargs):
+        nc_started.wait(5)
+        raise RuntimeError("doc search down")
+
+    def failing_nc_search(query, **kwargs):
+        nc_started.set()
+        raise RuntimeError("nc search down")
+
+    monkeypatch.setattr(app_module, "run_prompt", fake_run_prompt)
+    monkeypatch.setattr(app_module, "prepare_query_embeddings", lambda query, **kwargs: {})
+    monkeypatch.setattr(app_module, "search_documents", failing_doc_search)
+    monkeypatch.setattr(app_module, "search_non_conformities", failing_nc_search)
+    monkeypatch.setattr(app_module.MEMORY_STORE, "read_working_memory", lambda session_id: {})
+    monkeypatch.setattr(app_module.MEMORY_STORE, "search_episodic_memory", lambda query, limit=3: [])
+
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        with pytest.raises(RuntimeError, match="doc search down"):
+            with TestClient(app_module.app).stream(
+                "POST", "/ai", json=REQUEST, headers={"Accept": "text/event-stream"}
+            ) as response:
+                "".join(response.iter_text())
+        gc.collect()
+
+    assert nc_started.is_set()
+    assert "never retrieved" not in caplog.text
+
+
+def test_merge_episodic_results_order() -> None:
+    episodic = [
+        {"doc": "EPISODIC-1", "content": "validated a"},
+        {"doc": "EPISODIC-2", "content": "validated b"},
+        {"doc": "ATA-28-c.md", "content": "validated c", "episode_id": "e3"},
+    ]
+    nc = [
+        {"doc": "ATA-52-d.md", "content": "nc d", "rrf_score": 0.03},
+        {"doc": "ATA-28-c.md", "content": "nc c, longer text", "rrf_score": 0.02},
+        {"doc": "ATA-21-e.md", "content": "nc e", "rrf_score": 0.01},
+    ]
+
+    merged = app_module.merge_episodic_results(nc, episodic)
+
+    # RRF pondéré: un document présent dans les deux canaux passe en tête, payloads fusionnés;
+    # sinon les souvenirs épisodiques restent devant les NC, chacun dans son ordre.
+    assert [item["doc"] for item in merged] == [
+        "ATA-28-c.md",
+        "EPISODIC-1",
+        "EPISODIC-2",
+        "ATA-52-d.md",
+        "ATA-21-e.md",
+    ]
+    assert merged[0]["episode_id"] == "e3" and merged[0]["content"] == "nc c, longer text"
+    assert "retrieval_channels" not in merged[1] and merged[3]["rrf_score"] == 0.03
+    assert [item["doc"] for item in app_module.merge_episodic_results(nc, [])] == [item["doc"] for item in nc]
+
+
+def test_merge_episodic_results_keeps_hits_without_identity() -> None:
+    episodic = [{"content": "validated note without source", "episode_id": "e1"}]
+    nc = [
+        {"doc": "ATA-52-d.md", "content": "nc d", "rrf_score": 0.03},
+        {"doc": "", "chunk_id": "", "content": "nc without reference"},
+    ]
+
+    merged = app_module.merge_episodic_results(nc, episodic)
+
+    assert [item["content"] for item in merged] == [
+        "nc d",
+        "validated note without source",
+        "nc without reference",
+    ]
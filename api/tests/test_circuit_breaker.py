@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from src import search as search_module
+from src.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.embeddings import EmbeddingCacheMiss
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing_call():
+    raise TimeoutError("embedding API timeout")
+
+
+def test_breaker_opens_after_failures_and_recovers_with_a_probe() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker("vector", failure_threshold=2, slow_call_ms=10_000, cooldown_s=30, clock=clock)
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            breaker.call(failing_call)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "never called")
+
+    # Sonde ratée: le circuit se rouvre pour un nouveau délai.
+    clock.now = 31
+    assert breaker.available()
+    with pytest.raises(TimeoutError):
+        breaker.call(failing_call)
+    assert breaker.state == "open" and not breaker.available()
+
+    clock.now = 62
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+    stats = breaker.stats()
+    assert stats["opened"] == 2 and stats["probes"] == 2 and stats["rejected"] == 1
+
+
+def test_breaker_counts_slow_calls_as_failures() -> None:
+    breaker = CircuitBreaker("vector", failure_threshold=1, slow_call_ms=-1, cooldown_s=30, clock=FakeClock())
+
+    assert breaker.call(lambda: "late") == "late"
+
+    assert breaker.state == "open"
+    assert breaker.stats()["slow_calls"] == 1
+
+
+def test_offline_cache_misses_do_not_trip_the_vector_breaker(monkeypatch) -> None:
+    breaker = CircuitBreaker(
+        "vector",
+        failure_threshold=1,
+        slow_call_ms=10_000,
+        cooldown_s=30,
+        clock=FakeClock(),
+        ignored_exceptions=search_module.VECTOR_BREAKER.ignored_exceptions,
+    )
+    monkeypatch.setattr(search_module, "VECTOR_BREAKER", breaker)
+
+    def cache_miss(texts):
+        raise EmbeddingCacheMiss(f"{len(texts)} query embeddings missing from cache in offline mode")
+
+    monkeypatch.setattr(search_module, "embed_texts", cache_miss)
+
+    for _ in range(3):
+        assert search_module.embed_query_variants(["hydraulic leak"]) == {}
+    stats = breaker.stats()
+    assert stats["state"] == "closed" and stats["failures"] == 0 and stats["ignored"] == 3
+
+
+def test_open_breaker_runs_lexical_only_and_marks_results(monkeypatch) -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker("vector", failure_threshold=1, slow_call_ms=10_000, cooldown_s=30, clock=clock)
+    with pytest.raises(TimeoutError):
+        breaker.call(failing_call)
+    embed_calls = []
+    vector_calls = []
+
+    def recording_embed_texts(texts):
+        embed_calls.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    def fake_vector(query, n_results=15, result_limit=10, *, query_embedding=None, ata_chapters=()):
+        vector_calls.append(query)
+        return [{"doc": "ATA-28-vector.md", "content": "vector hit", "distance": 0.1}]
+
+    monkeypatch.setattr(search_module, "VECTOR_BREAKER", breaker)
+    monkeypatch.setattr(search_module, "embed_texts", recording_embed_texts)
+    monkeypatch.setattr(search_module, "search_non_conformities_vector", fake_vector)
+    monkeypatch.setattr(
+        search_module,
+        "search_non_conformities_lexical_many",
+        lambda queries, n_results=10, **kwargs: [
+            [{"doc": "ATA-28-lexical.md", "content": "lexical", "bm25_score": -2.0}] for _ in queries
+        ],
+    )
+
+    assert search_module.prepare_query_embeddings("fuel tank grounding", use_query_rewrite=False) == {}
+    results = search_module.search_non_conformities("fuel tank grounding", use_query_rewrite=False)
+
+    assert embed_calls == [] and vector_calls == []
+    assert [item["doc"] for item in results] == ["ATA-28-lexical.md"]
+    assert results[0]["retrieval_degraded"] == "lexical_only"
+    assert not search_module.is_cacheable_result(results)
+
+    # Après le délai, la sonde passe et le canal vectoriel revient.
+    clock.now = 31
+    results = search_module.search_non_conformities("fuel tank grounding", use_query_rewrite=False)
+
+    assert breaker.state == "closed"
+    assert "retrieval_degraded" not in results[0]
+    assert sorted(item["doc"] for item in results) == ["ATA-28-lexical.md", "ATA-28-vector.md"]
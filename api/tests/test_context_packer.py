@@ -0,0 +1,76 @@
+import json
+import logging
+import re
+
+import pytest
+
+from src import context_packer
+from src.context_packer import TokenCounter, get_token_counter, pack_search_results, pack_sources
+from src.prompt import build_prompt_registry
+
+
+def test_pack_sources_keeps_rank_order_drops_ranking_fields_and_duplicates() -> None:
+    passage = " ".join(f"word{index}" for index in range(40))
+    items = [
+        {"doc": "ATA-28-A.md", "content": passage, "rrf_score": 0.03, "match_query": "fuel*", "ATA": "28"},
+        # Même passage sous un autre doc (page dupliquée): ignoré.
+        {"doc": "ATA-28-B.md", "content": passage + " trailing", "rrf_score": 0.02},
+        {"doc": "ATA-52-C.md", "content": "door seal inspection", "retrieval_channels": ["lexical"]},
+    ]
+
+    packed, report = pack_sources(items, budget=1000, counter=TokenCounter("missing-encoding"))
+
+    assert [item["doc"] for item in packed] == ["ATA-28-A.md", "ATA-52-C.md"]
+    assert packed[0] == {"doc": "ATA-28-A.md", "ATA": "28", "content": passage}
+    assert report.duplicates == 1
+
+
+def test_pack_sources_truncates_and_stops_at_the_budget() -> None:
+    counter = TokenCounter("missing-encoding")
+    items = [
+        {"doc": f"ATA-21-{index}.md", "content": " ".join(f"cabin{index}-{word}" for word in range(400))}
+        for index in range(5)
+    ]
+
+    packed, report = pack_sources(items, budget=600, counter=counter, max_source_tokens=400)
+
+    assert len(packed) == 2
+    assert report.truncated == 2 and report.dropped == 3
+    assert sum(counter.count(json.dumps(item)) for item in packed) <= 600
+    assert pack_search_results(["not", "formatted"], budget=10, label="x") == ["not", "formatted"]
+
+
+@pytest.mark.parametrize("role", ["000", "100"])
+def test_packed_source_keeps_the_fields_the_prompt_names(role: str) -> None:
+    template = build_prompt_registry()[role].system_template
+    sources_section = template[template.index("# Sources") : template.index("{{search_docs}}")]
+    named_fields = set(re.findall(r"'(\w+)'", sources_section))
+    assert {"doc", "content"} <= named_fields
+
+    item = {field: f"{field} value" for field in named_fields}
+    packed, _ = pack_sources([item], budget=1000, counter=TokenCounter("missing-encoding"))
+
+    assert set(packed[0]) == named_fields
+
+
+def test_default_counter_loads_lazily_and_warns_once_on_fallback(monkeypatch, caplog) -> None:
+    class OfflineTiktoken:
+        calls = 0
+
+        @classmethod
+        def get_encoding(cls, name):
+            cls.calls += 1
+            raise OSError(f"cannot download {name}")
+
+    monkeypatch.setattr(context_packer, "tiktoken", OfflineTiktoken)
+    get_token_counter.cache_clear()
+    try:
+        with caplog.at_level(logging.WARNING, logger="src.context_packer"):
+            for _ in range(3):
+                packed, _ = pack_sources([{"doc": "ATA-28-A.md", "content": "fuel pump"}], budget=100)
+                assert packed
+    finally:
+        get_token_counter.cache_clear()
+
+    assert OfflineTiktoken.calls == 1
+    assert len([record for record in caplog.records if "estimating tokens" in record.message]) == 1
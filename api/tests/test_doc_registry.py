@@ -0,0 +1,130 @@
+import dataclasses
+import importlib.util
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.doc_registry import DocRegistry, get_doc_registry
+from src.lexical_search import LexicalCorpusConfig, rebuild_lexical_index, search_lexical_corpus
+from src.rank_fusion import RankedChannel, fuse_ranked_channels
+from src.vector_store import ExactVectorStore
+
+from tests.helpers import write_vector_export
+
+
+def test_doc_registry_ids_are_stable_and_append_only(tmp_path: Path) -> None:
+    registry = DocRegistry(tmp_path / "registry.sqlite3")
+
+    first = registry.assign("tech_docs", [{"doc": "AMM-28.md"}, {"doc": "SRM-52.md page 3"}])
+    second = registry.assign("tech_docs", [{"doc": "NEW-21.md"}, {"doc": "amm-28.md", "ata": "28"}])
+
+    assert second[1] == first[0]
+    assert second[0] not in first
+    assert registry.ids_for("tech_docs", ["SRM-52.md", "unknown.md"]) == [first[1], -1]
+    assert registry.ids_for("non_conformities", ["AMM-28.md"]) == [-1]
+    assert registry.describe([first[0]])[first[0]]["ata"] == "28"
+
+
+def load_dataprep_registry_module():
+    # Le dataprep est un paquet à part (conteneur dédié): module chargé par son chemin.
+    path = Path(__file__).resolve().parents[2] / "dataprep" / "src" / "doc_registry.py"
+    spec = importlib.util.spec_from_file_location("dataprep_doc_registry", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_dataprep_ids_are_read_back_by_the_api_registry(tmp_path: Path) -> None:
+    registry_path = tmp_path / "registry.sqlite3"
+    writer = load_dataprep_registry_module().DocRegistryWriter(registry_path, "tech_docs")
+    fuel_id = writer.doc_id("ATA-28-fuel.md", "chunk-1", "28")
+    assert writer.doc_id("ATA-28-fuel.md page 2", "chunk-2", "28") == fuel_id
+    writer.close()
+
+    registry = DocRegistry(registry_path)
+    assert registry.registry_id() == writer.registry_id
+    assert registry.ids_for("tech_docs", ["ata-28-FUEL.md"]) == [fuel_id]
+    # La reconstruction lexicale réutilise l'id attribué par le dataprep.
+    assert registry.assign("tech_docs", [{"doc": "ATA-28-fuel.md"}]) == [fuel_id]
+
+
+def write_registered_export(root: Path, registry_path: Path, registry_id: str | None):
+    """Vector export as exported from a dataprep Chroma build: doc_id in the items, registry in the manifest."""
+    docs = ["ATA-28-fuel.md", "ATA-52-door.md", "x.md"]
+    config = write_vector_export(root, np.eye(3, dtype=np.float32), docs, doc_registry_id=registry_id)
+    doc_ids = DocRegistry(registry_path).ids_for("tech_docs", docs)
+    items = [json.loads(line) for line in (root / "items.jsonl").read_text(encoding="utf-8").splitlines()]
+    (root / "items.jsonl").write_text(
+        "".join(
+            json.dumps({**item, **({"doc_id": doc_id} if doc_id >= 0 else {})}) + "\n"
+            for item, doc_id in zip(items, doc_ids)
+        ),
+        encoding="utf-8",
+    )
+    return dataclasses.replace(config, registry_path=registry_path)
+
+
+def test_lexical_and_vector_hits_share_registry_ids(tmp_path: Path) -> None:
+    registry_path = tmp_path / "registry.sqlite3"
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir()
+    (corpus_root / "ATA-28-fuel.md").write_text("Fuel tank grounding strap inspection.", encoding="utf-8")
+    (corpus_root / "ATA-52-door.md").write_text("Door seal replacement.", encoding="utf-8")
+    lexical_config = LexicalCorpusConfig(
+        name="tech_docs",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+        registry_path=registry_path,
+    )
+    rebuild_lexical_index(lexical_config)
+    registry_id = get_doc_registry(registry_path).registry_id()
+    vector_config = write_registered_export(tmp_path / "export", registry_path, registry_id)
+
+    lexical_hits = search_lexical_corpus(lexical_config, "fuel grounding", limit=2)
+    vector_hits = ExactVectorStore(vector_config).search(np.array([1.0, 0.0, 0.0]), limit=3)
+
+    assert lexical_hits[0]["doc_id"] == vector_hits[0]["doc_id"]
+    # x.md n'est pas enregistré: pas de doc_id, la fusion repasse sur l'identité texte.
+    assert "doc_id" not in vector_hits[2]
+    fused = fuse_ranked_channels(
+        [RankedChannel("vector", [vector_hits[:2]]), RankedChannel("lexical", [lexical_hits])],
+        final_limit=5,
+    )
+    assert fused[0]["retrieval_channels"] == ["lexical", "vector"]
+    assert fused[0]["doc_id"] == lexical_hits[0]["doc_id"]
+
+    # Export construit avec un autre registre: ses doc_id sont ignorés.
+    other_config = write_registered_export(tmp_path / "other-export", registry_path, "another-registry")
+    assert all("doc_id" not in hit for hit in ExactVectorStore(other_config).search(np.array([1.0, 0.0, 0.0]), limit=3))
+
+
+def test_lexical_doc_ids_follow_the_registry_they_were_built_with(tmp_path: Path) -> None:
+    registry_path = tmp_path / "registry.sqlite3"
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir()
+    (corpus_root / "ATA-28-fuel.md").write_text("Fuel tank grounding strap inspection.", encoding="utf-8")
+    config = LexicalCorpusConfig(
+        name="tech_docs",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+        registry_path=registry_path,
+    )
+    rebuild_lexical_index(config)
+    first_registry_id = get_doc_registry(registry_path).registry_id()
+    assert "doc_id" in search_lexical_corpus(config, "fuel")[0]
+
+    # Registre remplacé (autre artefact): l'index n'en porte plus les ids, la fusion passe par les noms.
+    registry_path.unlink()
+    DocRegistry(registry_path).assign("tech_docs", [{"doc": "ATA-21-cabin.md"}, {"doc": "ATA-28-fuel.md"}])
+    assert get_doc_registry(registry_path).registry_id() != first_registry_id
+    assert "doc_id" not in search_lexical_corpus(config, "fuel")[0]
+
+    # La reconstruction suivante réattribue tout depuis le nouveau registre, même sans fichier modifié.
+    summary = rebuild_lexical_index(config)
+    assert summary["rebuilt"] is True
+    assert search_lexical_corpus(config, "fuel")[0]["doc_id"] == get_doc_registry(registry_path).ids_for(
+        "tech_docs", ["ATA-28-fuel.md"]
+    )[0]
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import numpy as np
+
+from src import embeddings as embeddings_module
+from src import search as search_module
+from src.embedding_cache import EmbeddingCache
+
+
+def test_embedding_cache_shares_vectors_across_instances(tmp_path: Path) -> None:
+    db_path = tmp_path / "cache" / "query_embeddings.sqlite3"
+    first_worker = EmbeddingCache(db_path, memory_entries=8)
+    first_worker.put_many("model-a", {"ATA 28 fuel system": [0.5, 0.25, 0.0]})
+
+    second_worker = EmbeddingCache(db_path, memory_entries=8)
+    found = second_worker.get_many("model-a", ["  ata 28   FUEL system ", "unknown query"])
+
+    assert list(found) == ["  ata 28   FUEL system "]
+    assert np.allclose(found["  ata 28   FUEL system "], [0.5, 0.25, 0.0])
+    assert second_worker.get_many("model-b", ["ATA 28 fuel system"]) == {}
+
+    second_worker.get_many("model-a", ["ATA 28 fuel system"])
+    stats = second_worker.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_embedding_cache_evicts_least_recently_used_rows(tmp_path: Path) -> None:
+    vector_bytes = 4 * 4
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", memory_entries=0, disk_max_bytes=3 * vector_bytes)
+
+    for index in range(3):
+        cache.put_many("model", {f"query {index}": np.full(4, index, dtype=np.float32)})
+    cache.get_many("model", ["query 0"])
+    cache.put_many("model", {"query 3": np.full(4, 3, dtype=np.float32)})
+
+    remaining = cache.get_many("model", [f"query {index}" for index in range(4)])
+    assert "query 0" in remaining
+    assert "query 1" not in remaining
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_embed_texts_only_requests_cache_misses(tmp_path: Path, monkeypatch) -> None:
+    requested = []
+
+    def fake_request_embeddings(texts):
+        requested.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3")
+    monkeypatch.setattr(embeddings_module, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(embeddings_module, "request_embeddings", fake_request_embeddings)
+
+    first = embeddings_module.embed_texts(["fuel tank", "door seal", "fuel tank"])
+    second = embeddings_module.embed_texts(["door seal", "windshield"])
+
+    assert requested == [["fuel tank", "door seal"], ["windshield"]]
+    assert first.shape == (3, 2)
+    assert np.allclose(second[0], first[1])
+    monkeypatch.setattr(search_module, "get_embedding_cache", lambda: cache)
+    status = search_module.get_retrieval_status()["embedding_cache"]
+    assert status["misses"] == 3 and status["lookups"] == 4
+
+    monkeypatch.setenv("RETRIEVAL_EMBEDDING_OFFLINE", "true")
+    assert embeddings_module.embed_texts(["fuel tank"]).shape == (1, 2)
+    try:
+        embeddings_module.embed_texts(["never seen"])
+    except embeddings_module.EmbeddingCacheMiss:
+        pass
+    else:
+        raise AssertionError("offline mode must not request new embeddings")
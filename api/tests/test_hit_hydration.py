@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from src.hit_hydration import LEXICAL_REF_FIELD, VECTOR_ROW_REF_FIELD, hydrate_hits, lighten_hit
+from src.lexical_search import (
+    LexicalCorpusConfig,
+    load_lexical_contents,
+    rebuild_lexical_index,
+    search_lexical_corpus,
+)
+
+
+def test_lexical_hits_are_light_until_hydrated(tmp_path: Path) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    long_page = "Hydraulic leak near the ATA 28 fuel access panel. " + "Torque values table. " * 200
+    (corpus_root / "ATA-28-hydraulic-leak.md").write_text(long_page, encoding="utf-8")
+    config = LexicalCorpusConfig(
+        name="test",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+    rebuild_lexical_index(config)
+
+    hits = search_lexical_corpus(config, "hydraulic leak", limit=1)
+    assert "content" not in hits[0]
+    assert hits[0]["snippet"].startswith("**Hydraulic** **leak** near") and len(hits[0]["snippet"]) < len(long_page)
+
+    # Seul le meilleur passage est rechargé, pas la page OCR entière.
+    hydrated = hydrate_hits(hits, {LEXICAL_REF_FIELD: lambda rowids: load_lexical_contents(config, rowids)})
+    assert hydrated[0]["content"] == long_page[hits[0]["char_start"] : hits[0]["char_end"]]
+    assert hydrated[0]["content"].startswith("Hydraulic leak") and len(hydrated[0]["content"]) < len(long_page)
+    assert LEXICAL_REF_FIELD not in hydrated[0] and "snippet" not in hydrated[0]
+
+
+def test_hydrate_hits_batches_loads_and_restores_heavy_fields() -> None:
+    items = {
+        3: {"doc": "ATA-52-door.md", "content": "door chunk", "json_data": "{\"page\": 3}"},
+        7: {"doc": "ATA-21-cabin.md", "content": "cabin chunk", "json_data": "{\"page\": 7}"},
+    }
+    hits = [lighten_hit(items[row], **{VECTOR_ROW_REF_FIELD: row}) for row in (7, 3)]
+    assert all("json_data" not in hit and "content" not in hit for hit in hits)
+    hits.append({"doc": "EPISODIC-1", "snippet": "validated memory"})
+
+    calls = []
+
+    def load_rows(rows):
+        calls.append(rows)
+        return {row: items[row] for row in rows}
+
+    hydrated = hydrate_hits(hits, {VECTOR_ROW_REF_FIELD: load_rows})
+
+    assert calls == [[7, 3]]
+    assert [item["content"] for item in hydrated] == ["cabin chunk", "door chunk", "validated memory"]
+    assert hydrated[1]["json_data"] == "{\"page\": 3}"
@@ -1,10 +1,19 @@
+import sqlite3
 from pathlib import Path
 
+import pytest
+
+from src import lexical_search
 from src.lexical_search import (
     LexicalCorpusConfig,
+    LexicalIndexPool,
     build_match_query,
+    get_lexical_pool,
     rebuild_lexical_index,
+    run_tagged_matches,
     search_lexical_corpus,
+    search_lexical_corpus_many,
+    split_passages,
 )
 
 
@@ -46,3 +55,274 @@ def test_rebuild_and_search_lexical_index(tmp_path: Path) -> None:
     assert hits[0]["doc"] == "ATA-28-hydraulic-leak.md"
     assert hits[0]["lexical_rank"] == 1
     assert hits[0]["match_query"] == "ata* AND 28* AND hydraulic* AND leak*"
+
+
+def test_lexical_search_scopes_to_ata_partition_with_global_fallback(tmp_path: Path) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    (corpus_root / "ATA-28-fuel-leak.md").write_text("Fuel leak near the collector tank.", encoding="utf-8")
+    (corpus_root / "ATA-52-door-leak.md").write_text("Water leak around the passenger door.", encoding="utf-8")
+    (corpus_root / "page-12.md").write_text("ATA 28 fuel quantity leak check procedure.", encoding="utf-8")
+
+    config = LexicalCorpusConfig(
+        name="test",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+    rebuild_lexical_index(config)
+
+    hits = search_lexical_corpus(config, "leak", limit=5, ata_chapters=["28"])
+    assert sorted(hit["doc"] for hit in hits) == ["ATA-28-fuel-leak.md", "page-12.md"]
+    assert {hit["ata_scope"] for hit in hits} == {"partition"}
+
+    fallback = search_lexical_corpus(config, "leak", limit=5, ata_chapters=["28"], min_partition_hits=3)
+    assert len(fallback) == 3
+    assert {hit["ata_scope"] for hit in fallback} == {"global"}
+
+
+def test_many_variants_match_single_searches_in_two_statements(tmp_path: Path) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    (corpus_root / "ATA-28-fuel-leak.md").write_text("Fuel leak near the collector tank.", encoding="utf-8")
+    (corpus_root / "ATA-52-door-leak.md").write_text("Water leak around the passenger door.", encoding="utf-8")
+    (corpus_root / "page-12.md").write_text("ATA 28 fuel quantity leak check procedure.", encoding="utf-8")
+    config = LexicalCorpusConfig(
+        name="many",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+    rebuild_lexical_index(config)
+    # AND direct, repli OR, repli global (partition trop maigre), aucune correspondance, requête vide.
+    variants = ["fuel leak", "collector door", "passenger door", "hydraulic actuator", "  "]
+
+    for ata_chapters, min_hits in (((), 1), (("28",), 1), (("28",), 2)):
+        expected = [
+            search_lexical_corpus(config, query, limit=5, ata_chapters=ata_chapters, min_partition_hits=min_hits)
+            for query in variants
+        ]
+        statements = []
+        with get_lexical_pool(config).connection() as connection:
+            connection.set_trace_callback(statements.append)
+        batched = search_lexical_corpus_many(
+            config, variants, limit=5, ata_chapters=ata_chapters, min_partition_hits=min_hits
+        )
+        with get_lexical_pool(config).connection() as connection:
+            connection.set_trace_callback(None)
+
+        assert batched == expected
+        assert 1 <= sum("MATCH" in sql for sql in statements) <= 2
+    assert [hit["ata_scope"] for hit in batched[2]] == ["global"]
+
+
+def test_lexical_pool_reuses_read_only_connections_without_ddl(tmp_path: Path) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    (corpus_root / "ATA-28-hydraulic-leak.md").write_text("Hydraulic leak near ATA 28 panel.", encoding="utf-8")
+    config = LexicalCorpusConfig(
+        name="pool",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+
+    # Lecture seule: un index absent n'est jamais construit sur le chemin de requête.
+    assert search_lexical_corpus(config, "hydraulic leak") == []
+    assert search_lexical_corpus_many(config, ["hydraulic leak", "panel"]) == [[], []]
+    assert not config.db_path.exists()
+
+    # Une fois construit hors service, seules les requêtes MATCH passent.
+    rebuild_lexical_index(config)
+    for _ in range(3):
+        assert search_lexical_corpus(config, "hydraulic leak")[0]["index_document_count"] == 1
+    pool = get_lexical_pool(config)
+    assert pool.stats()["opened"] == 1 and pool.stats()["idle"] == 1
+
+    statements = []
+    with pool.connection() as connection:
+        connection.set_trace_callback(statements.append)
+    search_lexical_corpus(config, "hydraulic leak")
+    assert statements and not any("CREATE" in sql or "COUNT(" in sql for sql in statements)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as connection:
+            connection.execute("CREATE TABLE forbidden(x)")
+
+    # Une reconstruction invalide les connexions ouvertes sur l'ancien index.
+    (corpus_root / "ATA-21-cabin-pressure.md").write_text("Cabin pressure issue under ATA 21.", encoding="utf-8")
+    generation = pool.stats()["generation"]
+    assert rebuild_lexical_index(config)["rebuilt"] is True
+    assert search_lexical_corpus(config, "cabin pressure")[0]["index_document_count"] == 2
+    assert pool.stats()["generation"] > generation
+
+    immutable = LexicalIndexPool(config, mode="immutable")
+    assert immutable.summary()["document_count"] == 2
+    missing = LexicalCorpusConfig(name="missing", source_root=corpus_root, file_glob="*.md", db_path=tmp_path / "none.sqlite3")
+    with pytest.raises(FileNotFoundError):
+        LexicalIndexPool(missing, mode="immutable").summary()
+
+
+def test_rebuild_only_reindexes_changed_files(tmp_path: Path) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    for name, text in {
+        "ATA-21-cabin.md": "Cabin pressure issue under ATA 21.",
+        "ATA-28-fuel.md": "Fuel tank grounding strap under ATA 28.",
+        "ATA-32-gear.md": "Landing gear actuator under ATA 32.",
+    }.items():
+        (corpus_root / name).write_text(text, encoding="utf-8")
+    config = LexicalCorpusConfig(
+        name="delta",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+    assert rebuild_lexical_index(config)["delta"]["added"] == 3
+    fuel_ref = search_lexical_corpus(config, "grounding strap")[0]["lexical_rowid"]
+
+    (corpus_root / "ATA-28-fuel.md").write_text("Fuel tank bonding lead under ATA 28.", encoding="utf-8")
+    (corpus_root / "ATA-32-gear.md").unlink()
+    (corpus_root / "ATA-36-bleed.md").write_text("Bleed air duct crack under ATA 36.", encoding="utf-8")
+    # Contenu identique, seul le mtime bouge: pas de réindexation.
+    cabin = corpus_root / "ATA-21-cabin.md"
+    cabin.write_text(cabin.read_text(encoding="utf-8"), encoding="utf-8")
+
+    summary = rebuild_lexical_index(config)
+
+    assert summary["delta"] == {"added": 1, "updated": 1, "removed": 1, "unchanged": 1}
+    assert summary["document_count"] == 3
+    assert search_lexical_corpus(config, "grounding strap") == []
+    assert search_lexical_corpus(config, "bonding lead")[0]["lexical_rowid"] == fuel_ref
+    assert search_lexical_corpus(config, "landing gear actuator") == []
+    assert search_lexical_corpus(config, "bleed duct")[0]["doc"] == "ATA-36-bleed.md"
+    assert rebuild_lexical_index(config)["rebuilt"] is False
+
+
+def test_split_passages_overlap_and_cover_the_document() -> None:
+    content = " ".join(f"word{index}" for index in range(600))
+
+    passages = split_passages(content, size=500, overlap=100)
+
+    assert passages[0][0] == 0 and passages[-1][1] == len(content)
+    assert all(end - start <= 500 for start, end in passages)
+    assert all(next_start < end for (_, end), (next_start, _) in zip(passages, passages[1:]))
+    assert split_passages("short page", size=500, overlap=100) == [(0, 10)]
+
+
+def test_passage_hits_are_grouped_by_document(tmp_path: Path) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    filler = "Torque values table. " * 120
+    long_page = f"Actuator seal leak on the left gear. {filler}Second actuator seal leak, right gear. {filler}"
+    (corpus_root / "ATA-32-gear.md").write_text(long_page, encoding="utf-8")
+    (corpus_root / "ATA-29-pump.md").write_text("Hydraulic pump seal leak.", encoding="utf-8")
+    config = LexicalCorpusConfig(
+        name="passages",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+    rebuild_lexical_index(config)
+
+    hits = search_lexical_corpus(config, "actuator seal leak", limit=5)
+
+    assert [hit["doc"] for hit in hits] == ["ATA-32-gear.md"]
+    passages = hits[0]["passages"]
+    assert len(passages) == 2 and passages[0]["lexical_rowid"] == hits[0]["lexical_rowid"]
+    assert all("**actuator**" in passage["snippet"].lower() for passage in passages)
+    texts = sorted((passage["char_start"], long_page[passage["char_start"] : passage["char_end"]]) for passage in passages)
+    assert texts[0][0] == 0 and texts[0][1].startswith("Actuator seal leak on the left gear")
+    assert texts[1][0] > 0 and "Second actuator seal leak, right gear" in texts[1][1]
+    assert hits[0]["index_document_count"] == 2
+
+
+def test_bulk_build_uses_worker_processes_and_replaces_the_index_atomically(tmp_path: Path) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    for index in range(140):
+        (corpus_root / f"ATA-{21 + index % 10}-page-{index}.md").write_text(
+            f"Page {index}: hydraulic actuator inspection. " + "Torque values table. " * (index % 90),
+            encoding="utf-8",
+        )
+    config = LexicalCorpusConfig(
+        name="bulk",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+    assert rebuild_lexical_index(config)["build"]["documents"] == 140
+    # Un lecteur ouvert sur l'ancien fichier continue de le lire pendant et après le remplacement.
+    reader = sqlite3.connect(f"file:{config.db_path}?mode=ro", uri=True)
+
+    summary = rebuild_lexical_index(config, force=True, workers=2)
+
+    build = summary["build"]
+    assert build["workers"] == 2 and build["documents"] == 140 and build["passages"] >= 140
+    assert build["docs_per_s"] > 0
+    assert summary["delta"]["added"] == 140 and summary["document_count"] == 140
+    assert reader.execute("SELECT COUNT(*) FROM lexical_files").fetchone()[0] == 140
+    reader.close()
+    assert sorted(path.name for path in config.db_path.parent.iterdir()) == ["fts.sqlite3"]
+    assert search_lexical_corpus(config, "page 17 hydraulic", limit=1)[0]["doc"] == "ATA-28-page-17.md"
+    assert search_lexical_corpus(config, "hy", limit=3)
+
+
+def test_pool_refresh_builds_in_process_without_worker_processes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    for index in range(140):
+        (corpus_root / f"ATA-{21 + index % 10}-page-{index}.md").write_text(
+            f"Page {index}: hydraulic actuator inspection.", encoding="utf-8"
+        )
+    config = LexicalCorpusConfig(
+        name="serving",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+
+    def forbidden_executor(*args, **kwargs):
+        raise AssertionError("the serving path must not fork a process pool")
+
+    # Défaut CLI d'une machine multi-cœurs.
+    monkeypatch.setitem(lexical_search.rebuild_lexical_index.__kwdefaults__, "workers", 8)
+    monkeypatch.setattr(lexical_search, "ProcessPoolExecutor", forbidden_executor)
+
+    assert LexicalIndexPool(config, mode="rw").summary()["document_count"] == 140
+
+
+def test_tagged_matches_keep_best_passage_order_per_tag(tmp_path: Path) -> None:
+    corpus_root = tmp_path / "corpus"
+    corpus_root.mkdir(parents=True)
+    filler = "Torque values table. " * 120
+    for index, ata in enumerate(("32", "29", "27")):
+        # Plusieurs passages par document, plus ou moins pertinents selon la variante.
+        (corpus_root / f"ATA-{ata}-page.md").write_text(
+            f"Actuator seal leak {'seal ' * index}check. {filler}Pump seal inspection. {filler}"
+            f"Actuator {'leak ' * (3 - index)}report. {filler}",
+            encoding="utf-8",
+        )
+    config = LexicalCorpusConfig(
+        name="tagged",
+        source_root=corpus_root,
+        file_glob="*.md",
+        db_path=tmp_path / "lexical" / "fts.sqlite3",
+    )
+    rebuild_lexical_index(config)
+    subqueries = {
+        "b": build_match_query("seal"),
+        "a": build_match_query("actuator leak"),
+        "c": build_match_query("pump seal"),
+    }
+
+    with get_lexical_pool(config).connection() as connection:
+        tagged = run_tagged_matches(connection, subqueries, fetch_limit=20)
+
+    assert sum(len({row["doc"] for row in rows}) < len(rows) for rows in tagged.values()) == 2
+    for tag, rows in tagged.items():
+        keys = [(row["bm25_score"], row["doc"], row["char_start"]) for row in rows]
+        assert keys == sorted(keys)
+        assert [row["tag"] for row in rows] == [tag] * len(rows)
+    assert search_lexical_corpus_many(config, ["seal", "actuator leak", "pump seal"], limit=3) == [
+        search_lexical_corpus(config, query, limit=3) for query in ("seal", "actuator leak", "pump seal")
+    ]
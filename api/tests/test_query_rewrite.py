@@ -1,3 +1,5 @@
+import numpy as np
+
 from src import search as search_module
 from src.query_rewrite import (
     QueryRewriteResult,
@@ -6,6 +8,10 @@ from src.query_rewrite import (
 )
 
 
+def fake_embed_texts(texts):
+    return np.ones((len(texts), 4), dtype=np.float32)
+
+
 def test_rewrite_retrieval_query_infers_fuel_grounding_context(monkeypatch) -> None:
     monkeypatch.setenv("RETRIEVAL_QUERY_REWRITE_USE_LLM", "false")
     clear_query_rewrite_cache()
@@ -20,30 +26,33 @@ def test_rewrite_retrieval_query_infers_fuel_grounding_context(monkeypatch) -> N
     assert any("grounding" in variant.lower() for variant in result.variants)
     assert any("fuel tank" in variant.lower() for variant in result.variants)
     assert result.llm_used is False
+    assert result.ata_hints == ("28",)
 
 
 def test_search_documents_uses_rewrite_variants(monkeypatch) -> None:
     vector_calls = []
     lexical_calls = []
 
-    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10):
+    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10, *, query_embedding=None, ata_chapters=()):
         vector_calls.append(query)
         if "ATA 28" in query:
             return [{"doc": "ATA-28-hit.md", "content": "fuel tank grounding", "distance": 0.1}]
         return [{"doc": "ATA-50-hit.md", "content": "static discharge cable", "distance": 0.2}]
 
-    def fake_lexical(query: str, n_results: int = 10):
-        lexical_calls.append(query)
-        if "ATA 28" in query:
-            return [{"doc": "ATA-28-hit.md", "content": "fuel tank grounding", "bm25_score": -5.0}]
-        return []
+    def fake_lexical(queries, n_results: int = 10, **kwargs):
+        lexical_calls.extend(queries)
+        return [
+            [{"doc": "ATA-28-hit.md", "content": "fuel tank grounding", "bm25_score": -5.0}] if "ATA 28" in query else []
+            for query in queries
+        ]
 
     monkeypatch.setattr(search_module, "search_documents_vector", fake_vector)
-    monkeypatch.setattr(search_module, "search_documents_lexical", fake_lexical)
+    monkeypatch.setattr(search_module, "search_documents_lexical_many", fake_lexical)
+    monkeypatch.setattr(search_module, "embed_texts", fake_embed_texts)
     monkeypatch.setattr(
         search_module,
         "rewrite_retrieval_query",
-        lambda query, *, corpus: QueryRewriteResult(
+        lambda query, *, corpus, **kwargs: QueryRewriteResult(
             original_query=query,
             normalized_query=query.lower(),
             corpus=corpus,
@@ -77,16 +86,17 @@ def test_search_documents_can_disable_query_rewrite(monkeypatch) -> None:
     vector_calls = []
     lexical_calls = []
 
-    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10):
+    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10, *, query_embedding=None, ata_chapters=()):
         vector_calls.append(query)
         return [{"doc": "raw-hit.md", "content": "raw", "distance": 0.1}]
 
-    def fake_lexical(query: str, n_results: int = 10):
-        lexical_calls.append(query)
-        return [{"doc": "raw-hit.md", "content": "raw", "bm25_score": -1.0}]
+    def fake_lexical(queries, n_results: int = 10, **kwargs):
+        lexical_calls.extend(queries)
+        return [[{"doc": "raw-hit.md", "content": "raw", "bm25_score": -1.0}] for _ in queries]
 
     monkeypatch.setattr(search_module, "search_documents_vector", fake_vector)
-    monkeypatch.setattr(search_module, "search_documents_lexical", fake_lexical)
+    monkeypatch.setattr(search_module, "search_documents_lexical_many", fake_lexical)
+    monkeypatch.setattr(search_module, "embed_texts", fake_embed_texts)
 
     results = search_module.search_documents(
         "fuel tank issue",
@@ -97,3 +107,149 @@ def test_search_documents_can_disable_query_rewrite(monkeypatch) -> None:
     assert vector_calls == ["fuel tank issue"]
     assert lexical_calls == ["fuel tank issue"]
     assert results[0]["doc"] == "raw-hit.md"
+
+
+def test_prepare_query_embeddings_batches_variants_across_corpora(monkeypatch) -> None:
+    embed_calls = []
+
+    def recording_embed_texts(texts):
+        embed_calls.append(list(texts))
+        return np.arange(len(texts) * 4, dtype=np.float32).reshape(len(texts), 4)
+
+    monkeypatch.setattr(search_module, "embed_texts", recording_embed_texts)
+    monkeypatch.setattr(
+        search_module,
+        "rewrite_retrieval_query",
+        lambda query, *, corpus, **kwargs: QueryRewriteResult(
+            original_query=query,
+            normalized_query=query.lower(),
+            corpus=corpus,
+            variants=(query, f"ATA 28 fuel tank {corpus}"),
+            reasons=(),
+            llm_used=False,
+            llm_model=None,
+            llm_error=None,
+        ),
+    )
+
+    embeddings = search_module.prepare_query_embeddings("fuel tank issue")
+
+    assert embed_calls == [
+        [
+            "fuel tank issue",
+            "ATA 28 fuel tank tech_docs",
+            "ATA 28 fuel tank non_conformities",
+        ]
+    ]
+    assert set(embeddings) == set(embed_calls[0])
+
+    vector_embeddings = []
+
+    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10, *, query_embedding=None, ata_chapters=()):
+        vector_embeddings.append(query_embedding)
+        return []
+
+    monkeypatch.setattr(search_module, "search_non_conformities_vector", fake_vector)
+    monkeypatch.setattr(
+        search_module,
+        "search_non_conformities_lexical_many",
+        lambda queries, n_results=10, **kwargs: [[] for _ in queries],
+    )
+
+    search_module.search_non_conformities("fuel tank issue", query_embeddings=embeddings)
+
+    assert len(embed_calls) == 1
+    assert len(vector_embeddings) == 2
+
+
+def test_search_documents_centroid_mode_runs_one_vector_search(monkeypatch) -> None:
+    vector_embeddings = []
+
+    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10, *, query_embedding=None, ata_chapters=()):
+        vector_embeddings.append(np.asarray(query_embedding))
+        return [{"doc": "ATA-28-hit.md", "content": "fuel tank grounding", "distance": 0.1}]
+
+    embeddings = {
+        "esd on tank": np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32),
+        "ATA 28 fuel tank grounding": np.array([0.0, 1.0, 0.0, 0.0], dtype=np.float32),
+    }
+    monkeypatch.setattr(search_module, "search_documents_vector", fake_vector)
+    monkeypatch.setattr(
+        search_module,
+        "search_documents_lexical_many",
+        lambda queries, n_results=10, **kwargs: [[] for _ in queries],
+    )
+    monkeypatch.setattr(
+        search_module,
+        "collect_query_variants",
+        lambda query, *, corpus, use_query_rewrite, **kwargs: list(embeddings),
+    )
+
+    results = search_module.search_documents(
+        "esd on tank",
+        n_results=5,
+        query_embeddings=embeddings,
+        vector_query_mode="centroid",
+    )
+
+    assert len(vector_embeddings) == 1
+    # Requête d'origine pondérée x2, puis remise à la norme moyenne des variantes.
+    centroid = vector_embeddings[0]
+    assert np.isclose(np.linalg.norm(centroid), 1.0)
+    assert centroid[0] == np.float32(2 / np.sqrt(5))
+    assert results[0]["vector_variant_hits"] == 1
+
+
+def test_adaptive_depth_stops_at_original_query_when_confident(monkeypatch) -> None:
+    vector_calls = []
+    lexical_calls = []
+    rewrite_calls = []
+    docs = ["ATA-28-tank.md", "ATA-28-bonding.md", "ATA-28-probe.md"]
+
+    def fake_vector(query: str, n_results: int = 15, result_limit: int = 10, *, query_embedding=None, ata_chapters=()):
+        vector_calls.append(query)
+        hits = docs if query == "fuel tank bonding" else ["ATA-28-rewritten.md"]
+        return [{"doc": doc, "content": doc, "distance": 0.2} for doc in hits]
+
+    def fake_lexical(queries, n_results: int = 10, **kwargs):
+        lexical_calls.extend(queries)
+        return [
+            [{"doc": doc, "content": doc, "bm25_score": -3.0} for doc in (docs if query == "fuel tank bonding" else [])]
+            for query in queries
+        ]
+
+    def fake_rewrite(query, *, corpus, use_llm=True):
+        rewrite_calls.append(use_llm)
+        variants = (query, "ATA 28 fuel tank bonding") + (("fuel quantity probe grounding",) if use_llm else ())
+        return QueryRewriteResult(
+            original_query=query,
+            normalized_query=query.lower(),
+            corpus=corpus,
+            variants=variants,
+            reasons=(),
+            llm_used=use_llm,
+            llm_model=None,
+            llm_error=None,
+        )
+
+    monkeypatch.setattr(search_module, "ADAPTIVE_DEPTH_ENABLED", True)
+    monkeypatch.setattr(search_module, "search_documents_vector", fake_vector)
+    monkeypatch.setattr(search_module, "search_documents_lexical_many", fake_lexical)
+    monkeypatch.setattr(search_module, "embed_texts", fake_embed_texts)
+    monkeypatch.setattr(search_module, "rewrite_retrieval_query", fake_rewrite)
+
+    results = search_module.search_documents("fuel tank bonding", n_results=5)
+
+    assert vector_calls == ["fuel tank bonding"]
+    assert lexical_calls == ["fuel tank bonding"]
+    assert True not in rewrite_calls
+    assert results[0]["retrieval_tier"] == "original"
+
+    # Requête faible: on descend jusqu'à la réécriture LLM, sans relancer les variantes déjà cherchées.
+    vector_calls.clear()
+    lexical_calls.clear()
+    results = search_module.search_documents("static discharge", n_results=5)
+
+    assert vector_calls == ["static discharge", "ATA 28 fuel tank bonding", "fuel quantity probe grounding"]
+    assert lexical_calls == vector_calls
+    assert results[0]["retrieval_tier"] == "llm"
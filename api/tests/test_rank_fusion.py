@@ -0,0 +1,42 @@
+from src.rank_fusion import RankedChannel, fuse_ranked_channels
+
+
+def hit(doc: str, **fields):
+    return {"doc": doc, "content": fields.pop("content", doc), **fields}
+
+
+def test_fuse_ranked_channels_fuses_variants_then_channels() -> None:
+    vector = RankedChannel(
+        "vector",
+        [
+            [hit("ATA-28-A.md", distance=0.2), hit("ATA-28-B.md", distance=0.3)],
+            [hit("ata-28-b.md page 2", distance=0.25, content="longer B content")],
+        ],
+    )
+    lexical = RankedChannel("lexical", [[hit("ATA-28-C.md", bm25_score=-4.0), hit("ATA-28-A.md", bm25_score=-2.0)]])
+
+    results = fuse_ranked_channels([vector, lexical], final_limit=3)
+
+    assert [item["doc"] for item in results] == ["ATA-28-A.md", "ATA-28-B.md", "ATA-28-C.md"]
+    first = results[0]
+    assert first["retrieval_channels"] == ["lexical", "vector"]
+    assert first["vector_distance"] == 0.2 and first["lexical_score"] == -2.0
+    assert first["rrf_score"] == round(1 / 62 + 1 / 62, 8)
+    # Les deux variantes vectorielles sont fusionnées en un seul rang de canal.
+    second = results[1]
+    assert second["vector_variant_hits"] == 2
+    assert second["vector_rank"] == 1
+    assert second["content"] == "longer B content"
+    assert [item["retrieval_rank"] for item in results] == [1, 2, 3]
+
+
+def test_fuse_ranked_channels_applies_channel_weights_and_limits() -> None:
+    episodic = RankedChannel("episodic", [[hit("EPISODIC-1"), hit("EPISODIC-2")]], weight=2.0)
+    non_conformities = RankedChannel("non_conformities", [[hit("ATA-52-NC.md"), hit("ATA-52-NC2.md")]], limit=1)
+
+    results = fuse_ranked_channels([non_conformities, episodic], final_limit=10, annotate=False)
+
+    # ATA-52-NC2 dépasse la limite du canal; les souvenirs passent devant grâce au poids.
+    assert [item["doc"] for item in results] == ["EPISODIC-1", "EPISODIC-2", "ATA-52-NC.md"]
+    assert "rrf_score" not in results[0]
+    assert fuse_ranked_channels([episodic], final_limit=0) == []
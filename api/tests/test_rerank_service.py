@@ -0,0 +1,51 @@
+import threading
+
+from src.rerank_service import RerankService, StubRerankBackend
+
+
+def test_stub_backend_ranks_by_token_overlap() -> None:
+    backend = StubRerankBackend(latency_ms=0)
+    ranking = backend.rerank(
+        model="stub",
+        query="fuel tank grounding",
+        documents=["cabin pressure", "fuel tank grounding strap", "fuel pump"],
+        top_n=2,
+    )
+    assert [index for index, _ in ranking] == [1, 2]
+
+
+def test_rerank_service_caches_by_query_candidates_and_model() -> None:
+    service = RerankService(StubRerankBackend(latency_ms=0), model="stub", deadline_ms=1000)
+    documents = ["fuel pump", "fuel tank grounding"]
+
+    first = service.rerank("Fuel tank", documents, candidate_ids=["a", "b"], top_n=2)
+    second = service.rerank("fuel  tank", documents, candidate_ids=["a", "b"], top_n=1)
+    third = service.rerank("fuel tank", documents, candidate_ids=["b", "a"], top_n=2)
+
+    assert first[0][0] == 1
+    assert second == first[:1]
+    assert third is not None
+    stats = service.stats()
+    assert stats["cache_hits"] == 1
+    assert stats["backend_calls"] == 2
+
+
+def test_rerank_service_falls_back_after_deadline_and_caches_late_result() -> None:
+    release = threading.Event()
+
+    class SlowBackend:
+        def rerank(self, *, model, query, documents, top_n):
+            release.wait(timeout=2)
+            return [(0, 0.9)]
+
+    service = RerankService(SlowBackend(), model="slow", deadline_ms=20)
+    assert service.rerank("fuel", ["a", "b"], candidate_ids=["a", "b"], top_n=1) is None
+    release.set()
+    service._executor.shutdown(wait=True)
+
+    assert service.rerank("fuel", ["a", "b"], candidate_ids=["a", "b"], top_n=1) == [(0, 0.9)]
+    stats = service.stats()
+    assert stats["timeouts"] == 1
+    assert stats["fallbacks"] == 1
+    assert stats["late_results_cached"] == 1
+    assert stats["cache_hits"] == 1
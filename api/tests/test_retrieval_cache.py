@@ -0,0 +1,72 @@
+from src import search as search_module
+from src.retrieval_cache import RetrievalResultCache, build_result_cache_key
+
+
+def make_key(query: str, fingerprint=("vector:1", "lexical:1"), corpus: str = "tech_docs"):
+    return build_result_cache_key(
+        corpus=corpus,
+        query=query,
+        n_results=5,
+        use_query_rewrite=True,
+        fingerprint=fingerprint,
+    )
+
+
+def test_result_cache_lru_ttl_and_fingerprint_invalidation(monkeypatch) -> None:
+    clock = [100.0]
+    monkeypatch.setattr("src.retrieval_cache.time.monotonic", lambda: clock[0])
+    cache = RetrievalResultCache(max_entries=2, ttl_seconds=60, enabled=True)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return [{"doc": value}]
+
+    assert cache.get_or_compute(make_key("Fuel  Leak"), lambda: compute("a")) == [{"doc": "a"}]
+    # Requête normalisée (casse / espaces): même entrée.
+    assert cache.get_or_compute(make_key("fuel leak"), lambda: compute("b")) == [{"doc": "a"}]
+    cache.get_or_compute(make_key("door"), lambda: compute("c"))
+    cache.get_or_compute(make_key("windshield"), lambda: compute("d"))
+    assert cache.stats()["evictions"] == 1
+    assert cache.get(make_key("fuel leak")) is None
+
+    clock[0] += 61
+    assert cache.get(make_key("door")) is None
+    assert cache.stats()["expirations"] == 1
+
+    cache.get_or_compute(make_key("rivet"), lambda: compute("e"))
+    assert cache.get_or_compute(make_key("rivet", ("vector:2", "lexical:1")), lambda: compute("f")) == [{"doc": "f"}]
+    assert cache.stats()["invalidations"] >= 1
+
+    # Sans empreinte (index absent), rien n'est mis en cache.
+    cache.get_or_compute(None, lambda: compute("g"))
+    cache.get_or_compute(None, lambda: compute("g"))
+    assert calls == ["a", "c", "d", "e", "f", "g", "g"]
+    stats = cache.stats()
+    assert stats["bypasses"] == 2
+    assert stats["hits"] == 1
+
+
+def test_search_documents_reuses_cached_results_until_index_changes(monkeypatch) -> None:
+    fingerprints = {"vector": "chroma:1:10"}
+    calls = []
+
+    monkeypatch.setattr(search_module, "RESULT_CACHE", RetrievalResultCache(max_entries=8, enabled=True))
+    monkeypatch.setattr(search_module.VECTOR_REGISTRY, "fingerprint", lambda corpus: fingerprints["vector"])
+    monkeypatch.setattr(search_module, "read_lexical_fingerprint", lambda config: "lexical-v1")
+
+    def fake_uncached(query, n_results=15, *, use_query_rewrite=True, query_embeddings=None, **kwargs):
+        calls.append(query)
+        return [{"doc": f"hit-{len(calls)}.md"}]
+
+    monkeypatch.setattr(search_module, "search_documents_uncached", fake_uncached)
+
+    first = search_module.search_documents("fuel tank grounding", n_results=5)
+    first[0]["doc"] = "mutated"
+    second = search_module.search_documents("fuel tank grounding", n_results=5)
+    assert second == [{"doc": "hit-1.md"}]
+
+    fingerprints["vector"] = "chroma:2:10"
+    third = search_module.search_documents("fuel tank grounding", n_results=5)
+    assert third == [{"doc": "hit-2.md"}]
+    assert search_module.get_retrieval_status()["result_cache"]["hits"] == 1
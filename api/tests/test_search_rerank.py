@@ -0,0 +1,40 @@
+import numpy as np
+
+from src import search as search_module
+from src.rerank_service import RerankService
+
+
+def test_search_non_conformities_reranks_fused_candidates_once(monkeypatch) -> None:
+    rerank_calls = []
+
+    class ReversingBackend:
+        def rerank(self, *, model, query, documents, top_n):
+            rerank_calls.append({"documents": list(documents), "top_n": top_n})
+            # Inverse l'ordre RRF pour vérifier que le rerank décide de l'ordre final.
+            order = list(reversed(range(len(documents))))[:top_n]
+            return [(index, 1.0 - rank / 10) for rank, index in enumerate(order)]
+
+    def fake_vector(query, n_results=15, result_limit=10, *, query_embedding=None, ata_chapters=()):
+        return [{"doc": f"ATA-28-vector-{query[:4]}.md", "content": "vector hit", "distance": 0.1}]
+
+    def fake_lexical(queries, n_results=10, **kwargs):
+        return [[{"doc": "ATA-28-lexical.md", "content": "lexical hit", "bm25_score": -3.0}] for _ in queries]
+
+    monkeypatch.setattr(search_module, "RERANK_SERVICE", RerankService(ReversingBackend(), cache_entries=0))
+    monkeypatch.setattr(search_module, "search_non_conformities_vector", fake_vector)
+    monkeypatch.setattr(search_module, "search_non_conformities_lexical_many", fake_lexical)
+    monkeypatch.setattr(search_module, "embed_texts", lambda texts: np.ones((len(texts), 4), dtype=np.float32))
+    monkeypatch.setattr(
+        search_module,
+        "collect_query_variants",
+        lambda query, *, corpus, use_query_rewrite, **kwargs: [query, "fuel tank grounding"],
+    )
+
+    results = search_module.search_non_conformities("electrostatic discharge", n_results=2)
+
+    assert len(rerank_calls) == 1
+    # Les candidats lexicaux passent aussi par le rerank.
+    assert "lexical hit" in rerank_calls[0]["documents"]
+    assert rerank_calls[0]["top_n"] == 2
+    assert [item["rerank_rank"] for item in results] == [1, 2]
+    assert results[0]["relevance_score"] > results[1]["relevance_score"]
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.vector_ivf import IVFVectorStore, build_ivf_export
+from src.vector_store import ExactVectorStore
+from tests.helpers import write_vector_export
+
+
+def test_ivf_store_probes_nearest_lists(tmp_path: Path) -> None:
+    rng = np.random.default_rng(17)
+    centers = rng.normal(scale=4.0, size=(8, 16)).astype(np.float32)
+    vectors = (centers[rng.integers(0, 8, size=600)] + rng.normal(size=(600, 16))).astype(np.float32)
+    config = write_vector_export(tmp_path / "export", vectors)
+    exact = ExactVectorStore(config)
+    queries = vectors[:20] + rng.normal(scale=0.05, size=(20, 16)).astype(np.float32)
+    expected = [[hit["doc"] for hit in hits] for hits in exact.search_many(queries, limit=10)]
+
+    summary = build_ivf_export(config, nlist=16)
+    assert summary["nlist"] == 16
+
+    # Toutes les listes sondées: résultat identique au scan exact.
+    full = IVFVectorStore(config, nprobe=16)
+    assert [[hit["doc"] for hit in hits] for hits in full.search_many(queries, limit=10)] == expected
+
+    probed = IVFVectorStore(config, nprobe=4)
+    found = probed.search_many(queries, limit=10)
+    overlap = np.mean([len(set(a) & {hit["doc"] for hit in b}) / 10 for a, b in zip(expected, found)])
+    assert overlap >= 0.9
+    assert found[0][0]["vector_rank"] == 1
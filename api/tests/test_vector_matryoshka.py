@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.vector_matryoshka import MatryoshkaVectorStore, build_prefix_export
+from src.vector_store import ExactVectorStore
+from tests.helpers import write_vector_export
+
+
+def test_matryoshka_store_reranks_prefix_candidates_on_full_vectors(tmp_path: Path) -> None:
+    rng = np.random.default_rng(7)
+    # Énergie concentrée sur les premières dimensions, comme les embeddings Matryoshka.
+    weights = np.linspace(1.0, 0.1, 64).astype(np.float32)
+    vectors = rng.normal(size=(500, 64)).astype(np.float32) * weights
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    config = write_vector_export(tmp_path / "export", vectors)
+    exact = ExactVectorStore(config)
+    queries = vectors[:20] + rng.normal(scale=0.02, size=(20, 64)).astype(np.float32)
+    expected = exact.search_many(queries, limit=10)
+
+    summary = build_prefix_export(config, dimensions=16)
+    assert summary["prefix_bytes"] == 500 * 16 * 4
+
+    store = MatryoshkaVectorStore(config, prefix_dimensions=16, candidates=100)
+    assert store.scan_bytes_per_vector == 16 * 4
+    found = store.search_many(queries, limit=10)
+    overlap = np.mean(
+        [
+            len({hit["doc"] for hit in a} & {hit["doc"] for hit in b}) / 10
+            for a, b in zip(expected, found)
+        ]
+    )
+    assert overlap >= 0.95
+    # Le rerank renvoie les distances L2 pleine dimension.
+    assert abs(found[0][0]["distance"] - expected[0][0]["distance"]) < 1e-4
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.vector_quantization import QuantizedVectorStore, build_quantized_export
+from src.vector_store import ExactVectorStore
+from tests.helpers import write_vector_export
+
+
+def test_quantized_stores_match_exact_top_k(tmp_path: Path) -> None:
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(400, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    config = write_vector_export(tmp_path / "export", vectors)
+    exact = ExactVectorStore(config)
+    queries = vectors[:20] + rng.normal(scale=0.02, size=(20, 32)).astype(np.float32)
+    expected = [[hit["doc"] for hit in hits] for hits in exact.search_many(queries, limit=10)]
+
+    for precision in ("int8", "fp16"):
+        summary = build_quantized_export(config, precision=precision)
+        assert summary["code_bytes"] < summary["float32_bytes"]
+
+        store = QuantizedVectorStore(config, precision=precision, rescore_factor=4)
+        found = store.search_many(queries, limit=10)
+        overlap = np.mean(
+            [len(set(a) & {hit["doc"] for hit in b}) / 10 for a, b in zip(expected, found)]
+        )
+        assert overlap >= 0.95
+        # La relecture float32 redonne les distances exactes.
+        assert abs(found[0][0]["distance"] - exact.search(queries[0], limit=1)[0]["distance"]) < 1e-4
+
+
+def test_quantized_store_detects_stale_codes(tmp_path: Path) -> None:
+    rng = np.random.default_rng(5)
+    config = write_vector_export(tmp_path / "export", rng.normal(size=(50, 8)))
+    build_quantized_export(config, precision="int8")
+    write_vector_export(tmp_path / "export", rng.normal(size=(50, 8)))
+
+    try:
+        QuantizedVectorStore(config, precision="int8")
+    except ValueError as exc:
+        assert "stale" in str(exc)
+    else:
+        raise AssertionError("expected stale quantized export to be rejected")
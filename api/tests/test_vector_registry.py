@@ -0,0 +1,114 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.doc_registry import DocRegistry
+from src.vector_registry import (
+    VectorCollectionRegistry,
+    VectorCorpusSpec,
+    get_collection_name,
+)
+from src.vector_store import ExactVectorStore, VectorExportConfig
+from tests.helpers import write_vector_export
+
+
+def test_registry_pins_handle_until_index_changes(tmp_path: Path) -> None:
+    config = write_vector_export(tmp_path / "export", np.arange(6).reshape(3, 2))
+    registry = VectorCollectionRegistry(
+        [
+            VectorCorpusSpec("tech_docs", tmp_path / "vectordb", "langchain", config),
+            VectorCorpusSpec(
+                "non_conformities",
+                tmp_path / "missing",
+                "non_conformities",
+                VectorExportConfig("non_conformities", tmp_path / "missing" / "manifest.json"),
+            ),
+        ],
+        engine="export_exact",
+        check_interval=0,
+    )
+
+    status = registry.warm()
+    assert status["tech_docs"]["ready"] is True
+    assert status["tech_docs"]["count"] == 3
+    assert status["non_conformities"]["ready"] is False
+    assert "not found" in status["non_conformities"]["error"]
+
+    first = registry.resolve("tech_docs")
+    assert isinstance(first, ExactVectorStore)
+    assert registry.resolve("tech_docs") is first
+
+    write_vector_export(tmp_path / "export", np.arange(10).reshape(5, 2))
+    manifest_stat = config.manifest_path.stat()
+    os.utime(config.manifest_path, ns=(manifest_stat.st_atime_ns, manifest_stat.st_mtime_ns + 1_000_000))
+
+    second = registry.resolve("tech_docs")
+    assert second is not first
+    assert second.count == 5
+
+
+def test_get_collection_name_prefers_configured_collection() -> None:
+    class Collection:
+        def __init__(self, name: str):
+            self.name = name
+
+    class Client:
+        def list_collections(self):
+            return [Collection("other"), Collection("langchain")]
+
+    assert get_collection_name(Client(), "tech_docs", "langchain") == "langchain"
+    assert get_collection_name(Client(), "tech_docs", "missing") == "other"
+
+
+def test_chroma_entry_reports_persisted_settings_without_modifying(tmp_path: Path) -> None:
+    registry_path = tmp_path / "doc-registry.sqlite3"
+    DocRegistry(registry_path).assign("tech_docs", [{"doc": "ATA-28-fuel.md"}])
+    registry_id = DocRegistry(registry_path).registry_id()
+
+    class FakeCollection:
+        def __init__(self, name: str):
+            self.name = name
+            self.configuration = {"hnsw": {"space": "l2", "ef_search": 40}}
+            # Écrit par dataprep/src/create_*_db.py avec les doc_id des métadonnées.
+            self.metadata = {"doc_registry_id": registry_id}
+
+        def count(self) -> int:
+            return 3
+
+        def modify(self, **kwargs):
+            raise AssertionError("the serving path must not rewrite a baked index")
+
+    class FakeClient:
+        def list_collections(self):
+            return [FakeCollection("langchain")]
+
+        def get_collection(self, name, embedding_function=None):
+            return FakeCollection(name)
+
+    chroma_path = tmp_path / "vectordb"
+    chroma_path.mkdir()
+    (chroma_path / "chroma.sqlite3").write_bytes(b"baked")
+    registry = VectorCollectionRegistry(
+        [
+            VectorCorpusSpec(
+                "tech_docs",
+                chroma_path,
+                "langchain",
+                VectorExportConfig("tech_docs", tmp_path / "export" / "manifest.json", registry_path=registry_path),
+            )
+        ],
+        engine="chroma",
+        check_interval=0,
+    )
+    registry._clients["tech_docs"] = FakeClient()
+
+    status = registry.warm()["tech_docs"]
+
+    assert status["ready"] is True and status["hnsw_search_ef"] == 40
+    assert status["doc_registry_id"] == registry_id and registry.uses_doc_ids("tech_docs")
+
+    # Registre livré différent de celui du build Chroma: les doc_id des métadonnées sont ignorés.
+    registry_path.unlink()
+    DocRegistry(registry_path).assign("tech_docs", [{"doc": "ATA-28-fuel.md"}])
+    assert not registry.uses_doc_ids("tech_docs")
@@ -0,0 +1,93 @@
+import importlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.vector_shards import ShardedChromaCollection, ShardedVectorStore, assign_shards, build_sharded_export
+from src.vector_store import ExactVectorStore
+from tests.helpers import write_vector_export
+
+
+def test_sharded_store_matches_exact_search(tmp_path: Path) -> None:
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(60, 8)).astype(np.float32)
+    docs = [f"ATA-{21 + index % 6}-doc-{index}.md" for index in range(60)]
+    config = write_vector_export(tmp_path / "export", vectors, docs)
+    exact = ExactVectorStore(config)
+    queries = rng.normal(size=(3, 8)).astype(np.float32)
+
+    for strategy in ("hash", "ata"):
+        report = build_sharded_export(config, num_shards=3, strategy=strategy)
+        assert sum(report["shards"]) == 60
+        store = ShardedVectorStore(config)
+
+        for expected, hits in zip(exact.search_many(queries, limit=7), store.search_many(queries, limit=7)):
+            assert [hit["vector_row"] for hit in hits] == [hit["vector_row"] for hit in expected]
+            assert [hit["vector_rank"] for hit in hits] == list(range(1, 8))
+
+        rows = store.partition_rows(["24"])
+        assert np.array_equal(rows, exact.partition_rows(["24"]))
+        hits = store.search(queries[0], limit=5, rows=rows)
+        assert {hit["doc"].split("-doc-")[0] for hit in hits} == {"ATA-24"}
+        assert store.load_payloads([hits[0]["vector_row"]])[hits[0]["vector_row"]]["doc"] == hits[0]["doc"]
+
+
+def test_sharded_chroma_collection_merges_shard_top_k() -> None:
+    class FakeCollection:
+        def __init__(self, ids, distances):
+            self.ids = ids
+            self.distances = distances
+
+        def count(self):
+            return len(self.ids)
+
+        def query(self, *, query_embeddings, n_results, include, **options):
+            return {
+                "ids": [self.ids[:n_results]],
+                "metadatas": [[{"doc": item} for item in self.ids[:n_results]]],
+                "distances": [self.distances[:n_results]],
+            }
+
+        def get(self, *, ids, include):
+            kept = [item for item in ids if item in self.ids]
+            return {"ids": kept, "metadatas": [{"doc": item} for item in kept]}
+
+    collection = ShardedChromaCollection(
+        "langchain",
+        [FakeCollection(["a", "c"], [0.1, 0.5]), FakeCollection(["b", "d"], [0.2, 0.3])],
+    )
+
+    results = collection.query(query_embeddings=[[0.0]], n_results=3, include=["metadatas", "distances"])
+
+    assert results["ids"] == [["a", "b", "d"]]
+    assert results["distances"] == [[0.1, 0.2, 0.3]]
+    assert results["metadatas"][0][1] == {"doc": "b"}
+    assert collection.count() == 4
+    assert collection.get(ids=["d", "a"], include=["metadatas"])["ids"] == ["a", "d"]
+
+
+def test_sharded_store_rejects_stale_shards_and_keeps_registry_id(tmp_path: Path) -> None:
+    rng = np.random.default_rng(5)
+    config = write_vector_export(tmp_path / "export", rng.normal(size=(12, 4)), doc_registry_id="registry-a")
+    build_sharded_export(config, num_shards=2)
+
+    assert ShardedVectorStore(config).manifest["docRegistryId"] == "registry-a"
+
+    write_vector_export(tmp_path / "export", rng.normal(size=(12, 4)))
+    with pytest.raises(ValueError, match="stale"):
+        ShardedVectorStore(config)
+
+
+def test_dataprep_hash_shards_match_the_export_shards(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Le dataprep est un paquet à part (conteneur dédié, /app = dataprep/src).
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[2] / "dataprep" / "src"))
+    monkeypatch.setenv("TECH_DOCS_VECTOR_SHARDS", "3")
+    monkeypatch.setenv("TECH_DOCS_HNSW_SEARCH_EF", "64")
+    layout = importlib.import_module("collection_layout").CollectionLayout("langchain", "TECH_DOCS_")
+    docs = [f"ATA-{21 + index % 6}-doc-{index}.md page {index % 3}" for index in range(30)]
+
+    assert [layout.shard_index(doc) for doc in docs] == assign_shards(
+        [{"doc": doc} for doc in docs], num_shards=3, strategy="hash"
+    ).tolist()
+    assert layout.hnsw_metadata() == {"hnsw:space": "l2", "hnsw:search_ef": 64}
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.vector_store import ExactVectorStore
+from tests.helpers import write_vector_export
+
+
+def test_exact_vector_store_matches_brute_force(tmp_path: Path) -> None:
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(40, 8)).astype(np.float32)
+    config = write_vector_export(tmp_path / "export", vectors, [f"doc-{i}.md" for i in range(40)])
+    store = ExactVectorStore(config)
+
+    queries = rng.normal(size=(3, 8)).astype(np.float32)
+    batches = store.search_many(queries, limit=5)
+
+    for query, hits in zip(queries, batches):
+        expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:5]
+        assert [hit["doc"] for hit in hits] == [f"doc-{i}.md" for i in expected]
+        assert [hit["vector_rank"] for hit in hits] == [1, 2, 3, 4, 5]
+        assert hits[0]["distance"] <= hits[-1]["distance"]
+        assert hits[0]["content"].startswith("content doc-")
+
+
+def test_exact_vector_store_rejects_wrong_dimensions(tmp_path: Path) -> None:
+    vectors = np.eye(4, dtype=np.float32)
+    config = write_vector_export(tmp_path / "export", vectors, ["a", "b", "c", "d"])
+    store = ExactVectorStore(config)
+
+    try:
+        store.search([1.0, 0.0], limit=2)
+    except ValueError as exc:
+        assert "dimensions mismatch" in str(exc)
+    else:
+        raise AssertionError("expected a dimensions mismatch error")
+
+    assert [hit["doc"] for hit in store.search([0.0, 0.0, 1.0, 0.0], limit=10)][0] == "c"
+
+
+def test_exact_vector_store_searches_ata_partition_rows(tmp_path: Path) -> None:
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(30, 8)).astype(np.float32)
+    docs = [f"ATA-{28 if index % 3 == 0 else 52}-nc-{index}.md" for index in range(30)]
+    config = write_vector_export(tmp_path / "export", vectors, docs)
+    store = ExactVectorStore(config)
+
+    rows = store.partition_rows(["28"])
+    assert rows.tolist() == list(range(0, 30, 3))
+    assert store.partition_rows(["21"]).size == 0
+
+    hits = store.search(vectors[4], limit=3, rows=rows)
+    expected = rows[np.argsort(((vectors[rows] - vectors[4]) ** 2).sum(axis=1))[:3]]
+    assert [hit["doc"] for hit in hits] == [docs[row] for row in expected]
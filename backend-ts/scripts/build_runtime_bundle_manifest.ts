@@ -45,6 +45,7 @@ const REQUIRED_RELATIVE_PATHS = (techDocsDir: string, ncDir: string): readonly s
   `api/data/${ncDir}/wiki`,
   `api/data/${ncDir}/json`,
   `api/data/${ncDir}/knowledge-manifest.json`,
+  "api/data/doc-registry.sqlite3",
 ] as const;
 
 export function parseCli(args: readonly string[] = process.argv.slice(2)): CliOptions {
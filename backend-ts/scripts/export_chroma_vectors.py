@@ -14,6 +14,8 @@ from typing import Any
 
 ROOT = pathlib.Path(__file__).resolve().parents[2]
 API_ROOT = ROOT / "api"
+# Même convention de nommage que api/src/vector_shards.py (CHROMA_SHARD_SEPARATOR) et le dataprep.
+CHROMA_SHARD_SEPARATOR = "__shard_"
 
 
 @dataclass(frozen=True)
@@ -88,6 +90,33 @@ def build_item(
     return item
 
 
+def resolve_collections(client: Any, collection_name: str) -> list[Any]:
+    """Collection unique, ou ses shards `<name>__shard_NN` dans l'ordre quand le build est shardé."""
+    names = [getattr(collection, "name", collection) for collection in client.list_collections()]
+    if collection_name in names:
+        return [client.get_collection(name=collection_name)]
+    prefix = f"{collection_name}{CHROMA_SHARD_SEPARATOR}"
+    shard_names = sorted(name for name in names if name.startswith(prefix))
+    if not shard_names:
+        raise SystemExit(f"Missing Chroma collection {collection_name} (no {prefix}NN shards either)")
+    return [client.get_collection(name=name) for name in shard_names]
+
+
+def iter_payloads(collections: list[Any], batch_size: int):
+    for collection in collections:
+        offset = 0
+        while True:
+            payload = collection.get(
+                include=["embeddings", "metadatas", "documents"],
+                offset=offset,
+                limit=batch_size,
+            )
+            if not payload.get("ids"):
+                break
+            yield payload
+            offset += len(payload["ids"])
+
+
 def export_corpus(config: CorpusConfig, batch_size: int) -> dict[str, Any]:
     chromadb = require_chromadb()
 
@@ -95,8 +124,8 @@ def export_corpus(config: CorpusConfig, batch_size: int) -> dict[str, Any]:
         raise SystemExit(f"Missing Chroma source directory: {config.source_root}")
 
     client = chromadb.PersistentClient(path=str(config.source_root))
-    collection = client.get_collection(name=config.collection_name)
-    total_count = collection.count()
+    collections = resolve_collections(client, config.collection_name)
+    total_count = sum(collection.count() for collection in collections)
     if total_count <= 0:
         raise SystemExit(f"Collection {config.collection_name} is empty")
 
@@ -114,13 +143,7 @@ def export_corpus(config: CorpusConfig, batch_size: int) -> dict[str, Any]:
         squared_norms_path.open("wb") as squared_norms_fp,
         items_path.open("w", encoding="utf-8") as items_fp,
     ):
-        offset = 0
-        while True:
-            payload = collection.get(
-                include=["embeddings", "metadatas", "documents"],
-                offset=offset,
-                limit=batch_size,
-            )
+        for payload in iter_payloads(collections, batch_size):
             ids = payload.get("ids")
             if ids is None:
                 ids = []
@@ -168,8 +191,6 @@ def export_corpus(config: CorpusConfig, batch_size: int) -> dict[str, Any]:
                 )
                 exported_count += 1
 
-            offset += len(ids)
-
     if dimensions is None:
         raise SystemExit(f"Failed to infer embedding dimensions for {config.key}")
 
@@ -184,6 +205,11 @@ def export_corpus(config: CorpusConfig, batch_size: int) -> dict[str, Any]:
         "squaredNormsPath": squared_norms_path.name,
         "itemsPath": items_path.name,
     }
+    # Registre ayant attribué les doc_id des items (métadonnée Chroma écrite par le dataprep).
+    # Tous les shards sont créés avec les mêmes métadonnées.
+    doc_registry_id = (collections[0].metadata or {}).get("doc_registry_id")
+    if doc_registry_id:
+        manifest["docRegistryId"] = doc_registry_id
     manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
 
     if config.output_root.exists():
@@ -193,6 +219,7 @@ def export_corpus(config: CorpusConfig, batch_size: int) -> dict[str, Any]:
     return {
         "corpus": config.key,
         "collection": config.collection_name,
+        "collections": [collection.name for collection in collections],
         "count": exported_count,
         "dimensions": dimensions,
         "output_root": str(config.output_root),
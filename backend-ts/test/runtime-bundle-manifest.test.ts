@@ -29,6 +29,7 @@ test("runtime bundle manifest script writes a deterministic file list and manife
   write(repoRoot, "api/data/nc/wiki/index.json", '{"pages":1}');
   write(repoRoot, "api/data/nc/json/ATA-1.json", '{"id":"ATA-1"}');
   write(repoRoot, "api/data/nc/knowledge-manifest.json", '{"corpus":"nc"}');
+  write(repoRoot, "api/data/doc-registry.sqlite3", "registry");
 
   const bundleRoot = path.join(repoRoot, "api/data/runtime-bundles");
   mkdirSync(bundleRoot, { recursive: true });
@@ -59,6 +60,7 @@ test("runtime bundle manifest script writes a deterministic file list and manife
 
   const fileList = readFileSync(fileListPath, "utf8").trim().split("\n");
   assert.deepEqual(fileList, [
+    "api/data/doc-registry.sqlite3",
     "api/data/docs/knowledge-manifest.json",
     "api/data/docs/lexical/fts.sqlite3",
     "api/data/docs/managed_dataset/chunks.jsonl",
@@ -87,8 +89,8 @@ test("runtime bundle manifest script writes a deterministic file list and manife
   assert.equal(manifest.bundle_name, "api-runtime-data.tar.zst");
   assert.equal(manifest.tech_docs_dir, "docs");
   assert.equal(manifest.nc_dir, "nc");
-  assert.equal(manifest.source_file_count, 14);
+  assert.equal(manifest.source_file_count, 15);
   assert.equal(manifest.bundle_sha256, "abcd1234");
-  assert.equal(manifest.entries[0]?.path, "api/data/docs/knowledge-manifest.json");
+  assert.equal(manifest.entries[0]?.path, "api/data/doc-registry.sqlite3");
   assert.equal(manifest.entries.at(-1)?.path, "api/data/nc/wiki/index.json");
 });
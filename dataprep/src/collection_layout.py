@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Collections Chroma d'un corpus, communes aux scripts de build (create_tech_docs_db, create_nc_db).
+
+Variables d'environnement, préfixées par corpus (TECH_DOCS_, NC_):
+- <PREFIX>VECTOR_SHARDS / <PREFIX>VECTOR_SHARD_BY: N collections <collection>__shard_NN, interrogées en parallèle
+  par l'API, réparties par document (hash) ou par chapitre ATA (ata).
+- <PREFIX>HNSW_M / <PREFIX>HNSW_CONSTRUCTION_EF / <PREFIX>HNSW_SEARCH_EF: paramètres HNSW (défauts Chroma si non
+  définis). Persistés dans chroma.sqlite3: l'API ne les modifie pas, /retrieval/status rapporte search_ef.
+"""
+import logging
+import os
+import re
+import zlib
+
+from doc_registry import document_identity
+
+logger = logging.getLogger(__name__)
+
+# Même convention de nommage que l'API (api/src/vector_shards.py, CHROMA_SHARD_SEPARATOR).
+SHARD_SEPARATOR = "__shard_"
+ATA_RE = re.compile(r"ATA[-_ ]?(\d{2})", re.IGNORECASE)
+HNSW_ENV_SUFFIXES = {
+    "hnsw:M": "HNSW_M",
+    "hnsw:construction_ef": "HNSW_CONSTRUCTION_EF",
+    "hnsw:search_ef": "HNSW_SEARCH_EF",
+}
+
+
+class CollectionLayout:
+    def __init__(self, collection_name, env_prefix):
+        self.collection_name = collection_name
+        self.env_prefix = env_prefix
+        self.shards = int(os.getenv(f"{env_prefix}VECTOR_SHARDS", "1"))
+        self.shard_by = os.getenv(f"{env_prefix}VECTOR_SHARD_BY", "hash")
+
+    def hnsw_metadata(self):
+        metadata = {
+            key: int(os.environ[f"{self.env_prefix}{suffix}"])
+            for key, suffix in HNSW_ENV_SUFFIXES.items()
+            if os.getenv(f"{self.env_prefix}{suffix}")
+        }
+        if not metadata:
+            return None
+        logger.info("Using HNSW settings: %s", metadata)
+        return {"hnsw:space": "l2", **metadata}
+
+    def shard_index(self, doc, ata=None):
+        """Shard stable d'un chunk: tous les chunks d'un document (ou d'un chapitre ATA) restent ensemble."""
+        if self.shards <= 1:
+            return 0
+        if self.shard_by == "ata":
+            match = ATA_RE.search(f"ATA-{ata}" if str(ata).isdigit() else f"{ata or ''} {doc}")
+            key = match.group(1) if match else ""
+        else:
+            key = document_identity(doc)
+        return zlib.crc32(key.encode("utf-8")) % self.shards
+
+    def create_collections(self, client, embedding_function, doc_registry_id):
+        if self.shards <= 1:
+            names = [self.collection_name]
+        else:
+            names = [f"{self.collection_name}{SHARD_SEPARATOR}{index:02d}" for index in range(self.shards)]
+            logger.info("Sharding the collection by %s into %d collections.", self.shard_by, self.shards)
+        metadata = self.hnsw_metadata() or {}
+        return [
+            client.create_collection(
+                name=name,
+                embedding_function=embedding_function,
+                # doc_registry_id: l'API ne reprend les doc_id des métadonnées que pour ce registre.
+                metadata={**metadata, "doc_registry_id": doc_registry_id},
+            )
+            for name in names
+        ]
@@ -9,6 +9,9 @@ import chromadb
 import chromadb.utils.embedding_functions as embedding_functions
 import openai
 
+from collection_layout import CollectionLayout
+from doc_registry import DOC_REGISTRY_PATH, DocRegistryWriter
+
 # Configure logger
 import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -20,10 +23,13 @@ NC_DIR_NAME = os.getenv("NC_DIR", "a220-non-conformities")
 NC_PATH = DATA_DIR / NC_DIR_NAME
 
 DB_PATH = NC_PATH / "vectordb"
+DOC_REGISTRY_CORPUS = "non_conformities"
 SOURCE_FILE = NC_PATH / "managed_dataset/NC_types_random_500_pre_embed.csv.gz"
 COLLECTION_NAME = "non_conformities"
 BATCH_SIZE = 100
 MAX_DOC_CHARS = 30000
+# Shards et paramètres HNSW: variables NC_VECTOR_SHARDS, NC_HNSW_* (voir collection_layout).
+COLLECTION_LAYOUT = CollectionLayout(COLLECTION_NAME, "NC_")
 
 def add_batch_individually(collection, documents, metadatas, ids):
     """
@@ -72,14 +78,11 @@ def create_nc_db():
         model_name="text-embedding-3-large"
     )
     
-    collection = client.create_collection(
-        name=COLLECTION_NAME,
-        embedding_function=openai_ef
-    )
+    registry = DocRegistryWriter(DOC_REGISTRY_PATH, DOC_REGISTRY_CORPUS)
+    collections = COLLECTION_LAYOUT.create_collections(client, openai_ef, registry.registry_id)
 
-    documents = []
-    metadatas = []
-    ids = []
+    # Un lot en cours par shard: (documents, metadatas, ids)
+    batches = [([], [], []) for _ in collections]
     batch_count = 0
     seen_ids = set()
 
@@ -116,38 +119,44 @@ def create_nc_db():
                     logger.warning("Truncating long document for doc %s, chunk_id %s", doc, chunk_id)
                     doc_content = doc_content[:MAX_DOC_CHARS]
                 
+                shard = COLLECTION_LAYOUT.shard_index(doc)
+                documents, metadatas, ids = batches[shard]
                 documents.append(doc_content)
                 metadatas.append({
                     "doc": doc,
                     "chunk_id": chunk_id,
+                    "doc_id": registry.doc_id(doc, chunk_id),
                 })
                 ids.append(chunk_id)
                 seen_ids.add(chunk_id)
 
                 if len(documents) >= BATCH_SIZE:
                     batch_count += 1
-                    logger.info("Adding batch %d with %d documents...", batch_count, len(documents))
+                    logger.info("Adding batch %d with %d documents to shard %d...", batch_count, len(documents), shard)
                     try:
-                        collection.add(documents=documents, metadatas=metadatas, ids=ids)
+                        collections[shard].add(documents=documents, metadatas=metadatas, ids=ids)
                     except openai.BadRequestError:
-                        add_batch_individually(collection, documents, metadatas, ids)
-                    documents, metadatas, ids = [], [], []
+                        add_batch_individually(collections[shard], documents, metadatas, ids)
+                    batches[shard] = ([], [], [])
 
     except Exception as e:
         logger.error("Failed to process CSV file: %s", e, exc_info=True)
         sys.exit(1)
 
-    if documents:
+    for shard, (documents, metadatas, ids) in enumerate(batches):
+        if not documents:
+            continue
         batch_count += 1
-        logger.info("Adding final batch %d with %d documents...", batch_count, len(documents))
+        logger.info("Adding final batch %d with %d documents to shard %d...", batch_count, len(documents), shard)
         try:
-            collection.add(documents=documents, metadatas=metadatas, ids=ids)
+            collections[shard].add(documents=documents, metadatas=metadatas, ids=ids)
         except openai.BadRequestError:
-            add_batch_individually(collection, documents, metadatas, ids)
+            add_batch_individually(collections[shard], documents, metadatas, ids)
         except Exception as e:
             logger.error("Failed to add final batch to the collection: %s", e, exc_info=True)
             sys.exit(1)
-            
+
+    registry.close()
     logger.info("✅ NC Database created successfully.")
 
 if __name__ == "__main__":
@@ -8,6 +8,9 @@ import os
 import chromadb
 import chromadb.utils.embedding_functions as embedding_functions
 
+from collection_layout import CollectionLayout
+from doc_registry import DOC_REGISTRY_PATH, DocRegistryWriter
+
 # Configure logger
 import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -19,10 +22,13 @@ TECH_DOCS_DIR_NAME = os.getenv("TECH_DOCS_DIR", "a220-tech-docs")
 TECH_DOCS_PATH = DATA_DIR / TECH_DOCS_DIR_NAME
 
 DB_PATH = TECH_DOCS_PATH / "vectordb"
+DOC_REGISTRY_CORPUS = "tech_docs"
 SOURCE_FILE = TECH_DOCS_PATH / "managed_dataset/a220_tech_docs_content_prepared.csv.gz"
 PAGES_PATH = TECH_DOCS_PATH / "pages"
 COLLECTION_NAME = "langchain"
 BATCH_SIZE = 500  # Réduire la taille du lot
+# Shards et paramètres HNSW: variables TECH_DOCS_VECTOR_SHARDS, TECH_DOCS_HNSW_* (voir collection_layout).
+COLLECTION_LAYOUT = CollectionLayout(COLLECTION_NAME, "TECH_DOCS_")
 
 def create_tech_docs_db():
     """
@@ -50,14 +56,11 @@ def create_tech_docs_db():
         model_name="text-embedding-3-large"
     )
     
-    collection = client.create_collection(
-        name=COLLECTION_NAME,
-        embedding_function=openai_ef
-    )
+    registry = DocRegistryWriter(DOC_REGISTRY_PATH, DOC_REGISTRY_CORPUS)
+    collections = COLLECTION_LAYOUT.create_collections(client, openai_ef, registry.registry_id)
 
-    documents = []
-    metadatas = []
-    ids = []
+    # Un lot en cours par shard: (documents, metadatas, ids)
+    batches = [([], [], []) for _ in collections]
     batch_count = 0
 
     logger.info("Reading and processing source file: %s", SOURCE_FILE)
@@ -83,6 +86,8 @@ def create_tech_docs_db():
                     logger.warning("Skipping chunk because PDF file does not exist: %s", pdf_path)
                     continue
 
+                shard = COLLECTION_LAYOUT.shard_index(doc, ata)
+                documents, metadatas, ids = batches[shard]
                 documents.append(chunk)
                 metadatas.append({
                     "doc": doc,
@@ -93,31 +98,34 @@ def create_tech_docs_db():
                     "ATA": ata,
                     "parts": parts,
                     "doc_type": doc_type,
+                    "doc_id": registry.doc_id(doc, chunk_id, ata),
                 })
                 ids.append(chunk_id)
 
                 # Si le lot est plein, on l'ajoute à la collection
                 if len(documents) >= BATCH_SIZE:
                     batch_count += 1
-                    logger.info("Adding batch %d with %d documents...", batch_count, len(documents))
-                    collection.add(
+                    logger.info("Adding batch %d with %d documents to shard %d...", batch_count, len(documents), shard)
+                    collections[shard].add(
                         documents=documents,
                         metadatas=metadatas,
                         ids=ids
                     )
                     # On réinitialise les listes pour le prochain lot
-                    documents, metadatas, ids = [], [], []
+                    batches[shard] = ([], [], [])
 
     except Exception as e:
         logger.error("Failed to process CSV file: %s", e)
         sys.exit(1)
 
-    # Ajouter le dernier lot s'il n'est pas vide
-    if documents:
+    # Ajouter le dernier lot de chaque shard s'il n'est pas vide
+    for shard, (documents, metadatas, ids) in enumerate(batches):
+        if not documents:
+            continue
         batch_count += 1
-        logger.info("Adding final batch %d with %d documents...", batch_count, len(documents))
+        logger.info("Adding final batch %d with %d documents to shard %d...", batch_count, len(documents), shard)
         try:
-            collection.add(
+            collections[shard].add(
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids
@@ -125,7 +133,8 @@ def create_tech_docs_db():
         except Exception as e:
             logger.error("Failed to add final batch to the collection: %s", e)
             sys.exit(1)
-            
+
+    registry.close()
     logger.info("✅ Database created successfully.")
 
 if __name__ == "__main__":
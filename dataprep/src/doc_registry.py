@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Attribution des doc_id au build des collections Chroma.
+
+Même fichier et même schéma que le registre de l'API (api/src/doc_registry.py, data/doc-registry.sqlite3):
+les ids écrits ici dans les métadonnées Chroma (doc_id) sont ceux que l'index lexical retrouve.
+"""
+import pathlib
+import sqlite3
+import uuid
+
+# Registre partagé avec l'API: /data est monté sur api/data (api/data/doc-registry.sqlite3).
+DOC_REGISTRY_PATH = pathlib.Path("/data") / "doc-registry.sqlite3"
+
+
+def document_identity(doc):
+    """Identité d'un document partagée par tous les canaux: stem du nom de fichier, en minuscules."""
+    return pathlib.Path(str(doc).split(" ")[0]).stem.lower()
+
+
+class DocRegistryWriter:
+    """Ids stables par (corpus, identité de document), ajoutés sans jamais réutiliser un id."""
+
+    def __init__(self, path, corpus):
+        self.path = pathlib.Path(path)
+        self.corpus = corpus
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                corpus TEXT NOT NULL,
+                identity TEXT NOT NULL,
+                doc TEXT NOT NULL,
+                chunk_id TEXT,
+                source_path TEXT,
+                ata TEXT,
+                UNIQUE(corpus, identity)
+            )
+            """
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS registry_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.connection.execute(
+            "INSERT OR IGNORE INTO registry_meta(key, value) VALUES('registry_id', ?)",
+            (uuid.uuid4().hex,),
+        )
+        self.connection.commit()
+        self.registry_id = self.connection.execute(
+            "SELECT value FROM registry_meta WHERE key = 'registry_id'"
+        ).fetchone()[0]
+        self._ids = dict(
+            self.connection.execute("SELECT identity, doc_id FROM documents WHERE corpus = ?", (corpus,))
+        )
+
+    def doc_id(self, doc, chunk_id=None, ata=None):
+        identity = document_identity(doc)
+        if not identity:
+            return -1
+        if identity not in self._ids:
+            cursor = self.connection.execute(
+                "INSERT INTO documents(corpus, identity, doc, chunk_id, ata) VALUES(?, ?, ?, ?, ?)",
+                (self.corpus, identity, str(doc), chunk_id, ata or None),
+            )
+            self._ids[identity] = cursor.lastrowid
+        return self._ids[identity]
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()